@@ -1,3 +1,5 @@
+import os
+import threading
 import time
 import streamlit as st
 # from rag.generator import generate_answer # Assuming this exists in your local environment
@@ -12,6 +14,52 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
+# -----------------------------
+# Backend
+# -----------------------------
+# Set AIVERSE_API_URL (e.g. http://localhost:8000) to send queries to the
+# shared `server.py` service instead of loading the pipeline in this process.
+API_URL = os.getenv("AIVERSE_API_URL", "").rstrip("/")
+API_TIMEOUT = 60
+
+
+def ask(query, lang_code):
+    """Answer segments as they become ready (insight bullets first, sources last)."""
+    if API_URL:
+        import requests
+        with requests.post(
+            f"{API_URL}/answer/stream",
+            json={"query": query, "language": lang_code},
+            timeout=API_TIMEOUT,
+            stream=True
+        ) as response:
+            response.raise_for_status()
+            response.encoding = "utf-8"
+            yield from response.iter_content(chunk_size=None, decode_unicode=True)
+        return
+
+    from rag.generator import stream_answer
+    yield from stream_answer(query, language=lang_code)
+
+
+@st.cache_resource
+def warm_pipeline():
+    """Import the pipeline and load model + index once per process, off the first question's path."""
+    def load():
+        from rag.rerank import RERANK, get_reranker
+        from rag.retriever import get_retriever
+        get_retriever().warm()
+        if RERANK:
+            get_reranker().warm()
+
+    thread = threading.Thread(target=load, name="aiverse-warm", daemon=True)
+    thread.start()
+    return thread
+
+
+if not API_URL:
+    warm_pipeline()
+
 # -----------------------------
 # Language Mapping
 # -----------------------------
@@ -162,8 +210,8 @@ input {
     border-radius: 10px !important;
 }
 
-/* Answer card */
-.answer-card {
+/* Answer card (the bordered container the answer streams into) */
+div[data-testid="stVerticalBlockBorderWrapper"] {
     background: #f0f9ff;
     border: 1px solid #2563eb;
     border-radius: 14px;
@@ -265,24 +313,30 @@ query = st.text_input(
 # -----------------------------
 if st.button("Get Answer"):
     if query.strip():
-        # Using a dummy answer if generate_answer isn't imported
-        try:
-            from rag.generator import generate_answer
-            start = time.time()
-            answer = generate_answer(query, language=lang_code)
-            latency = round(time.time() - start, 2)
-        except ImportError:
-            answer = "This is a placeholder answer. Please ensure your RAG module is connected."
-            latency = 0.5
-
         st.markdown("### Generated Insight")
-
-        st.markdown(f"""
+        badge = st.empty()
+
+        # Segments render as they arrive; the badge shows first-segment and total time
+        start = time.time()
+        first = []
+
+        def timed(segments):
+            for segment in segments:
+                if not first:
+                    first.append(round(time.time() - start, 2))
+                yield segment
+
+        with st.container(border=True):
+            # Using a dummy answer if generate_answer isn't imported
+            try:
+                st.write_stream(timed(ask(query, lang_code)))
+            except ImportError:
+                st.markdown("This is a placeholder answer. Please ensure your RAG module is connected.")
+        latency = round(time.time() - start, 2)
+
+        badge.markdown(f"""
             <div class="confidence-badge">
-                Grounded in multiple sources · {latency}s
-            </div>
-            <div class="answer-card">
-                {answer}
+                Grounded in multiple sources · first insight {first[0] if first else latency}s · {latency}s
             </div>
         """, unsafe_allow_html=True)
 
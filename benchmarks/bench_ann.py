@@ -0,0 +1,146 @@
+"""
+Recall vs latency for the approximate index types in rag/indexing.py.
+
+Uses the vectors of the built flat index (vectorstore/faiss_index) when it
+exists, otherwise a synthetic clustered corpus. Every index type is built on
+the same vectors and scored against exact flat search.
+
+    python -m benchmarks.bench_ann
+    python -m benchmarks.bench_ann --synthetic 200000 --k 10 --json ann.json
+"""
+import argparse
+import json
+import os
+import time
+
+import faiss
+import numpy as np
+
+from rag.indexing import (
+    INDEX_TYPES, base_index, index_nbytes, make_index, read_meta, search_params,
+    train_index
+)
+from rag.retriever import VECTORSTORE_DIR
+
+# knobs swept per index type
+SWEEPS = {
+    "flat": [None],
+    "ivf_flat": [1, 4, 8, 16, 32, 64],
+    "ivf_pq": [1, 4, 8, 16, 32, 64],
+    "hnsw": [16, 32, 64, 128, 256],
+}
+
+
+def corpus_vectors(index_dir, synthetic, dim, seed):
+    if not synthetic and os.path.exists(os.path.join(index_dir, "index.faiss")):
+        meta = read_meta(index_dir)
+        if meta["index_type"] != "flat" or meta["vector_format"] == "binary":
+            raise SystemExit("Benchmark needs a flat index to read exact vectors from")
+        index = base_index(faiss.read_index(os.path.join(index_dir, "index.faiss")))
+        return index.reconstruct_n(0, index.ntotal), "vectorstore"
+
+    n = synthetic or 50_000
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(1, n // 500), dim)).astype("float32")
+    labels = rng.integers(0, len(centers), size=n)
+    vectors = centers[labels] + 0.3 * rng.normal(size=(n, dim)).astype("float32")
+    return vectors.astype("float32"), f"synthetic-{n}"
+
+
+def make_queries(vectors, nq, seed):
+    rng = np.random.default_rng(seed + 1)
+    picks = vectors[rng.choice(len(vectors), nq, replace=False)]
+    noise = rng.normal(scale=0.05 * float(np.std(vectors)), size=picks.shape)
+    return (picks + noise).astype("float32")
+
+
+def recall_at_k(found, truth):
+    k = truth.shape[1]
+    hits = sum(len(set(f[f != -1]) & set(t)) for f, t in zip(found, truth))
+    return hits / (len(truth) * k)
+
+
+def time_queries(index, queries, k, params):
+    latencies, found = [], []
+    for q in queries:
+        start = time.perf_counter()
+        _, ids = index.search(q[None, :], k, params=params)
+        latencies.append((time.perf_counter() - start) * 1000)
+        found.append(ids[0])
+    return np.asarray(latencies), np.asarray(found)
+
+
+def run(vectors, queries, k, index_types):
+    truth_index = faiss.IndexFlatL2(vectors.shape[1])
+    truth_index.add(vectors)
+    _, truth = truth_index.search(queries, k)
+
+    rows = []
+    for index_type in index_types:
+        start = time.perf_counter()
+        index, params = make_index(index_type, vectors.shape[1], len(vectors))
+        train_index(index, vectors)
+        index.add(vectors)
+        build_s = time.perf_counter() - start
+        nbytes = index_nbytes(index)
+
+        for knob in SWEEPS[index_type]:
+            if index_type.startswith("ivf") and knob > params["nlist"]:
+                continue
+            sp = search_params(index, index_type, nprobe=knob, ef_search=knob)
+            latencies, found = time_queries(index, queries, k, sp)
+            rows.append({
+                "index_type": index_type,
+                "knob": knob,
+                "params": params,
+                "build_s": round(build_s, 3),
+                "memory_mb": round(nbytes / 2**20, 2),
+                f"recall@{k}": round(recall_at_k(found, truth), 4),
+                "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+                "p99_ms": round(float(np.percentile(latencies, 99)), 3),
+            })
+    return rows
+
+
+def print_table(rows, k):
+    print(f"{'index':<10}{'knob':>8}{'recall@' + str(k):>12}{'p50 ms':>10}"
+          f"{'p99 ms':>10}{'mem MB':>10}{'build s':>10}")
+    for r in rows:
+        print(f"{r['index_type']:<10}{str(r['knob'] or '-'):>8}"
+              f"{r[f'recall@{k}']:>12.4f}{r['p50_ms']:>10.3f}{r['p99_ms']:>10.3f}"
+              f"{r['memory_mb']:>10.2f}{r['build_s']:>10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--index-dir", default=VECTORSTORE_DIR)
+    parser.add_argument("--synthetic", type=int, default=0,
+                        help="ignore the built index and use N synthetic vectors")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--types", nargs="+", choices=INDEX_TYPES, default=list(INDEX_TYPES))
+    parser.add_argument("--threads", type=int, help="faiss OpenMP threads")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    if args.threads:
+        faiss.omp_set_num_threads(args.threads)
+
+    vectors, corpus = corpus_vectors(args.index_dir, args.synthetic, args.dim, args.seed)
+    queries = make_queries(vectors, min(args.queries, len(vectors)), args.seed)
+    print(f"Corpus: {corpus} ({len(vectors)} x {vectors.shape[1]}), "
+          f"{len(queries)} queries, k={args.k}")
+
+    rows = run(vectors, queries, args.k, args.types)
+    print_table(rows, args.k)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"corpus": corpus, "n": len(vectors), "k": args.k,
+                       "results": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,399 @@
+"""
+End-to-end build and query benchmark on a synthetic multilingual corpus.
+
+Generates `--chunks` paragraphs (10k to 5M) spread over the six UI languages
+(en, ta, hi, te, ml, kn) as text files, builds the index with `build_index.py`
+using the offline hash embedder, then measures build throughput, index size,
+cold start (fresh process: imports + index load + first query), and single /
+batched query latency and QPS through `rag.retriever.retrieve`,
+`rag.retriever.retrieve_many` and `rag.generator.generate_answer` (offline
+translator), plus time to the first segment of `stream_answer`. Results are
+written as JSON; pass `--compare` with an earlier run's JSON to see the change
+per metric between commits.
+
+    python -m benchmarks.bench_e2e --json e2e.json
+    python -m benchmarks.bench_e2e --chunks 1000000 --index-type hnsw --json e2e-1m.json
+    python -m benchmarks.bench_e2e --json new.json --compare e2e.json
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUILD_SCRIPT = os.path.join(REPO_DIR, "build_index.py")
+INDEX_SUBDIR = os.path.join("vectorstore", "faiss_index")
+
+# Script ranges the pseudo-words are drawn from: (consonants, vowel signs).
+# English uses real words so langdetect tags those chunks "en" like real reports.
+ENGLISH = """
+the of and to in a is that for it as with was on be by this are from or have an
+they which one you were all we there their has been more when will would who so
+no if out what up about into than them can only other new some could time these
+two may then do first any like now my such over our even most made after also
+did many before must through back years where much your way well down should
+because each just those people how too little state good very make world still
+own see men work long get here between both life being under never day same
+another know while last might us great old year off come since against go came
+right used take three investors startup funding round capital venture market
+growth seed series early stage fintech health climate india fund firm portfolio
+revenue founders product customers valuation equity debt returns sector policy
+""".split()
+SCRIPTS = {
+    "en": None,
+    "hi": ("".join(map(chr, range(0x0915, 0x0939))), "".join(map(chr, range(0x093E, 0x094D)))),
+    "ta": ("கஙசஞடணதநபமயரலவழளறன", "".join(map(chr, range(0x0BBE, 0x0BC3)))),
+    "te": ("".join(map(chr, range(0x0C15, 0x0C29))), "".join(map(chr, range(0x0C3E, 0x0C45)))),
+    "ml": ("".join(map(chr, range(0x0D15, 0x0D29))), "".join(map(chr, range(0x0D3E, 0x0D45)))),
+    "kn": ("".join(map(chr, range(0x0C95, 0x0CA9))), "".join(map(chr, range(0x0CBE, 0x0CC5)))),
+}
+LANGUAGES = tuple(SCRIPTS)
+VOCAB_SIZE = 5000             # pseudo-words per Indic language (Zipf-distributed)
+PARAGRAPH_CHARS = 420         # ~one 500-char chunk per paragraph
+QUERY_WORDS = 5
+
+# -----------------------------
+# Synthetic corpus
+# -----------------------------
+def vocabulary(language, rng):
+    if SCRIPTS[language] is None:
+        return ENGLISH
+    consonants, vowels = SCRIPTS[language]
+    words = set()
+    while len(words) < VOCAB_SIZE:
+        syllables = rng.integers(2, 5)
+        words.add("".join(consonants[rng.integers(len(consonants))] +
+                          vowels[rng.integers(len(vowels))] for _ in range(syllables)))
+    return sorted(words)
+
+
+def generate_corpus(data_dir, chunks, chunks_per_file, n_queries, seed):
+    """Write the corpus; returns (query, language) pairs lifted from it."""
+    rng = np.random.default_rng(seed)
+    vocabularies = {lang: vocabulary(lang, rng) for lang in LANGUAGES}
+
+    os.makedirs(data_dir, exist_ok=True)
+    n_files = math.ceil(chunks / chunks_per_file)
+    per_file = math.ceil(n_queries / n_files)
+    queries = []
+    for i in range(n_files):
+        language = LANGUAGES[i % len(LANGUAGES)]
+        words = vocabularies[language]
+        average = np.mean([len(w) for w in words]) + 1
+        n_paragraphs = min(chunks_per_file, chunks - i * chunks_per_file)
+        per_paragraph = int(PARAGRAPH_CHARS / average)
+        zipf = 1 / np.arange(1, len(words) + 1)
+        picks = rng.choice(len(words), size=(n_paragraphs, per_paragraph), p=zipf / zipf.sum())
+
+        paragraphs = [" ".join(words[j] for j in row) + "." for row in picks]
+        with open(os.path.join(data_dir, f"{language}_{i:06d}.txt"), "w",
+                  encoding="utf-8") as f:
+            f.write("\n\n".join(paragraphs))
+
+        for row in rng.choice(n_paragraphs, size=min(per_file, n_paragraphs), replace=False):
+            start = int(rng.integers(0, per_paragraph - QUERY_WORDS))
+            span = picks[row, start:start + QUERY_WORDS]
+            queries.append((" ".join(words[j] for j in span), language))
+    return queries[:n_queries]
+
+
+def load_or_generate(workdir, args):
+    """Reuse the corpus in `workdir` when it was generated with the same settings."""
+    data_dir = os.path.join(workdir, "data", "raw")
+    marker = os.path.join(workdir, "corpus.json")
+    settings = {"chunks": args.chunks, "chunks_per_file": args.chunks_per_file,
+                "queries": args.queries, "seed": args.seed}
+
+    if os.path.exists(marker):
+        with open(marker, encoding="utf-8") as f:
+            saved = json.load(f)
+        if saved["settings"] == settings:
+            return data_dir, [tuple(q) for q in saved["queries"]], 0.0
+
+    start = time.perf_counter()
+    for name in os.listdir(data_dir) if os.path.isdir(data_dir) else ():
+        os.remove(os.path.join(data_dir, name))
+    queries = generate_corpus(data_dir, args.chunks, args.chunks_per_file,
+                              args.queries, args.seed)
+    elapsed = time.perf_counter() - start
+    with open(marker, "w", encoding="utf-8") as f:
+        json.dump({"settings": settings, "queries": queries}, f, ensure_ascii=False)
+    return data_dir, queries, elapsed
+
+# -----------------------------
+# Measurements
+# -----------------------------
+def summarize(latencies, n_queries, wall_s):
+    latencies = np.asarray(latencies) * 1000
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]).tolist()
+    return {
+        "queries": n_queries,
+        "qps": round(n_queries / wall_s, 2) if wall_s else None,
+        "mean_ms": round(float(latencies.mean()), 3),
+        "p50_ms": round(p50, 3), "p95_ms": round(p95, 3), "p99_ms": round(p99, 3),
+    }
+
+
+def dir_nbytes(path):
+    return sum(os.path.getsize(os.path.join(root, f))
+               for root, _, files in os.walk(path) for f in files)
+
+
+def run_build(workdir, args, env):
+    """Full build, then a no-op incremental run, in fresh processes."""
+    command = [sys.executable, BUILD_SCRIPT, "--model", "hash",
+               "--index-type", args.index_type, "--format", args.vector_format,
+               "--workers", str(args.workers), "--trace", "histogram"]
+
+    start = time.perf_counter()
+    full = subprocess.run(command + ["--full"], cwd=workdir, env=env,
+                          capture_output=True, text=True)
+    build_s = time.perf_counter() - start
+    with open(os.path.join(workdir, "build.log"), "w", encoding="utf-8") as f:
+        f.write(full.stdout + full.stderr)
+    if full.returncode != 0:
+        raise SystemExit(f"build_index.py failed, see {workdir}/build.log:\n{full.stderr[-2000:]}")
+
+    start = time.perf_counter()
+    subprocess.run(command, cwd=workdir, env=env, capture_output=True, check=True)
+    noop_s = time.perf_counter() - start
+
+    index_dir = os.path.join(workdir, INDEX_SUBDIR)
+    with open(os.path.join(index_dir, "index_meta.json"), encoding="utf-8") as f:
+        meta = json.load(f)
+
+    stages = {}
+    for line in full.stdout.splitlines():
+        if line.startswith("⏱️ "):
+            name, seconds = line[len("⏱️ "):].rsplit(": ", 1)
+            stages[name] = float(seconds.rstrip("s"))
+
+    return {
+        "wall_s": round(build_s, 3),
+        "chunks": meta["ntotal"],
+        "chunks_per_s": round(meta["ntotal"] / build_s, 1),
+        "noop_rebuild_s": round(noop_s, 3),
+        "index_mb": round(dir_nbytes(index_dir) / 2**20, 2),
+        "faiss_mb": round(os.path.getsize(os.path.join(index_dir, "index.faiss")) / 2**20, 2),
+        "params": meta["params"],
+        "languages": meta.get("languages", {}),
+        "stages_s": stages,
+    }
+
+
+def run_cold_start(index_dir, data_dir, query, env):
+    """Fresh interpreter: wall time to the first answer, plus its breakdown."""
+    start = time.perf_counter()
+    probe = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_e2e", "--probe", index_dir,
+         "--probe-data", data_dir, "--probe-query", query],
+        cwd=REPO_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    wall_s = time.perf_counter() - start
+    result = json.loads(probe.stdout.strip().splitlines()[-1])
+    result["process_wall_s"] = round(wall_s, 4)
+    return result
+
+
+def probe(index_dir, data_dir, query):
+    """Runs inside the cold-start subprocess; prints one JSON line."""
+    start = time.perf_counter()
+    from rag.generator import generate_answer
+    from rag.retriever import get_retriever
+    imported = time.perf_counter()
+    use_index(index_dir, data_dir)
+    warmed = time.perf_counter()
+    get_retriever().search(query, k=5)
+    searched = time.perf_counter()
+    generate_answer(query, use_cache=False)
+    done = time.perf_counter()
+    print(json.dumps({
+        "import_s": round(imported - start, 4),
+        "load_s": round(warmed - imported, 4),
+        "first_query_s": round(searched - warmed, 4),
+        "first_answer_s": round(done - searched, 4),
+        "to_first_result_s": round(searched - start, 4),
+        "to_first_answer_s": round(done - start, 4),
+    }))
+
+
+def use_index(index_dir, data_dir):
+    """Point the process-wide retriever, translator and tables at the benchmark corpus."""
+    from rag import retriever, tables, translation
+    retriever._retriever = retriever.WarmRetriever(index_dir=index_dir).warm()
+    translation._translator = translation.Translator(
+        translation.OfflineBackend(), translation.TranslationCache(path=None)
+    )
+    tables._store = tables.TableStore(data_dir=data_dir)
+
+
+def run_queries(queries, k, batch):
+    from rag.generator import generate_answer, stream_answer
+    from rag.retriever import retrieve, retrieve_many
+
+    retrieve(queries[0][0], language=queries[0][1], k=k)     # warm caches before timing
+    results = {}
+
+    latencies, found = [], 0
+    start = time.perf_counter()
+    for query, language in queries:
+        t = time.perf_counter()
+        found += len(retrieve(query, language=language, k=k))
+        latencies.append(time.perf_counter() - t)
+    results["retrieve"] = summarize(latencies, len(queries), time.perf_counter() - start)
+    results["retrieve"]["avg_docs"] = round(found / len(queries), 2)
+
+    latencies = []
+    start = time.perf_counter()
+    for i in range(0, len(queries), batch):
+        chunk = queries[i:i + batch]
+        t = time.perf_counter()
+        retrieve_many([q for q, _ in chunk], language=[lang for _, lang in chunk], k=k)
+        latencies.append(time.perf_counter() - t)
+    results["retrieve_batched"] = summarize(latencies, len(queries), time.perf_counter() - start)
+    results["retrieve_batched"]["batch"] = batch
+
+    for query, language in queries:       # fill the answer cache for the cached pass
+        generate_answer(query, language=language, max_chunks=k)
+
+    for name, use_cache in (("answer", False), ("answer_cached", True)):
+        latencies = []
+        start = time.perf_counter()
+        for query, language in queries:
+            t = time.perf_counter()
+            generate_answer(query, language=language, max_chunks=k, use_cache=use_cache)
+            latencies.append(time.perf_counter() - t)
+        results[name] = summarize(latencies, len(queries), time.perf_counter() - start)
+
+    latencies = []                        # time to the first streamed segment
+    start = time.perf_counter()
+    for query, language in queries:
+        t = time.perf_counter()
+        segments = stream_answer(query, language=language, max_chunks=k, use_cache=False)
+        next(segments)
+        latencies.append(time.perf_counter() - t)
+        for _ in segments:
+            pass
+    results["answer_stream_first"] = summarize(latencies, len(queries), time.perf_counter() - start)
+    return results
+
+# -----------------------------
+# Reporting
+# -----------------------------
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def numeric_leaves(report, prefix=""):
+    leaves = {}
+    for key, value in report.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            leaves.update(numeric_leaves(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            leaves[name] = value
+    return leaves
+
+
+def compare(report, baseline):
+    print(f"\nvs {baseline.get('commit') or 'baseline'}:")
+    print(f"{'metric':<36}{'before':>12}{'after':>12}{'change':>10}")
+    before = numeric_leaves({k: baseline[k] for k in baseline if k not in ("config", "corpus")})
+    after = numeric_leaves({k: report[k] for k in report if k not in ("config", "corpus")})
+    for name in sorted(before.keys() & after.keys()):
+        old, new = before[name], after[name]
+        change = f"{(new - old) / old:+.1%}" if old else "-"
+        print(f"{name:<36}{old:>12g}{new:>12g}{change:>10}")
+
+
+def print_report(report):
+    build, cold = report["build"], report["cold_start"]
+    print(f"Build: {build['chunks']} chunks in {build['wall_s']:.1f}s "
+          f"({build['chunks_per_s']:.0f}/s), index {build['index_mb']:.1f} MB, "
+          f"no-op rebuild {build['noop_rebuild_s']:.2f}s")
+    print(f"Cold start: {cold['process_wall_s']:.2f}s to first answer "
+          f"(import {cold['import_s']:.2f}s, load {cold['load_s']:.2f}s, "
+          f"query {cold['first_query_s']:.3f}s, answer {cold['first_answer_s']:.3f}s)")
+    print(f"{'path':<22}{'qps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name in ("retrieve", "retrieve_batched", "answer", "answer_cached",
+                 "answer_stream_first"):
+        r = report[name]
+        print(f"{name:<22}{r['qps']:>10.1f}{r['p50_ms']:>10.3f}"
+              f"{r['p95_ms']:>10.3f}{r['p99_ms']:>10.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--chunks", type=int, default=10_000)
+    parser.add_argument("--chunks-per-file", type=int, default=200)
+    parser.add_argument("--index-type", default="flat")
+    parser.add_argument("--format", dest="vector_format", default="float32")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--batch", type=int, default=32, help="queries per retrieve_many call")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "aiverse-bench"),
+                        help="corpus + index location (corpus reused across runs)")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--compare", help="earlier --json output to diff against")
+    parser.add_argument("--probe", help=argparse.SUPPRESS)
+    parser.add_argument("--probe-data", help=argparse.SUPPRESS)
+    parser.add_argument("--probe-query", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.probe:
+        probe(args.probe, args.probe_data, args.probe_query)
+        return
+
+    workdir = os.path.abspath(args.workdir)
+    os.makedirs(workdir, exist_ok=True)
+    env = {**os.environ, "AIVERSE_TRANSLATOR": "offline",
+           "PYTHONPATH": os.pathsep.join(filter(None, [REPO_DIR, os.getenv("PYTHONPATH")]))}
+    env.pop("AIVERSE_EMBED_MODEL", None)
+    env.pop("AIVERSE_TRACE", None)
+    os.environ["AIVERSE_TRANSLATOR"] = "offline"
+
+    data_dir, queries, generate_s = load_or_generate(workdir, args)
+    print(f"Corpus: {args.chunks} chunks in {data_dir} "
+          f"({'generated in %.1fs' % generate_s if generate_s else 'reused'}), "
+          f"{len(queries)} queries")
+
+    index_dir = os.path.join(workdir, INDEX_SUBDIR)
+    report = {
+        "commit": git_commit(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "machine": {"python": platform.python_version(), "platform": platform.platform(),
+                    "cpus": os.cpu_count()},
+        "config": {k: v for k, v in vars(args).items()
+                   if k not in ("json", "compare", "probe", "probe_data", "probe_query")},
+        "corpus": {"generate_s": round(generate_s, 2), "bytes": dir_nbytes(data_dir),
+                   "languages": list(LANGUAGES)},
+        "build": run_build(workdir, args, env),
+        "cold_start": run_cold_start(index_dir, data_dir, queries[0][0], env),
+    }
+    use_index(index_dir, data_dir)
+    report.update(run_queries(queries, args.k, args.batch))
+    print_report(report)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
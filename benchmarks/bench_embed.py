@@ -0,0 +1,142 @@
+"""
+Embedding backends on CPU: PyTorch vs ONNX Runtime (fp32 and int8).
+
+Every backend in rag/snapshot.py embeds the same chunks (from the built
+index's docstore, or synthetic report-style sentences) and the same short
+queries. Reports load time, indexing throughput (docs/sec, batched), serving
+latency (one query per call) and how closely the vectors match the PyTorch
+model (min / mean cosine similarity).
+
+    python -m benchmarks.bench_embed
+    python -m benchmarks.bench_embed --model multilingual --threads 4 --json embed.json
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from rag import docstore, snapshot
+from rag.indexing import EMBED_MODELS
+from rag.retriever import VECTORSTORE_DIR, get_embeddings
+
+SUBJECTS = ["Sequoia", "Accel", "Blume Ventures", "Nexus", "Elevation", "Lightspeed"]
+SECTORS = ["fintech", "health-tech", "AI infrastructure", "climate", "edtech", "SaaS"]
+
+
+def corpus_texts(index_dir, n, seed):
+    """Up to `n` chunk texts from the built docstore, else synthetic ones."""
+    rng = np.random.default_rng(seed)
+    if docstore.exists(index_dir):
+        store = docstore.DocStore(index_dir)
+        if len(store):
+            rows = rng.choice(len(store), size=min(n, len(store)), replace=False)
+            return [str(store.text_bytes_at(int(r)), "utf-8") for r in rows], "vectorstore"
+
+    texts = []
+    for _ in range(n):
+        firm, sector = rng.choice(SUBJECTS), rng.choice(SECTORS)
+        amount = int(rng.integers(1, 200))
+        texts.append(
+            f"{firm} led a ${amount}M round in an Indian {sector} startup. "
+            f"The company plans to expand its {sector} product across tier-2 cities "
+            f"and reported revenue growth of {int(rng.integers(20, 300))}% year on year. "
+            * int(rng.integers(1, 4))
+        )
+    return texts, "synthetic"
+
+
+def make_queries(n, seed):
+    rng = np.random.default_rng(seed + 1)
+    return [f"Which investors fund early-stage {rng.choice(SECTORS)} startups like "
+            f"{rng.choice(SUBJECTS)}?" for _ in range(n)]
+
+
+def load_backend(model_name, backend, threads):
+    if backend == "torch":
+        import torch
+        torch.set_num_threads(threads)
+        return get_embeddings(model_name, "torch")
+    return snapshot.encoder(model_name, backend, threads=threads)
+
+
+def run(model_name, backends, texts, queries, batch, threads):
+    reference = None
+    rows = []
+    for backend in backends:
+        start = time.perf_counter()
+        embeddings = load_backend(model_name, backend, threads)
+        load_s = time.perf_counter() - start
+        embeddings.embed_documents(texts[:batch])           # warm up kernels
+
+        start = time.perf_counter()
+        vectors = np.concatenate([
+            np.asarray(embeddings.embed_documents(texts[i:i + batch]), dtype="float32")
+            for i in range(0, len(texts), batch)
+        ])
+        index_s = time.perf_counter() - start
+
+        latencies = []
+        for query in queries:
+            t = time.perf_counter()
+            embeddings.embed_query(query)
+            latencies.append((time.perf_counter() - t) * 1000)
+
+        if reference is None and backend == "torch":
+            reference = vectors
+        match = snapshot.parity(reference, vectors) if reference is not None else {}
+        rows.append({
+            "backend": backend,
+            "load_s": round(load_s, 3),
+            "docs_per_s": round(len(texts) / index_s, 1),
+            "query_p50_ms": round(float(np.percentile(latencies, 50)), 3),
+            "query_p99_ms": round(float(np.percentile(latencies, 99)), 3),
+            "min_cosine": match.get("min_cosine"),
+            "mean_cosine": match.get("mean_cosine"),
+        })
+    return rows
+
+
+def print_table(rows):
+    print(f"{'backend':<13}{'load s':>8}{'docs/s':>10}{'q p50 ms':>10}{'q p99 ms':>10}"
+          f"{'min cos':>10}{'mean cos':>10}")
+    for r in rows:
+        cosines = "".join(f"{r[k]:>10.4f}" if r[k] is not None else f"{'-':>10}"
+                          for k in ("min_cosine", "mean_cosine"))
+        print(f"{r['backend']:<13}{r['load_s']:>8.2f}{r['docs_per_s']:>10.1f}"
+              f"{r['query_p50_ms']:>10.3f}{r['query_p99_ms']:>10.3f}{cosines}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--index-dir", default=VECTORSTORE_DIR)
+    parser.add_argument("--model", choices=[m for m in EMBED_MODELS if m != "hash"],
+                        default="english")
+    parser.add_argument("--backends", nargs="+", choices=snapshot.BACKENDS,
+                        default=["torch", "onnx", "onnx_int8"],
+                        help="torch first: the others are compared against it")
+    parser.add_argument("--docs", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--batch", type=int, default=64)
+    parser.add_argument("--threads", type=int, default=snapshot.ONNX_THREADS)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    model_name = EMBED_MODELS[args.model]
+    texts, corpus = corpus_texts(args.index_dir, args.docs, args.seed)
+    queries = make_queries(args.queries, args.seed)
+    print(f"Model: {model_name}, {len(texts)} {corpus} docs, {len(queries)} queries, "
+          f"{args.threads} threads")
+
+    rows = run(model_name, args.backends, texts, queries, args.batch, args.threads)
+    print_table(rows)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"model": model_name, "corpus": corpus, "docs": len(texts),
+                       "threads": args.threads, "results": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Memory, build time, latency and recall of each stored vector format.
+
+Every format in rag/indexing.py (float32, float16, int8 scalar quantization,
+binary codes with float re-ranking) is built for one index type on the same
+vectors and scored against exact float32 search. Vectors come from the built
+flat index when it exists, otherwise from a synthetic clustered corpus.
+
+    python -m benchmarks.bench_formats
+    python -m benchmarks.bench_formats --index-type hnsw --synthetic 200000 --json formats.json
+"""
+import argparse
+import json
+import time
+
+import faiss
+import numpy as np
+
+from benchmarks.bench_ann import corpus_vectors, make_queries, recall_at_k, time_queries
+from rag.indexing import (
+    INDEX_TYPES, VECTOR_FORMATS, BinaryIndex, check_format, index_nbytes,
+    make_index, train_index, with_ids
+)
+from rag.retriever import VECTORSTORE_DIR
+
+
+def resident_nbytes(index) -> int:
+    """Bytes held in RAM once loaded (binary re-rank vectors are memory-mapped)."""
+    if isinstance(index, BinaryIndex):
+        return int(faiss.serialize_index_binary(index.codes).nbytes)
+    return index_nbytes(index)
+
+
+def run(vectors, queries, k, index_type, formats, rerank=None):
+    truth_index = faiss.IndexFlatL2(vectors.shape[1])
+    truth_index.add(vectors)
+    _, truth = truth_index.search(queries, k)
+    ids = np.arange(len(vectors), dtype="int64")
+
+    rows = []
+    for vector_format in formats:
+        try:
+            check_format(index_type, vector_format)
+        except ValueError as e:
+            print(f"skipping {vector_format}: {e}")
+            continue
+
+        start = time.perf_counter()
+        overrides = {"rerank": rerank} if rerank and vector_format == "binary" else {}
+        index, params = make_index(index_type, vectors.shape[1], len(vectors),
+                                   vector_format, **overrides)
+        train_index(index, vectors)
+        index = with_ids(index, index_type)
+        index.add_with_ids(vectors, ids)
+        build_s = time.perf_counter() - start
+
+        latencies, found = time_queries(index, queries, k, None)
+        rows.append({
+            "format": vector_format,
+            "index_type": index_type,
+            "params": params,
+            "build_s": round(build_s, 3),
+            "memory_mb": round(index_nbytes(index) / 2**20, 2),
+            "resident_mb": round(resident_nbytes(index) / 2**20, 2),
+            f"recall@{k}": round(recall_at_k(found, truth), 4),
+            "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+            "p99_ms": round(float(np.percentile(latencies, 99)), 3),
+        })
+    return rows
+
+
+def print_table(rows, k):
+    print(f"{'format':<10}{'recall@' + str(k):>12}{'p50 ms':>10}{'p99 ms':>10}"
+          f"{'mem MB':>10}{'RAM MB':>10}{'build s':>10}")
+    for r in rows:
+        print(f"{r['format']:<10}{r[f'recall@{k}']:>12.4f}{r['p50_ms']:>10.3f}"
+              f"{r['p99_ms']:>10.3f}{r['memory_mb']:>10.2f}{r['resident_mb']:>10.2f}"
+              f"{r['build_s']:>10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--index-dir", default=VECTORSTORE_DIR)
+    parser.add_argument("--index-type", choices=INDEX_TYPES, default="flat")
+    parser.add_argument("--formats", nargs="+", choices=VECTOR_FORMATS,
+                        default=list(VECTOR_FORMATS))
+    parser.add_argument("--rerank", type=int,
+                        help="binary: Hamming candidates re-ranked per result")
+    parser.add_argument("--synthetic", type=int, default=0,
+                        help="ignore the built index and use N synthetic vectors")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--threads", type=int, help="faiss OpenMP threads")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    if args.threads:
+        faiss.omp_set_num_threads(args.threads)
+
+    vectors, corpus = corpus_vectors(args.index_dir, args.synthetic, args.dim, args.seed)
+    queries = make_queries(vectors, min(args.queries, len(vectors)), args.seed)
+    print(f"Corpus: {corpus} ({len(vectors)} x {vectors.shape[1]}), "
+          f"{len(queries)} queries, k={args.k}, index={args.index_type}")
+
+    rows = run(vectors, queries, args.k, args.index_type, args.formats, args.rerank)
+    print_table(rows, args.k)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"corpus": corpus, "n": len(vectors), "k": args.k,
+                       "index_type": args.index_type, "results": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
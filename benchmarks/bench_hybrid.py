@@ -0,0 +1,111 @@
+"""
+Dense-only vs hybrid (dense + BM25, reciprocal rank fusion) retrieval.
+
+Queries are short spans lifted from random chunks of the built index (firm
+names, CSV field values, phrases), and a query counts as a hit at k when its
+source chunk is in the top-k. Reports hit@k and per-query latency for both
+modes, so the fused latency overhead is visible next to the quality gain.
+
+    python -m benchmarks.bench_hybrid
+    python -m benchmarks.bench_hybrid --queries 1000 --k 1 3 5 --json hybrid.json
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from rag import lexical
+from rag.retriever import VECTORSTORE_DIR, WarmRetriever
+
+
+def make_queries(stores, n, words, seed):
+    """(query, source chunk text) pairs: `words` consecutive tokens from random chunks of any shard."""
+    rng = np.random.default_rng(seed)
+    ends = np.cumsum([len(store) for store in stores])
+    queries = []
+    for i in rng.permutation(int(ends[-1])):
+        shard = int(np.searchsorted(ends, i, side="right"))
+        row = i - (ends[shard - 1] if shard else 0)
+        text = str(stores[shard].text_bytes_at(row), "utf-8")
+        tokens = lexical.tokenize(text)
+        if len(tokens) < words:
+            continue
+        start = int(rng.integers(0, len(tokens) - words + 1))
+        queries.append((" ".join(tokens[start:start + words]), text))
+        if len(queries) >= n:
+            break
+    return queries
+
+
+def time_mode(retriever, queries, k, hybrid):
+    """(latencies ms, retrieved documents) per query, one query at a time."""
+    latencies, found = [], []
+    for query, _ in queries:
+        start = time.perf_counter()
+        docs = retriever.search(query, k=k, hybrid=hybrid)
+        latencies.append((time.perf_counter() - start) * 1000)
+        found.append(docs)
+    return np.asarray(latencies), found
+
+
+def run(retriever, queries, ks):
+    rows = []
+    for hybrid in (False, True):
+        for k in ks:
+            latencies, found = time_mode(retriever, queries, k, hybrid)
+            hits = sum(
+                any(doc.page_content == source for doc in docs)
+                for docs, (_, source) in zip(found, queries)
+            )
+            rows.append({
+                "mode": "hybrid" if hybrid else "dense",
+                "k": k,
+                "hit@k": round(hits / len(queries), 4),
+                "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+                "p99_ms": round(float(np.percentile(latencies, 99)), 3),
+            })
+    return rows
+
+
+def print_table(rows):
+    print(f"{'mode':<8}{'k':>4}{'hit@k':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for r in rows:
+        print(f"{r['mode']:<8}{r['k']:>4}{r['hit@k']:>10.4f}"
+              f"{r['p50_ms']:>10.3f}{r['p99_ms']:>10.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--index-dir", default=VECTORSTORE_DIR)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--words", type=int, default=4, help="tokens per query")
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 3, 5])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    retriever = WarmRetriever(index_dir=args.index_dir).warm()
+    if any(shard.bm25 is None for shard in retriever.shards):
+        raise SystemExit("Index has no BM25 sidecar; rerun `python build_index.py`")
+
+    stores = [shard.store for shard in retriever.shards]
+    chunks = sum(map(len, stores))
+    queries = make_queries(stores, args.queries, args.words, args.seed)
+    if not queries:
+        raise SystemExit("No chunks long enough to sample queries from")
+    print(f"Corpus: {chunks} chunks in {len(stores)} shard(s), {len(queries)} queries "
+          f"of {args.words} tokens")
+
+    retriever.search(queries[0][0], k=max(args.k))      # warm caches before timing
+    rows = run(retriever, queries, args.k)
+    print_table(rows)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"chunks": chunks, "shards": len(stores), "queries": len(queries),
+                       "words": args.words, "results": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
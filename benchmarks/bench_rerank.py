@@ -0,0 +1,129 @@
+"""
+Bi-encoder order vs cross-encoder re-ranking of the retrieved evidence.
+
+Queries are short spans lifted from random chunks of the built index (see
+`bench_hybrid`), and a query's source chunk is the relevant result. The
+bi-encoder row takes the top-k as searched; the re-ranked row searches
+k x CANDIDATES and lets the cross-encoder keep k, within the pass budget.
+Reports hit@k, MRR@k and the latency re-ranking adds per query, on a cold
+score cache and again on a warm one, plus how often the budget forced the
+bi-encoder fallback.
+
+    python -m benchmarks.bench_rerank
+    python -m benchmarks.bench_rerank --budget-ms 30 --k 3 --json rerank.json
+    python -m benchmarks.bench_rerank --model aiverse/overlap-reranker   # offline
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from benchmarks.bench_hybrid import make_queries
+from rag.rerank import PASS_BUDGET_MS, CANDIDATES, RERANK_MODEL, Reranker
+from rag.retriever import VECTORSTORE_DIR, WarmRetriever
+
+
+def rank_of(docs, source):
+    """1-based position of the source chunk in `docs`, 0 if missing."""
+    for rank, doc in enumerate(docs, 1):
+        if doc.page_content == source:
+            return rank
+    return 0
+
+
+def quality(found, queries):
+    ranks = np.asarray([rank_of(docs, source) for docs, (_, source) in zip(found, queries)])
+    return {
+        "hit@k": round(float(np.mean(ranks > 0)), 4),
+        "mrr@k": round(float(np.mean(np.where(ranks > 0, 1 / np.maximum(ranks, 1), 0))), 4),
+    }
+
+
+def latency(values):
+    values = np.asarray(values)
+    return {"p50_ms": round(float(np.percentile(values, 50)), 3),
+            "p99_ms": round(float(np.percentile(values, 99)), 3)}
+
+
+def run(retriever, reranker, queries, k):
+    """Rows for bi-encoder top-k and for re-ranking (cold, then warm score cache)."""
+    search_ms, found = [], []
+    candidates = []
+    for query, _ in queries:
+        start = time.perf_counter()
+        docs = retriever.search(query, k=k * CANDIDATES)
+        search_ms.append((time.perf_counter() - start) * 1000)
+        candidates.append(docs)
+        found.append(docs[:k])
+    rows = [{"mode": "bi-encoder", "k": k, **quality(found, queries),
+             **latency(search_ms), "over_budget": 0.0}]
+
+    reranker.clear()
+    for mode in ("rerank", "rerank (cached)"):
+        before = dict(reranker.stats)
+        added_ms, found = [], []
+        for (query, _), docs in zip(queries, candidates):
+            start = time.perf_counter()
+            found.append(reranker.rerank([query], [docs], k)[0])
+            added_ms.append((time.perf_counter() - start) * 1000)
+        over = reranker.stats["over_budget"] - before["over_budget"]
+        rows.append({"mode": mode, "k": k, **quality(found, queries),
+                     **latency(added_ms), "over_budget": round(over / len(queries), 4),
+                     "cache_hits": reranker.stats["cache_hits"] - before["cache_hits"]})
+    return rows
+
+
+def print_table(rows):
+    print(f"{'mode':<18}{'k':>4}{'hit@k':>9}{'mrr@k':>9}{'p50 ms':>10}{'p99 ms':>10}"
+          f"{'over budget':>13}")
+    for r in rows:
+        print(f"{r['mode']:<18}{r['k']:>4}{r['hit@k']:>9.4f}{r['mrr@k']:>9.4f}"
+              f"{r['p50_ms']:>10.3f}{r['p99_ms']:>10.3f}{r['over_budget']:>13.2%}")
+    print("(bi-encoder latency is the search; re-rank latency is added on top of it)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--index-dir", default=VECTORSTORE_DIR)
+    parser.add_argument("--model", default=RERANK_MODEL)
+    parser.add_argument("--budget-ms", type=float, default=PASS_BUDGET_MS,
+                        help="latency budget of one scoring pass")
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--words", type=int, default=4, help="tokens per query")
+    parser.add_argument("--k", type=int, nargs="+", default=[3, 5])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    retriever = WarmRetriever(index_dir=args.index_dir).warm()
+    stores = [shard.store for shard in retriever.shards]
+    chunks = sum(map(len, stores))
+    queries = make_queries(stores, args.queries, args.words, args.seed)
+    if not queries:
+        raise SystemExit("No chunks long enough to sample queries from")
+
+    start = time.perf_counter()
+    reranker = Reranker(args.model, budget_ms=args.budget_ms).warm()
+    load_s = time.perf_counter() - start
+    print(f"Corpus: {chunks} chunks in {len(stores)} shard(s), {len(queries)} queries "
+          f"of {args.words} tokens")
+    print(f"Re-ranker: {args.model}, loaded in {load_s:.2f}s, "
+          f"{reranker.pair_ms:.3f} ms/pair, budget {args.budget_ms:g} ms")
+
+    retriever.search(queries[0][0], k=max(args.k) * CANDIDATES)     # warm caches before timing
+    rows = []
+    for k in args.k:
+        rows.extend(run(retriever, reranker, queries, k))
+    print_table(rows)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"chunks": chunks, "shards": len(stores), "queries": len(queries),
+                       "words": args.words, "model": args.model, "budget_ms": args.budget_ms,
+                       "load_s": round(load_s, 3), "pair_ms": reranker.pair_ms,
+                       "results": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
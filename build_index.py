@@ -1,25 +1,56 @@
+import argparse
+import csv
+import hashlib
+import json
+import logging
 import os
 import re
+import shutil
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
 from tqdm import tqdm
-from langdetect import detect
+from langdetect import DetectorFactory, detect
 
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import PyPDFLoader, TextLoader
-from langchain_community.vectorstores import FAISS
-from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_core.documents import Document
 
+from rag import dedup, docstore, lexical, shards, snapshot, tracing
+from rag.dedup import NearDuplicateIndex
+from rag.docstore import DocStore, DocStoreWriter
+from rag.hash_embeddings import HashEmbeddings
+from rag.indexing import (
+    EMBED_MODELS, INDEX_TYPES, META_FILE, VECTOR_FORMATS, IndexFeeder, build_meta,
+    check_format, index_nbytes, read_index, read_meta, supports_removal,
+    write_index, write_meta
+)
+from rag.streaming import EmbeddingStream
+
 
 # -------------------------
 # CONFIG
 # -------------------------
 DATA_DIR = "data/raw"
 VECTORSTORE_DIR = "vectorstore/faiss_index"
+MANIFEST_FILE = "manifest.json"
 
-EMBED_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+EMBED_MODEL = EMBED_MODELS["english"]
 CHUNK_SIZE = 500
 CHUNK_OVERLAP = 100
-BATCH_SIZE = 64   # 🔥 critical
+BATCH_SIZE = 64   # 🔥 critical (typical batch; the stream adapts to text length)
+INDEX_TYPE = "flat"
+VECTOR_FORMAT = "float32"   # float16 / int8 / binary shrink resident vectors
+DEDUP_THRESHOLD = dedup.THRESHOLD   # near-duplicate Jaccard cut-off (None = keep copies)
+EMBED_BACKEND = snapshot.EMBED_BACKEND   # torch / onnx / onnx_int8 / torchscript
+WORKERS = os.cpu_count() or 1   # ingestion processes (parse + split + tag)
+META_SUFFIX = ".meta.json"   # per-file metadata sidecar (crawled pages: URL, title, type=web)
+PDF_PAGES_PER_TASK = 32   # PDFs with more pages are split into page ranges across workers
+SHARD_BY = None     # "type" / "hash" = one index per shard under shards/ (None = single index)
+
+# langdetect is randomized; seed it so parallel and serial runs tag identically
+DetectorFactory.seed = 0
 
 os.makedirs(VECTORSTORE_DIR, exist_ok=True)
 
@@ -52,91 +83,673 @@ def detect_language(text: str) -> str:
 # -------------------------
 # Load Documents
 # -------------------------
-def load_documents():
-    documents = []
-
+def list_files():
+    paths = []
     for root, _, files in os.walk(DATA_DIR):
         for file in files:
-            path = os.path.join(root, file)
+            if file.lower().endswith((".pdf", ".txt", ".csv")):
+                paths.append(os.path.join(root, file))
+    return sorted(paths)
 
-            try:
-                if file.lower().endswith(".pdf"):
-                    documents.extend(PyPDFLoader(path).load())
-                elif file.lower().endswith(".txt"):
-                    documents.extend(TextLoader(path, encoding="utf-8").load())
-            except Exception as e:
-                print(f"⚠️ Skipped {file}: {e}")
 
-    return documents
+def load_csv_rows(path):
+    """One document per CSV row as `"k: v | k: v"` text (same layout as ingestion/csv_loader.py)."""
+    with open(path, newline="", encoding="utf-8") as f:
+        return [
+            Document(
+                page_content=" | ".join(f"{k}: {v}" for k, v in row.items()),
+                metadata={"source": path, "row": i}
+            )
+            for i, row in enumerate(csv.DictReader(f))
+        ]
 
 
-# -------------------------
-# Main
-# -------------------------
-def main():
-    print("🔹 Loading documents...")
-    docs = load_documents()
-    print(f"📄 Loaded documents: {len(docs)}")
+def source_meta(path):
+    """Metadata from a source file's sidecar (written by ingestion/crawler.py), or {}."""
+    sidecar = os.path.splitext(path)[0] + META_SUFFIX
+    if not os.path.exists(sidecar):
+        return {}
+    with open(sidecar, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def file_type(path):
+    return (source_meta(path).get("type")
+            or os.path.splitext(path)[1].lower().lstrip(".").replace("txt", "text"))
 
-    print("🔹 Chunking...")
-    splitter = RecursiveCharacterTextSplitter(
+
+def load_pdf_pages(path, pages=None, stats=None):
+    """
+    One Document per page (0-based `page`, like PyPDFLoader), streamed from
+    the file a page at a time; `pages` = (start, stop) limits it to a range.
+    """
+    from ingestion.pdf_loader import iter_pages
+
+    for page, text in iter_pages(path, *(pages or ()), stats=stats):
+        yield Document(page_content=text.strip(), metadata={"source": path, "page": page})
+
+
+def load_file(path, pages=None, stats=None):
+    # loaders import on first use, so no-op runs skip langchain_community
+    from langchain_community.document_loaders import TextLoader
+
+    if path.lower().endswith(".pdf"):
+        return load_pdf_pages(path, pages, stats)
+    if path.lower().endswith(".csv"):
+        return load_csv_rows(path)
+    return TextLoader(path, encoding="utf-8").load()
+
+
+def make_splitter():
+    return RecursiveCharacterTextSplitter(
         chunk_size=CHUNK_SIZE,
         chunk_overlap=CHUNK_OVERLAP
     )
-    chunks = splitter.split_documents(docs)
-    print(f"🧩 Raw chunks: {len(chunks)}")
 
-    print("🔹 Cleaning & tagging...")
+
+def chunk_file(path, splitter=None, pages=None, stats=None):
+    """
+    Load, split, clean and language-tag one file (or a page range of a PDF)
+    -> (texts, metadatas). PDF pages go into the splitter as they are read.
+    """
+    splitter = splitter or make_splitter()
     texts, metadatas = [], []
+    kind = file_type(path)
+    source = source_meta(path).get("source")    # a crawled page cites its URL
+
+    for doc in load_file(path, pages, stats):
+        for chunk in splitter.split_documents([doc]):
+            text = clean_text(chunk.page_content)
+            if not text:
+                continue
+
+            # PDF pages and CSV rows are 0-based; CSV rows go in `page` too
+            page = chunk.metadata.get("page", chunk.metadata.get("row"))
+            texts.append(text)
+            metadatas.append({
+                "source": source or chunk.metadata.get("source", ""),
+                "language": detect_language(text),
+                "type": kind,
+                "page": page + 1 if page is not None else None
+            })
+
+    return texts, metadatas
+
+
+def _chunk_worker(path, pages=None):
+    """Process-pool entry point -> (path, texts, metadatas, error, stats)."""
+    stats = {"start": time.time()}
+    try:
+        texts, metadatas = chunk_file(path, pages=pages, stats=stats)
+        error = None
+    except Exception as e:
+        texts, metadatas, error = [], [], e
+    stats["end"] = time.time()
+    return path, texts, metadatas, error, stats
 
-    for chunk in tqdm(chunks):
-        text = clean_text(chunk.page_content)
-        if not text:
-            continue
 
-        texts.append(text)
-        metadatas.append({
-            "source": chunk.metadata.get("source", ""),
-            "language": detect_language(text)
-        })
+def chunk_tasks(paths):
+    """(path, page range or None, last task of the file) per work item."""
+    from ingestion.pdf_loader import page_count, page_ranges
 
-    print(f"✅ Clean chunks ready: {len(texts)}")
+    for path in paths:
+        ranges = []
+        if path.lower().endswith(".pdf"):
+            try:
+                ranges = page_ranges(page_count(path), PDF_PAGES_PER_TASK)
+            except Exception:
+                pass        # the worker reports the error
+        if len(ranges) <= 1:
+            yield path, None, True
+            continue
+        for n, pages in enumerate(ranges, 1):
+            yield path, pages, n == len(ranges)
+
+
+def _merge_parts(parts):
+    """One file's (path, texts, metadatas, error) from its page-range results, in page order."""
+    path = parts[0][0]
+    errors = [error for _, _, _, error, _ in parts if error is not None]
+    if errors:
+        return path, [], [], errors[0]
+
+    pages = sum(stats.get("pages", 0) for *_, stats in parts)
+    if pages:
+        report_pdf(path, pages, parts)
+        tracing.count("build.pdf_pages", pages)
+    return (path, [t for _, texts, _, _, _ in parts for t in texts],
+            [m for _, _, metadatas, _, _ in parts for m in metadatas], None)
+
+
+def report_pdf(path, pages, parts):
+    """Per-file extraction throughput, plus wall time from first range start to last range end."""
+    wall = (max(stats["end"] for *_, stats in parts)
+            - min(stats["start"] for *_, stats in parts))
+    extract_s = max(sum(stats.get("extract_s", 0.0) for *_, stats in parts), 1e-9)
+    mb = os.path.getsize(path) / 1e6
+    tqdm.write(f"📄 {os.path.basename(path)}: {pages} pages ({mb:.1f} MB) in {wall:.2f}s over "
+               f"{len(parts)} range(s); extraction {pages / extract_s:.0f} pages/s, "
+               f"{mb / extract_s:.2f} MB/s per worker")
+
+
+def chunk_files(paths, workers=WORKERS):
+    """
+    Chunk files on a process pool. PDFs longer than PDF_PAGES_PER_TASK pages
+    are split into page ranges chunked by different workers. Results come
+    back per file in input order (so the index matches a serial run) and at
+    most 2 x workers files or page ranges are in flight, which bounds memory
+    while the caller embeds what is already done.
+    """
+    if workers <= 1:
+        for path in paths:
+            yield _merge_parts([_chunk_worker(path)])
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        in_flight = deque()
+        parts = []
+
+        def next_file():
+            """Collect the oldest task; the merged file once its last range is in."""
+            future, last = in_flight.popleft()
+            parts.append(future.result())
+            if last:
+                merged = _merge_parts(parts)
+                parts.clear()
+                return merged
+
+        for path, pages, last in chunk_tasks(paths):
+            in_flight.append((pool.submit(_chunk_worker, path, pages), last))
+            if len(in_flight) >= 2 * workers:
+                merged = next_file()
+                if merged:
+                    yield merged
+        while in_flight:
+            merged = next_file()
+            if merged:
+                yield merged
 
-    # -------------------------
-    # Embedding (SAFE MODE)
-    # -------------------------
-    print("🔹 Loading embedding model...")
-    embeddings = HuggingFaceEmbeddings(model_name=EMBED_MODEL)
 
-    vectorstore = None
-    failed = 0
+# -------------------------
+# Manifest
+# -------------------------
+# manifest.json sits next to the index and records, per source file, its
+# content hash and the (faiss id, chunk hash) of every chunk it produced, so a
+# rebuild only touches files whose bytes changed.
+def sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def sha256_text(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def load_manifest(index_dir=VECTORSTORE_DIR):
+    path = os.path.join(index_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(manifest, index_dir=VECTORSTORE_DIR):
+    path = os.path.join(index_dir, MANIFEST_FILE)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(path + ".tmp", path)
+
+
+def manifest_settings(index_type, embed_model, vector_format=VECTOR_FORMAT,
+                      dedup_threshold=DEDUP_THRESHOLD, backend=EMBED_BACKEND):
+    """Anything that, if changed, invalidates every stored vector."""
+    return {
+        "dedup": dedup_threshold,
+        "index_type": index_type,
+        "vector_format": vector_format,
+        "embed_model": embed_model,
+        # int8 vectors must not be mixed into a full-precision index (or back)
+        "embed_precision": ("float32" if embed_model == EMBED_MODELS["hash"]
+                            else snapshot.precision(backend)),
+        "chunk_size": CHUNK_SIZE,
+        "chunk_overlap": CHUNK_OVERLAP,
+        "docstore": docstore.VERSION,
+    }
+
+
+def diff_files(manifest, file_hashes):
+    old = manifest["files"]
+    added = [p for p in file_hashes if p not in old]
+    changed = [p for p in file_hashes if p in old and old[p]["sha256"] != file_hashes[p]]
+    deleted = [p for p in old if p not in file_hashes]
+    return added, changed, deleted
 
-    print("🔹 Building FAISS index (batch-safe)...")
 
-    for i in tqdm(range(0, len(texts), BATCH_SIZE)):
-        batch_texts = texts[i:i + BATCH_SIZE]
-        batch_meta = metadatas[i:i + BATCH_SIZE]
+# -------------------------
+# Main
+# -------------------------
+def main(index_type=INDEX_TYPE, embed_model=EMBED_MODEL, full=False,
+         workers=WORKERS, vector_format=VECTOR_FORMAT,
+         dedup_threshold=DEDUP_THRESHOLD, backend=EMBED_BACKEND,
+         index_dir=VECTORSTORE_DIR, paths=None, **index_params):
+    """Build or update the index in `index_dir` from `paths` (default: every source file)."""
+    check_format(index_type, vector_format)
+    start = time.perf_counter()
+    index_path = os.path.join(index_dir, "index.faiss")
+    os.makedirs(index_dir, exist_ok=True)
+    if paths is None:
+        paths = list_files()
+    settings = manifest_settings(index_type, embed_model, vector_format, dedup_threshold,
+                                 backend)
+    manifest = None if full else load_manifest(index_dir)
+    if manifest and "embed_precision" not in manifest["settings"]:
+        # manifests from before precision was recorded: index_meta.json has the backend
+        built_with = read_meta(index_dir).get("embed_backend", "torch")
+        manifest["settings"]["embed_precision"] = (
+            "float32" if manifest["settings"].get("embed_model") == EMBED_MODELS["hash"]
+            else snapshot.precision(built_with))
+
+    if manifest and manifest["settings"] != settings:
+        print("🔁 Index settings changed, rebuilding from scratch")
+        manifest = None
+    if manifest and not (os.path.exists(index_path) and docstore.exists(index_dir)):
+        manifest = None
+
+    print("🔹 Hashing source files...")
+    with tracing.span("build.hash") as span:
+        file_hashes = {path: sha256_file(path) for path in paths}
+        span.set(files=len(file_hashes))
+
+    if manifest is None:
+        manifest = {"settings": settings, "next_id": 0, "files": {}}
+
+    added, changed, deleted = diff_files(manifest, file_hashes)
+    print(f"📄 Files: {len(file_hashes)} "
+          f"(+{len(added)} added, ~{len(changed)} changed, -{len(deleted)} deleted)")
+
+    if not (added or changed or deleted):
+        if manifest["files"] and not lexical.exists(index_dir):
+            terms = lexical.build(index_dir, DocStore(index_dir))
+            print(f"🔤 Built missing BM25 index ({terms} terms)")
+        print("✅ Index is up to date, nothing to do")
+        return
+
+    if (changed or deleted) and not supports_removal(index_type):
+        print(f"🔁 {index_type} indexes cannot remove vectors, rebuilding from scratch")
+        manifest = {"settings": settings, "next_id": 0, "files": {}}
+        added, changed, deleted = diff_files(manifest, file_hashes)
+
+    print(f"🔹 Loading embedding model {embed_model} ({backend})...")
+    with tracing.span("build.model_load", model=embed_model, backend=backend):
+        if embed_model == EMBED_MODELS["hash"]:
+            embeddings = HashEmbeddings(embed_model)
+        elif backend != "torch":
+            embeddings = snapshot.encoder(embed_model, backend)
+        else:
+            from langchain_huggingface import HuggingFaceEmbeddings
+            embeddings = HuggingFaceEmbeddings(model_name=embed_model)
+
+    old_store = None
+    if manifest["files"]:
+        print(f"🔹 Updating {index_type} FAISS index in place...")
+        old_store = DocStore(index_dir)
+        meta = read_meta(index_dir)
+        feeder = IndexFeeder(index_type, read_index(index_path, meta),
+                             vector_format=vector_format)
+        feeder.params = meta["params"]
+    else:
+        print(f"🔹 Building {index_type} ({vector_format}) FAISS index...")
+        feeder = IndexFeeder(index_type, vector_format=vector_format, **index_params)
+
+    # New chunks stream straight into the (memory-mapped, pickle-free) docstore,
+    # and only they are tokenized for BM25
+    writer = DocStoreWriter(index_dir)
+    bm25 = lexical.BM25Writer(index_dir)
 
-        try:
-            if vectorstore is None:
-                vectorstore = FAISS.from_texts(
-                    batch_texts,
-                    embeddings,
-                    metadatas=batch_meta
-                )
-            else:
-                vectorstore.add_texts(batch_texts, metadatas=batch_meta)
+    # -------------------------
+    # Chunk only what changed (process pool) → embed (streaming) → insert
+    # -------------------------
+    stale_ids = []
+    kept_chunks = {}     # path -> manifest entries of chunks whose vectors are reused
+    new_chunks = {}      # path -> manifest entries of freshly embedded chunks
+    dup_chunks = {}      # path -> manifest entries of chunks dropped as copies of another
+
+    # Near-duplicate filter (MinHash + LSH) over every chunk in the index
+    dupes = None
+    if dedup_threshold:
+        dupes = (NearDuplicateIndex.load(index_dir, dedup_threshold) if manifest["files"]
+                 else NearDuplicateIndex(dedup_threshold))
+
+    # Chunks of deleted files leave the index before new chunks are compared
+    for path in deleted:
+        stale_ids.extend(e["id"] for e in manifest["files"].pop(path)["chunks"] if "id" in e)
+    if dupes is not None:
+        dupes.remove(stale_ids)
+    first_new_id = manifest["next_id"]
+
+    def keep_or_drop(path, text, meta):
+        """(faiss id, path, text, metadata) to embed, or None if the chunk copies a kept one."""
+        faiss_id = manifest["next_id"]
+        original = dupes.check(faiss_id, text) if dupes is not None else None
+        if original is not None:
+            dup_chunks.setdefault(path, []).append({"hash": sha256_text(text), "dup_of": original})
+            return None
+        manifest["next_id"] += 1
+        return faiss_id, path, text, meta
+
+    def changed_chunks():
+        """Yield a record for every chunk that needs a new vector."""
+        paths = added + changed
+        for path, texts, metadatas, error in tqdm(chunk_files(paths, workers), total=len(paths)):
+            if error is not None:
+                print(f"⚠️ Skipped {os.path.basename(path)}: {error}")
+                file_hashes.pop(path)
+                continue
+
+            # Chunks whose text is unchanged keep their vectors
+            reusable = {}
+            for entry in manifest["files"].get(path, {}).get("chunks", []):
+                if "id" in entry:
+                    reusable.setdefault(entry["hash"], []).append(entry["id"])
+
+            kept = kept_chunks.setdefault(path, [])
+            fresh = []
+            for text, meta in zip(texts, metadatas):
+                chunk_hash = sha256_text(text)
+                if reusable.get(chunk_hash):
+                    kept.append({"id": reusable[chunk_hash].pop(), "hash": chunk_hash})
+                else:
+                    fresh.append((text, meta))
+
+            # Old chunks this file no longer produces can't be dedup targets
+            stale = [i for ids in reusable.values() for i in ids]
+            stale_ids.extend(stale)
+            if dupes is not None:
+                dupes.remove(stale)
+
+            for text, meta in fresh:
+                record = keep_or_drop(path, text, meta)
+                if record:
+                    yield record
+
+        yield from orphaned_chunks(set(stale_ids))
+
+    def orphaned_chunks(stale):
+        """Chunks dropped as copies of a chunk that has since left the index."""
+        orphans = {}
+        for path in file_hashes:
+            entries = (dup_chunks.get(path, []) if path in kept_chunks
+                       else manifest["files"].get(path, {}).get("chunks", []))
+            hashes = Counter(e["hash"] for e in entries if e.get("dup_of") in stale)
+            if hashes:
+                orphans[path] = hashes
+        if not orphans:
+            return
+
+        print(f"🔹 Re-checking {len(orphans)} file(s) whose duplicate chunks lost their original...")
+        for path, texts, metadatas, error in chunk_files(list(orphans), workers):
+            if error is not None:
+                print(f"⚠️ Skipped {os.path.basename(path)}: {error}")
+                continue
+            if path not in kept_chunks:
+                entries = manifest["files"][path]["chunks"]
+                kept_chunks[path] = [e for e in entries if "id" in e]
+                dup_chunks[path] = entries
+            dup_chunks[path] = [e for e in dup_chunks[path]
+                                if "dup_of" in e and e["dup_of"] not in stale]
+
+            wanted = orphans[path]
+            for text, meta in zip(texts, metadatas):
+                chunk_hash = sha256_text(text)
+                if wanted[chunk_hash] > 0:
+                    wanted[chunk_hash] -= 1
+                    record = keep_or_drop(path, text, meta)
+                    if record:
+                        yield record
+
+    print(f"🔹 Chunking ({workers} workers), embedding & indexing changed files...")
+    stream = EmbeddingStream(
+        embeddings.embed_documents, max_batch=4 * BATCH_SIZE,
+        batch_chars=BATCH_SIZE * CHUNK_SIZE
+    )
 
-        except Exception as e:
-            failed += len(batch_texts)
-            print(f"⚠️ Skipped batch {i}-{i+BATCH_SIZE}: {e}")
+    # One span for the overlapped chunk → embed → insert pipeline
+    with tracing.span("build.embed_index", index_type=index_type, files=len(added + changed)):
+        for vectors, records in stream(changed_chunks(), text_of=lambda record: record[2]):
+            feeder.add(vectors, np.asarray([record[0] for record in records], dtype="int64"))
 
-    vectorstore.save_local(VECTORSTORE_DIR)
+            for faiss_id, path, text, meta in records:
+                writer.add(faiss_id, text, meta)
+                bm25.add(faiss_id, text)
+                new_chunks.setdefault(path, []).append(
+                    {"id": faiss_id, "hash": sha256_text(text)}
+                )
+    tracing.count("build.chunks_embedded", stream.stats["embedded"])
+    tracing.count("build.chunks_failed", stream.stats["failed"])
+
+    if dupes is not None:
+        # chunks that failed to embed never made it into the index
+        embedded = {e["id"] for entries in new_chunks.values() for e in entries}
+        dupes.remove(set(range(first_new_id, manifest["next_id"])) - embedded)
+
+    with tracing.span("build.train_flush"):
+        index = feeder.close()
+    if index is None:
+        writer.abort()
+        print("⚠️ No chunks could be embedded, index not written")
+        return
+    if feeder.train_s:
+        print(f"🏋️ Trained {index_type} index in {feeder.train_s:.1f}s")
+
+    if stale_ids:
+        with tracing.span("build.remove_stale", vectors=len(stale_ids)):
+            index.remove_ids(np.asarray(stale_ids, dtype="int64"))
+        tracing.count("build.stale_removed", len(stale_ids))
+    if old_store is not None:
+        with tracing.span("build.copy_docstore"):
+            surviving = np.setdiff1d(old_store.faiss_ids, np.asarray(stale_ids, dtype="int64"))
+            writer.copy_from(old_store, surviving)
+
+    for path in kept_chunks:
+        manifest["files"][path] = {
+            "sha256": file_hashes[path],
+            "chunks": kept_chunks[path] + new_chunks.get(path, []) + dup_chunks.get(path, []),
+        }
+
+    with tracing.span("build.write", vectors=index.ntotal):
+        write_index(index, index_path)
+        writer.close()
+        if dupes is not None:
+            dupes.save(index_dir)
+
+    # BM25: new postings are merged in and stale ids dropped (ids match the FAISS index)
+    store = DocStore(index_dir)
+    with tracing.span("build.bm25"):
+        if old_store is None:
+            terms = bm25.close()
+        elif lexical.exists(index_dir):
+            terms = bm25.merge(stale_ids)
+        else:
+            terms = lexical.build(index_dir, store)
+    languages = Counter(store.labels("language", default="en"))
+    write_meta(index_dir, build_meta(
+        index_type, feeder.params, index, embed_model, vector_format,
+        build_s=round(time.perf_counter() - start, 2),
+        embed_backend=backend,
+        languages=dict(languages)
+    ))
+    save_manifest(manifest, index_dir)
 
     print("🎉 FAISS index built successfully!")
-    print(f"📁 Stored at: {VECTORSTORE_DIR}")
-    print(f"❌ Failed chunks skipped: {failed}")
+    print(f"📁 Stored at: {index_dir} ({index.ntotal} vectors)")
+    print(f"⚙️ Index: {index_type} ({vector_format}) {feeder.params}, "
+          f"{index_nbytes(index) / 2**20:.1f} MB")
+    print(f"🔤 BM25 index: {terms} terms")
+    print(f"🧮 Embedded {stream.stats['embedded']} chunks in {stream.stats['batches']} batches "
+          f"(padding waste {stream.padding_waste():.0%}), stale removed: {len(stale_ids)}")
+    print(f"❌ Failed chunks skipped: {stream.stats['failed']}")
+    if dupes is not None:
+        stats = dupes.stats
+        tracing.count("build.duplicates_dropped", dupes.dropped())
+        print(f"🧹 Dedup: {stats['checked']} new chunks checked, dropped {stats['exact']} exact "
+              f"+ {stats['near']} near duplicates ({stats['dropped_chars']:,} chars not embedded, "
+              f"{stats['candidates']} LSH candidates compared)")
+    for name, stage in tracing.get_tracer().snapshot()["spans"].items():
+        print(f"⏱️ {name}: {stage['total_s']:.2f}s")
+
+
+def _build_shard(name, shard_paths, kwargs):
+    """Process-pool entry point: build or update one shard -> (name, error)."""
+    try:
+        main(index_dir=shards.shard_dir(VECTORSTORE_DIR, name), paths=shard_paths, **kwargs)
+        return name, None
+    except Exception as e:
+        return name, e
+
+
+def clear_single_index(index_dir=VECTORSTORE_DIR):
+    """Remove the files of an unsharded index (encoder snapshots stay); returns bytes freed."""
+    prefixes = ("index.faiss", META_FILE, MANIFEST_FILE,
+                f"{docstore.PREFIX}.", f"{lexical.PREFIX}.", f"{dedup.PREFIX}.")
+    freed = 0
+    for name in os.listdir(index_dir) if os.path.isdir(index_dir) else []:
+        path = os.path.join(index_dir, name)
+        if name.startswith(prefixes) and os.path.isfile(path):
+            freed += os.path.getsize(path)
+            os.remove(path)
+    return freed
+
+
+def build_shards(shard_by="type", num_shards=shards.NUM_HASH_SHARDS, only=None,
+                 workers=WORKERS, **kwargs):
+    """
+    Split source files into shards (by source type or path hash) and build
+    each shard as its own index, all shards in parallel processes. Every
+    shard keeps its own manifest, so unchanged shards are no-ops and `only`
+    rebuilds a single shard without touching the others.
+    """
+    layout = {"shard_by": shard_by,
+              "num_shards": num_shards if shard_by == "hash" else None}
+    current = shards.read_layout(VECTORSTORE_DIR)
+    if current and {k: current.get(k) for k in layout} != layout:
+        print("🔁 Shard layout changed, rebuilding every shard")
+        shards.clear(VECTORSTORE_DIR)
+
+    groups = {}
+    for path in list_files():
+        groups.setdefault(shards.shard_name(path, file_type(path), shard_by, num_shards),
+                          []).append(path)
+
+    # Shards whose sources are all gone
+    root = os.path.join(VECTORSTORE_DIR, shards.SHARDS_DIR)
+    for name in (os.listdir(root) if os.path.isdir(root) else []):
+        if name not in groups:
+            print(f"🗑️ Removing empty shard {name}")
+            shutil.rmtree(shards.shard_dir(VECTORSTORE_DIR, name))
+
+    todo = {name: paths for name, paths in groups.items() if only in (None, name)}
+    if only is not None and not todo:
+        raise ValueError(f"No source files belong to shard '{only}' (shards: {sorted(groups)})")
+    if not todo:
+        print("⚠️ No source files found, nothing to shard")
+        return
+
+    print(f"🧩 Building {len(todo)} of {len(groups)} shard(s) by {shard_by}: "
+          + ", ".join(f"{name} ({len(paths)} files)" for name, paths in sorted(todo.items())))
+    kwargs["workers"] = max(1, workers // len(todo))
+    failed = []
+    with ProcessPoolExecutor(max_workers=len(todo)) as pool:
+        futures = [pool.submit(_build_shard, name, paths, kwargs)
+                   for name, paths in sorted(todo.items())]
+        for future in as_completed(futures):
+            name, error = future.result()
+            if error is not None:
+                print(f"⚠️ Shard {name} failed: {error}")
+                failed.append(name)
+
+    built = [name for name in sorted(groups)
+             if os.path.exists(os.path.join(shards.shard_dir(VECTORSTORE_DIR, name), "index.faiss"))]
+    shards.write_layout(VECTORSTORE_DIR, {**layout, "shards": built})
+
+    # A previous unsharded build is never read once shards.json exists
+    freed = clear_single_index(VECTORSTORE_DIR)
+    if freed:
+        print(f"🗑️ Removed the unsharded index ({freed / 1e6:.1f} MB)")
+    print(f"🧩 Shards: {', '.join(built) or 'none'}")
+    if failed:
+        print(f"❌ Failed shards: {', '.join(failed)}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Build the AiVerse FAISS index")
+    parser.add_argument("--index-type", choices=INDEX_TYPES, default=INDEX_TYPE)
+    parser.add_argument("--format", choices=VECTOR_FORMATS, default=VECTOR_FORMAT,
+                        dest="vector_format",
+                        help="stored vector precision (binary = flat only, float re-ranked)")
+    parser.add_argument("--full", action="store_true",
+                        help="ignore the manifest and rebuild every file")
+    parser.add_argument("--no-dedup", action="store_true",
+                        help="keep near-duplicate chunks (boilerplate, repeated tables)")
+    parser.add_argument("--workers", type=int, default=WORKERS,
+                        help="ingestion processes (1 = serial)")
+    parser.add_argument("--model", choices=EMBED_MODELS, default="english",
+                        help="multilingual = cross-lingual index, queries skip translation; "
+                             "hash = offline feature hashing (benchmarks)")
+    parser.add_argument("--nlist", type=int, help="IVF cells")
+    parser.add_argument("--nprobe", type=int, help="IVF cells probed per query")
+    parser.add_argument("--pq-m", type=int, dest="m", help="PQ sub-quantizers")
+    parser.add_argument("--pq-nbits", type=int, dest="nbits", help="bits per PQ code")
+    parser.add_argument("--hnsw-m", type=int, dest="M", help="HNSW neighbours per node")
+    parser.add_argument("--ef-construction", type=int, help="HNSW build beam width")
+    parser.add_argument("--ef-search", type=int, help="HNSW query beam width")
+    parser.add_argument("--rerank", type=int,
+                        help="binary format: Hamming candidates re-ranked per result")
+    parser.add_argument("--backend", choices=snapshot.BACKENDS, default=EMBED_BACKEND,
+                        help="embedding runtime: onnx_int8 = int8 ONNX Runtime on CPU")
+    parser.add_argument("--snapshot", choices=snapshot.KINDS,
+                        help="also export a fast-loading encoder snapshot next to the index")
+    parser.add_argument("--shard-by", choices=shards.SHARD_BY, default=SHARD_BY,
+                        help="one index per source type / path-hash bucket, built in parallel")
+    parser.add_argument("--num-shards", type=int, default=shards.NUM_HASH_SHARDS,
+                        help="hash sharding: number of shards")
+    parser.add_argument("--shard", dest="only_shard",
+                        help="with --shard-by: rebuild only this shard (e.g. pdf)")
+    parser.add_argument("--trace", nargs="+", choices=tracing.EXPORTERS,
+                        help="per-stage span exporters (histogram = timing summary)")
+    args = vars(parser.parse_args())
+
+    trace = args.pop("trace")
+    if trace:
+        tracing.get_tracer().configure(*trace)
+        logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    index_type = args.pop("index_type")
+    embed_model = EMBED_MODELS[args.pop("model")]
+    full = args.pop("full")
+    workers = args.pop("workers")
+    vector_format = args.pop("vector_format")
+    dedup_threshold = None if args.pop("no_dedup") else DEDUP_THRESHOLD
+    snapshot_kind = args.pop("snapshot")
+    shard_by, num_shards, only = args.pop("shard_by"), args.pop("num_shards"), args.pop("only_shard")
+    sharding = shard_by and {"shard_by": shard_by, "num_shards": num_shards, "only": only}
+    return (index_type, embed_model, full, workers, vector_format, dedup_threshold,
+            snapshot_kind, sharding, {k: v for k, v in args.items() if v is not None})
 
 
 if __name__ == "__main__":
-    main()
+    (index_type, embed_model, full, workers, vector_format, dedup_threshold,
+     snapshot_kind, sharding, index_params) = parse_args()
+    if sharding:
+        build_shards(**sharding, workers=workers, index_type=index_type,
+                     embed_model=embed_model, full=full, vector_format=vector_format,
+                     dedup_threshold=dedup_threshold, **index_params)
+    else:
+        shards.clear(VECTORSTORE_DIR)
+        main(index_type, embed_model, full, workers, vector_format, dedup_threshold,
+             **index_params)
+    if snapshot_kind:
+        print(f"📦 Exporting {snapshot_kind} encoder snapshot...")
+        print(f"📦 Snapshot written to {snapshot.export(VECTORSTORE_DIR, snapshot_kind, embed_model)}")
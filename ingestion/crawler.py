@@ -0,0 +1,416 @@
+"""
+Concurrent web crawler for policy and news pages.
+
+    python ingestion/crawler.py --urls urls.txt
+    python ingestion/crawler.py --sitemap https://example.gov/sitemap.xml --rate 1
+
+Pages are fetched on a thread pool through one pooled `requests.Session`
+(keep-alive connections are reused per host), with a per-host limit on
+concurrent requests and request rate. ETag / Last-Modified validators are
+kept in a state file, so re-runs send conditional requests and unchanged
+pages (304, or the same extracted text) are skipped. HTML is parsed with
+lxml; the text of every page is written to `data/raw/web/<host>/` where
+`build_index.py` picks it up incrementally, with a `.meta.json` sidecar that
+makes the URL the chunks' source and `web` their type. A page's validators
+are saved only once its files are on disk.
+"""
+import argparse
+import gzip
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from itertools import zip_longest
+from urllib.parse import urlsplit
+
+import requests
+from lxml import etree, html
+from requests.adapters import HTTPAdapter
+
+# -----------------------------
+# Config
+# -----------------------------
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STATE_PATH = os.path.join(BASE_DIR, "cache", "crawl_state.json")
+OUT_DIR = os.path.join(BASE_DIR, "data", "raw", "web")
+
+WORKERS = 16              # fetch threads across all hosts
+PER_HOST = 2              # concurrent requests (and pooled connections) per host
+RATE = 2.0                # requests per second per host (0 = unlimited)
+TIMEOUT = 10
+RETRIES = 2               # on connection errors, 429 and 5xx
+BACKOFF_S = 1.0           # first retry delay, doubled per attempt (Retry-After wins)
+USER_AGENT = "AiVerse-crawler/1.0 (+https://github.com/Subha-k07/Aiverse-RAG)"
+
+SKIP_TAGS = ("script", "style", "noscript", "template", "svg", "iframe",
+             "nav", "header", "footer", "aside", "form")
+BLOCK_TAGS = ("h1", "h2", "h3", "h4", "h5", "h6", "p", "li", "dt", "dd",
+              "td", "th", "pre", "blockquote", "figcaption")
+MIN_TEXT = 50             # pages with less extracted text are not kept
+META_SUFFIX = ".meta.json"   # page metadata sidecar, read by build_index.py
+MAX_SITEMAP_BYTES = 50 * 2**20   # sitemap size limit (sitemaps.org), after decompression
+WEB_SCHEMES = ("http", "https")
+
+_META_CHARSET = re.compile(rb"""<meta[^>]+charset=["']?([\w-]+)""", re.I)
+
+# -----------------------------
+# Parsing
+# -----------------------------
+def _encoding(response) -> str:
+    """Header charset, else the page's <meta charset>, else UTF-8."""
+    if "charset" in response.headers.get("Content-Type", "").lower():
+        return response.encoding
+    match = _META_CHARSET.search(response.content[:2048])
+    return match.group(1).decode("ascii") if match else "utf-8"
+
+
+def extract_text(content: bytes, encoding: str = "utf-8"):
+    """(title, text) of an HTML page: block-level text, without scripts and page chrome."""
+    try:
+        doc = html.document_fromstring(content, parser=html.HTMLParser(encoding=encoding))
+    except (etree.ParserError, LookupError):
+        return "", ""
+
+    title = " ".join((doc.findtext(".//title") or "").split())
+    for element in doc.xpath("|".join(f"//{tag}" for tag in SKIP_TAGS)):
+        element.drop_tree()
+
+    blocks = []
+    for element in doc.iter(*BLOCK_TAGS):
+        # Nested blocks (a <p> in an <li>) are part of their outermost block
+        if any(parent.tag in BLOCK_TAGS for parent in element.iterancestors()):
+            continue
+        text = " ".join(element.text_content().split())
+        if text:
+            blocks.append(text)
+    if not blocks:      # div-only layouts
+        body = doc.find("body")
+        blocks = [" ".join((body if body is not None else doc).text_content().split())]
+    return title, "\n".join(blocks).strip()
+
+
+def parse_sitemap(content: bytes, limit: int = MAX_SITEMAP_BYTES):
+    """
+    (page URLs, nested sitemap URLs) of a sitemap or sitemap index (gzip or
+    plain). Sitemaps larger than `limit` bytes, decompressed, are refused
+    without inflating more than that.
+    """
+    if content[:2] == b"\x1f\x8b":
+        with gzip.GzipFile(fileobj=io.BytesIO(content)) as f:
+            content = f.read(limit + 1)
+    if len(content) > limit:
+        raise ValueError(f"Sitemap exceeds {limit:,} bytes uncompressed")
+    root = etree.fromstring(content, parser=etree.XMLParser(resolve_entities=False))
+    locs = [loc.strip() for loc in root.xpath("//*[local-name()='loc']/text()")]
+    if etree.QName(root).localname == "sitemapindex":
+        return [], locs
+    return locs, []
+
+
+def _is_web(url: str) -> bool:
+    return urlsplit(url).scheme in WEB_SCHEMES
+
+# -----------------------------
+# Politeness
+# -----------------------------
+class HostLimiter:
+    """At most `concurrency` requests in flight and `rate` request starts per second, per host."""
+
+    def __init__(self, rate: float = RATE, concurrency: int = PER_HOST):
+        self.interval = 1 / rate if rate else 0.0
+        self.concurrency = concurrency
+        self._lock = threading.Lock()
+        self._slots = {}                            # host -> semaphore
+        self._next = defaultdict(float)             # host -> earliest next start (monotonic)
+
+    @contextmanager
+    def slot(self, host: str):
+        with self._lock:
+            semaphore = self._slots.setdefault(host, threading.BoundedSemaphore(self.concurrency))
+        with semaphore:
+            with self._lock:
+                now = time.monotonic()
+                start = max(now, self._next[host])
+                self._next[host] = start + self.interval
+            if start > now:
+                time.sleep(start - now)
+            yield
+
+    def backoff(self, host: str, seconds: float):
+        """Hold every request to `host` for `seconds` (429 / Retry-After)."""
+        with self._lock:
+            self._next[host] = max(self._next[host], time.monotonic() + seconds)
+
+
+def _retry_after(response, default: float) -> float:
+    value = response.headers.get("Retry-After")
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return default
+
+
+def interleave(urls):
+    """Round-robin the URLs across hosts, so one slow host does not hold every worker."""
+    by_host = defaultdict(list)
+    for url in dict.fromkeys(urls):      # drop repeats, keep order
+        by_host[urlsplit(url).netloc].append(url)
+    return [url for batch in zip_longest(*by_host.values()) for url in batch if url]
+
+# -----------------------------
+# Crawler
+# -----------------------------
+class Crawler:
+    """
+    Fetches pages concurrently and returns the new or changed ones as
+    ingestion documents (`{"text", "metadata"}`, like `load_web`).
+    Validators of returned pages stay pending until `commit(url)`, so a page
+    that is never stored is fetched in full again on the next run. With
+    `state_path=None` nothing is remembered and every page is returned.
+    """
+
+    def __init__(self, workers: int = WORKERS, rate: float = RATE, per_host: int = PER_HOST,
+                 state_path: str = STATE_PATH, timeout: float = TIMEOUT, retries: int = RETRIES):
+        self.workers = workers
+        self.timeout = timeout
+        self.retries = retries
+        self.limiter = HostLimiter(rate, per_host)
+
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = USER_AGENT
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=per_host, pool_block=True)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.state_path = state_path
+        self.state = {}                 # url -> {"etag", "last_modified", "sha"}
+        self._pending = {}              # same, for returned pages not yet committed
+        if state_path and os.path.exists(state_path):
+            with open(state_path, encoding="utf-8") as f:
+                self.state = json.load(f)
+        self._lock = threading.Lock()
+
+        self.stats = {"requests": 0, "fetched": 0, "not_modified": 0, "same_content": 0,
+                      "skipped": 0, "failed": 0, "retries": 0, "bytes": 0}
+
+    def _count(self, key: str, n: int = 1):
+        with self._lock:
+            self.stats[key] += n
+
+    def get(self, url: str, headers: dict = None):
+        """GET through the host limiter, retrying connection errors, 429 and 5xx."""
+        host = urlsplit(url).netloc
+        delay = BACKOFF_S
+        for attempt in range(self.retries + 1):
+            last = attempt == self.retries
+            try:
+                with self.limiter.slot(host):
+                    self._count("requests")
+                    response = self.session.get(url, headers=headers, timeout=self.timeout)
+            except requests.RequestException:
+                if last:
+                    raise
+                wait = delay
+            else:
+                if last or (response.status_code != 429 and response.status_code < 500):
+                    return response
+                wait = _retry_after(response, delay)
+            self.limiter.backoff(host, wait)
+            self._count("retries")
+            delay *= 2
+
+    def fetch(self, url: str):
+        """The page as a document, or None when it is unchanged, not HTML or too short."""
+        known = self.state.get(url, {})
+        headers = {}
+        if known.get("etag"):
+            headers["If-None-Match"] = known["etag"]
+        if known.get("last_modified"):
+            headers["If-Modified-Since"] = known["last_modified"]
+
+        response = self.get(url, headers)
+        if response.status_code == 304:
+            self._count("not_modified")
+            return None
+        response.raise_for_status()
+        self._count("bytes", len(response.content))
+        if "html" not in response.headers.get("Content-Type", "text/html"):
+            self._count("skipped")
+            return None
+
+        title, text = extract_text(response.content, _encoding(response))
+        sha = hashlib.sha1(text.encode("utf-8")).hexdigest()
+        validators = {"etag": response.headers.get("ETag"),
+                      "last_modified": response.headers.get("Last-Modified"),
+                      "sha": sha}
+        # Servers without validators: unchanged text is still not re-ingested
+        if sha == known.get("sha") or len(text) < MIN_TEXT:
+            with self._lock:
+                self.state[url] = validators
+            self._count("same_content" if sha == known.get("sha") else "skipped")
+            return None
+
+        with self._lock:
+            self._pending[url] = validators
+        self._count("fetched")
+        return {
+            "text": text,
+            "metadata": {
+                "source": url,
+                "title": title,
+                "type": "web"
+            }
+        }
+
+    def sitemap_urls(self, sitemap: str):
+        """
+        Page URLs of a sitemap, following sitemap indexes. Only `sitemap`
+        itself may be a local file; locations listed inside sitemaps are
+        fetched over HTTP(S) only, and other schemes or paths are skipped.
+        """
+        pending, urls, seen = [(sitemap, True)], [], set()
+        while pending:
+            location, top_level = pending.pop()
+            if location in seen:
+                continue
+            seen.add(location)
+            if top_level and os.path.exists(location):
+                with open(location, "rb") as f:
+                    content = f.read()
+            else:
+                response = self.get(location)
+                response.raise_for_status()
+                content = response.content
+
+            pages, nested = parse_sitemap(content)
+            web_pages = [loc for loc in pages if _is_web(loc)]
+            web_nested = [loc for loc in nested if _is_web(loc)]
+            self._count("skipped", len(pages) + len(nested) - len(web_pages) - len(web_nested))
+            urls.extend(web_pages)
+            pending.extend((loc, False) for loc in web_nested)
+        return urls
+
+    def crawl(self, urls):
+        """New or changed pages among `urls` (in completion order)."""
+        docs = []
+        with ThreadPoolExecutor(self.workers, thread_name_prefix="crawl") as pool:
+            futures = {pool.submit(self.fetch, url): url for url in interleave(urls)}
+            for future in as_completed(futures):
+                try:
+                    doc = future.result()
+                except (requests.RequestException, ValueError) as e:
+                    self._count("failed")
+                    print(f"⚠️ Skipped {futures[future]}: {e}")
+                    continue
+                if doc is not None:
+                    docs.append(doc)
+        return docs
+
+    def commit(self, url: str):
+        """Remember a returned page's validators (call once the page is stored)."""
+        with self._lock:
+            if url in self._pending:
+                self.state[url] = self._pending.pop(url)
+
+    def save(self):
+        if not self.state_path:
+            return
+        os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+        with open(self.state_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(self.state, f)
+        os.replace(self.state_path + ".tmp", self.state_path)
+
+
+def crawl(urls=(), sitemap: str = None, **kwargs):
+    """Ingestion documents for `urls` and / or every page of `sitemap` (no saved state)."""
+    crawler = Crawler(state_path=None, **kwargs)
+    urls = list(urls) + (crawler.sitemap_urls(sitemap) if sitemap else [])
+    return crawler.crawl(urls)
+
+# -----------------------------
+# Output
+# -----------------------------
+def page_path(url: str, out_dir: str = OUT_DIR) -> str:
+    """Stable `.txt` path of a page: `<host>/<path slug>-<url hash>.txt`."""
+    parts = urlsplit(url)
+    slug = re.sub(r"[^A-Za-z0-9]+", "-", parts.path).strip("-")[:80] or "index"
+    digest = hashlib.blake2b(url.encode("utf-8"), digest_size=4).hexdigest()
+    host = re.sub(r"[^A-Za-z0-9.-]+", "_", parts.netloc)
+    return os.path.join(out_dir, host, f"{slug}-{digest}.txt")
+
+
+def write_page(doc, out_dir: str = OUT_DIR) -> str:
+    """Write a page's text and its metadata sidecar (URL, title, type); returns the text path."""
+    path = page_path(doc["metadata"]["source"], out_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(os.path.splitext(path)[0] + META_SUFFIX, "w", encoding="utf-8") as f:
+        json.dump(doc["metadata"], f, ensure_ascii=False)
+    title = doc["metadata"]["title"]
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        f.write(f"{title}\n\n{doc['text']}\n" if title else f"{doc['text']}\n")
+    os.replace(path + ".tmp", path)
+    return path
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Crawl web pages into data/raw for indexing.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--urls", help="text file with one URL per line")
+    source.add_argument("--sitemap", help="sitemap or sitemap index (URL or file)")
+    parser.add_argument("--out", default=OUT_DIR, help="directory the page texts are written to")
+    parser.add_argument("--state", default=STATE_PATH, help="ETag / Last-Modified state file")
+    parser.add_argument("--full", action="store_true",
+                        help="ignore the saved state and fetch every page in full")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--per-host", type=int, default=PER_HOST,
+                        help="concurrent requests per host")
+    parser.add_argument("--rate", type=float, default=RATE,
+                        help="requests per second per host (0 = unlimited)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.full and os.path.exists(args.state):
+        os.remove(args.state)
+
+    crawler = Crawler(workers=args.workers, rate=args.rate, per_host=args.per_host,
+                      state_path=args.state)
+    if args.urls:
+        with open(args.urls, encoding="utf-8") as f:
+            urls = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    else:
+        urls = crawler.sitemap_urls(args.sitemap)
+
+    start = time.perf_counter()
+    docs = crawler.crawl(urls)
+    try:
+        for doc in docs:
+            write_page(doc, args.out)
+            crawler.commit(doc["metadata"]["source"])
+    finally:
+        crawler.save()      # validators of pages that were not written stay unsaved
+    elapsed = time.perf_counter() - start
+
+    s = crawler.stats
+    print(f"✅ {len(urls)} URLs in {elapsed:.1f}s ({len(urls) / max(elapsed, 1e-9):.1f}/s): "
+          f"{s['fetched']} new or changed, {s['not_modified']} not modified, "
+          f"{s['same_content']} same content, {s['skipped']} skipped, {s['failed']} failed")
+    print(f"   {s['requests']} requests, {s['retries']} retries, "
+          f"{s['bytes'] / 1e6:.1f} MB downloaded -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
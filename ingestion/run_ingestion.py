@@ -1,14 +1,16 @@
 from pdf_loader import load_pdf
 from csv_loader import load_csv
-from web_loader import load_web
+from crawler import crawl
 from clean_text import clean
 
-def run():
+WEB_URLS = ["https://example.com/startup-policy"]
+
+def run(urls=WEB_URLS, sitemap=None):
     all_docs = []
 
     all_docs += load_pdf("data/raw/funding_report.pdf", "Funding_Report_2024")
     all_docs += load_csv("data/raw/investors.csv", "Investor_Database")
-    all_docs += load_web("https://example.com/startup-policy")
+    all_docs += crawl(urls, sitemap)
 
     for doc in all_docs:
         doc["text"] = clean(doc["text"])
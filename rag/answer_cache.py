@@ -0,0 +1,166 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import faiss
+import numpy as np
+
+# -----------------------------
+# Config
+# -----------------------------
+MAX_ENTRIES = 1024
+TTL_SECONDS = 6 * 3600
+SIMILARITY_THRESHOLD = 0.92   # cosine; paraphrases of the same question land above this
+
+
+def normalize_query(query: str) -> str:
+    """Case-, whitespace- and trailing-punctuation-insensitive form of a query."""
+    query = re.sub(r"\s+", " ", query.strip().lower())
+    return query.strip(" ?!.。।")
+
+
+class AnswerCache:
+    """
+    Answers keyed on the normalized query text (exact hits) and on the query
+    embedding (near-duplicate hits via a small inner-product FAISS index over
+    L2-normalized vectors). Entries expire after `ttl` seconds, the least
+    recently used are evicted past `max_entries`, and everything is dropped
+    when the retriever loads a different index generation.
+
+    `scope` separates answers that must never be shared, e.g. (language, k).
+    """
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, ttl: float = TTL_SECONDS,
+                 threshold: float = SIMILARITY_THRESHOLD):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.threshold = threshold
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # (scope, normalized query) -> entry
+        self._by_id = {}                # faiss id -> key
+        self._index = None
+        self._next_id = 0
+        self._generation = None
+
+        self.stats = {"exact_hits": 0, "semantic_hits": 0, "misses": 0,
+                      "evictions": 0, "invalidations": 0}
+
+    # ---- bookkeeping ----
+    def check_generation(self, generation):
+        """Drop every entry if the index was rebuilt since they were stored."""
+        with self._lock:
+            if generation != self._generation:
+                if self._entries:
+                    self.stats["invalidations"] += 1
+                self._clear()
+                self._generation = generation
+
+    def _clear(self):
+        self._entries.clear()
+        self._by_id.clear()
+        self._index = None        # a rebuilt index may use a different embedding size
+
+    def clear(self):
+        with self._lock:
+            self._clear()
+
+    def _drop(self, key):
+        entry = self._entries.pop(key)
+        if entry["id"] is not None:
+            self._index.remove_ids(np.asarray([entry["id"]], dtype="int64"))
+            del self._by_id[entry["id"]]
+
+    def _fresh(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry["at"] > self.ttl:
+            self._drop(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    # ---- lookups ----
+    def get(self, query: str, scope):
+        """Exact hit on the normalized query, else None."""
+        with self._lock:
+            entry = self._fresh((scope, normalize_query(query)))
+            if entry is None:
+                return None
+            self.stats["exact_hits"] += 1
+            return entry["answer"]
+
+    def get_similar(self, vector: np.ndarray, scope):
+        """Answer of the most similar cached query above the threshold, else None (counts a miss)."""
+        with self._lock:
+            if self._index is not None and self._index.ntotal:
+                query = _unit(vector)
+                scores, ids = self._index.search(query, min(8, self._index.ntotal))
+                for score, faiss_id in zip(scores[0], ids[0]):
+                    if faiss_id == -1 or score < self.threshold:
+                        break
+                    key = self._by_id.get(int(faiss_id))
+                    if key is None or key[0] != scope:
+                        continue
+                    entry = self._fresh(key)
+                    if entry is not None:
+                        self.stats["semantic_hits"] += 1
+                        return entry["answer"]
+
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, query: str, scope, answer: str, vector: np.ndarray = None):
+        with self._lock:
+            key = (scope, normalize_query(query))
+            if key in self._entries:
+                self._drop(key)
+
+            faiss_id = None
+            if vector is not None:
+                vector = _unit(vector)
+                if self._index is None:
+                    self._index = faiss.IndexIDMap2(faiss.IndexFlatIP(vector.shape[1]))
+                faiss_id = self._next_id
+                self._next_id += 1
+                self._index.add_with_ids(vector, np.asarray([faiss_id], dtype="int64"))
+                self._by_id[faiss_id] = key
+
+            self._entries[key] = {"answer": answer, "id": faiss_id, "at": time.monotonic()}
+
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.stats["evictions"] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["exact_hits"] + stats["semantic_hits"] + stats["misses"]
+        stats["hit_rate"] = (
+            round((stats["exact_hits"] + stats["semantic_hits"]) / lookups, 4)
+            if lookups else None
+        )
+        return stats
+
+
+def _unit(vector: np.ndarray) -> np.ndarray:
+    vector = np.array(vector, dtype="float32").reshape(1, -1)
+    faiss.normalize_L2(vector)
+    return vector
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_answer_cache() -> AnswerCache:
+    """Process-wide answer cache shared by every caller."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = AnswerCache()
+    return _cache
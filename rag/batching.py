@@ -0,0 +1,142 @@
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+
+# -----------------------------
+# Config
+# -----------------------------
+MAX_BATCH = 32            # requests coalesced into one handler call
+MAX_WAIT_MS = 10          # how long the first request waits for company
+LATENCY_WINDOW = 2048     # recent requests kept for percentiles
+
+
+class MicroBatcher:
+    """
+    Coalesce concurrent requests into micro-batches.
+
+    Callers `submit(key, item)` from any thread and get a Future. A single
+    worker thread takes the first waiting request, collects more for up to
+    `max_wait_ms` (or until `max_batch`), then calls `handler(key, items)`
+    once per distinct key in the batch and resolves the futures with the
+    returned results, in order. Requests with different keys (e.g. language
+    or k) are never mixed in one handler call.
+    """
+
+    def __init__(self, handler, max_batch: int = MAX_BATCH,
+                 max_wait_ms: float = MAX_WAIT_MS, name: str = "batcher"):
+        self.handler = handler
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.name = name
+
+        self._queue = queue.Queue()
+        self._stop = threading.Event()
+        self._worker = threading.Thread(target=self._run, name=name, daemon=True)
+
+        self._stats_lock = threading.Lock()
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._waits = deque(maxlen=LATENCY_WINDOW)
+        self.stats = {"requests": 0, "batches": 0, "handler_calls": 0,
+                      "errors": 0, "max_batch_seen": 0}
+
+        self._worker.start()
+
+    def submit(self, key, item) -> Future:
+        if self._stop.is_set():
+            raise RuntimeError(f"{self.name} is closed")
+        future = Future()
+        self._queue.put((key, item, future, time.perf_counter()))
+        return future
+
+    def __call__(self, key, item, timeout: float = None):
+        """Submit and wait for the result."""
+        return self.submit(key, item).result(timeout=timeout)
+
+    # ---- worker ----
+    def _collect(self):
+        try:
+            first = self._queue.get(timeout=0.1)
+        except queue.Empty:
+            return []
+
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stop.is_set() or not self._queue.empty():
+            batch = self._collect()
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            groups = {}
+            for request in batch:
+                try:
+                    groups.setdefault(request[0], []).append(request)
+                except Exception as e:      # e.g. an unhashable key: fail only this request
+                    with self._stats_lock:
+                        self.stats["errors"] += 1
+                    request[2].set_exception(e)
+
+            for key, requests in groups.items():
+                try:
+                    results = list(self.handler(key, [item for _, item, _, _ in requests]))
+                    if len(results) != len(requests):
+                        # zip would leave the unmatched futures pending forever
+                        raise RuntimeError(
+                            f"{self.name} handler returned {len(results)} results "
+                            f"for {len(requests)} requests"
+                        )
+                    for (_, _, future, _), result in zip(requests, results):
+                        future.set_result(result)
+                except Exception as e:
+                    with self._stats_lock:
+                        self.stats["errors"] += 1
+                    for _, _, future, _ in requests:
+                        future.set_exception(e)
+
+            done = time.perf_counter()
+            with self._stats_lock:
+                self.stats["requests"] += len(batch)
+                self.stats["batches"] += 1
+                self.stats["handler_calls"] += len(groups)
+                self.stats["max_batch_seen"] = max(self.stats["max_batch_seen"], len(batch))
+                for _, _, _, submitted in batch:
+                    self._waits.append(started - submitted)
+                    self._latencies.append(done - submitted)
+
+    def close(self, timeout: float = 5):
+        """Stop accepting requests; pending ones are still answered."""
+        self._stop.set()
+        self._worker.join(timeout=timeout)
+
+    # ---- metrics ----
+    def snapshot(self) -> dict:
+        with self._stats_lock:
+            stats = dict(self.stats)
+            latencies = np.asarray(self._latencies)
+            waits = np.asarray(self._waits)
+
+        stats["avg_batch"] = (
+            round(stats["requests"] / stats["batches"], 2) if stats["batches"] else None
+        )
+        if len(latencies):
+            p50, p95, p99 = (np.percentile(latencies, [50, 95, 99]) * 1000).tolist()
+            stats["latency_ms"] = {"p50": round(p50, 2), "p95": round(p95, 2),
+                                   "p99": round(p99, 2)}
+            stats["queue_wait_ms"] = {"p50": round(float(np.percentile(waits, 50)) * 1000, 2),
+                                      "max": round(float(waits.max()) * 1000, 2)}
+        return stats
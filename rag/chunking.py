@@ -1,5 +1,15 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langdetect import detect
+from langdetect import DetectorFactory, detect
+
+from rag.dedup import THRESHOLD, dedup_chunks
+
+# langdetect is randomized; seed it so parallel and serial runs tag identically
+DetectorFactory.seed = 0
+
+WORKERS = os.cpu_count() or 1
 
 
 def detect_language(text):
@@ -9,26 +19,52 @@ def detect_language(text):
         return "unknown"
 
 
-def chunk_documents(documents):
-    splitter = RecursiveCharacterTextSplitter(
+def _splitter():
+    return RecursiveCharacterTextSplitter(
         chunk_size=500,
         chunk_overlap=80,
         separators=["\n\n", "\n", ".", " "]
     )
 
-    chunked_docs = []
 
-    for doc in documents:
-        chunks = splitter.split_text(doc["text"])
+def chunk_document(doc, splitter=None):
+    splitter = splitter or _splitter()
+    chunks = splitter.split_text(doc["text"])
+
+    return [
+        {
+            "text": chunk,
+            "metadata": {
+                **doc["metadata"],
+                "chunk_id": i,
+                "language": detect_language(chunk)
+            }
+        }
+        for i, chunk in enumerate(chunks)
+    ]
+
+
+def chunk_documents(documents, workers=WORKERS, dedup_threshold=THRESHOLD):
+    """
+    Split and language-tag documents over `workers` processes (same output
+    order; 1 runs in-process). Near-duplicate chunks (MinHash Jaccard >=
+    `dedup_threshold`) are dropped, first copy wins; pass None to keep them.
+    """
+    if workers <= 1 or len(documents) < 2:
+        splitter = _splitter()
+        chunked_docs = [c for doc in documents for c in chunk_document(doc, splitter)]
+    else:
+        chunked_docs = []
+        with ProcessPoolExecutor(max_workers=min(workers, len(documents))) as pool:
+            chunksize = max(1, len(documents) // (workers * 4))
+            for chunks in pool.map(chunk_document, documents, chunksize=chunksize):
+                chunked_docs.extend(chunks)
 
-        for i, chunk in enumerate(chunks):
-            chunked_docs.append({
-                "text": chunk,
-                "metadata": {
-                    **doc["metadata"],
-                    "chunk_id": i,
-                    "language": detect_language(chunk)
-                }
-            })
+    if dedup_threshold is None:
+        return chunked_docs
 
-    return chunked_docs
+    kept, stats = dedup_chunks(chunked_docs, dedup_threshold)
+    if len(kept) < len(chunked_docs):
+        print(f"🧹 Dropped {stats['exact']} exact + {stats['near']} near-duplicate chunks "
+              f"({stats['dropped_chars']:,} chars)")
+    return kept
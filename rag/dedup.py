@@ -0,0 +1,158 @@
+import hashlib
+import os
+import re
+import zlib
+
+import numpy as np
+
+# -----------------------------
+# Config
+# -----------------------------
+# MinHash over word shingles, bucketed with LSH: NUM_PERM = BANDS x ROWS.
+# With 8 bands of 8 rows, pairs above ~0.77 Jaccard almost always share a
+# bucket; candidates are then confirmed against THRESHOLD.
+NUM_PERM = 64
+BANDS = 8
+ROWS = NUM_PERM // BANDS
+SHINGLE = 3                   # words per shingle
+THRESHOLD = 0.85              # estimated Jaccard at which a chunk is a copy
+PRIME = 4294967311            # > 2**32, so (a * h + b) % PRIME permutes 32-bit hashes
+SEED = 1
+
+PREFIX = "minhash"
+
+_rng = np.random.default_rng(SEED)
+_A = _rng.integers(1, 2**31 - 1, size=NUM_PERM, dtype="uint64")
+_B = _rng.integers(0, 2**31 - 1, size=NUM_PERM, dtype="uint64")
+
+
+def _words(text: str):
+    return re.findall(r"\w+", text.lower())
+
+
+def signature(text: str) -> np.ndarray:
+    """uint32[NUM_PERM] MinHash of the text's word shingles."""
+    words = _words(text)
+    if len(words) < SHINGLE:
+        words = words + [""] * (SHINGLE - len(words))
+    shingles = {" ".join(words[i:i + SHINGLE]) for i in range(len(words) - SHINGLE + 1)}
+    hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles),
+                         dtype="uint64", count=len(shingles))
+    return ((np.outer(hashes, _A) + _B) % PRIME).min(axis=0).astype("uint32")
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return float(np.mean(a == b))
+
+
+class NearDuplicateIndex:
+    """
+    Signatures of kept chunks, bucketed per LSH band. `check` returns the key
+    of an earlier chunk the text copies (exactly or nearly), or registers the
+    text under `key` and returns None.
+    """
+
+    def __init__(self, threshold: float = THRESHOLD):
+        self.threshold = threshold
+        self._buckets = [{} for _ in range(BANDS)]
+        self._signatures = {}             # key -> signature
+        self._exact = {}                  # sha256 -> key
+        self.stats = {"checked": 0, "exact": 0, "near": 0,
+                      "candidates": 0, "dropped_chars": 0}
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def _bands(self, sig):
+        return [sig[i * ROWS:(i + 1) * ROWS].tobytes() for i in range(BANDS)]
+
+    def add(self, key, sig: np.ndarray, digest: str = None):
+        self._signatures[key] = sig
+        if digest is not None:
+            self._exact[digest] = key
+        for band, bucket in zip(self._bands(sig), self._buckets):
+            bucket.setdefault(band, []).append(key)
+
+    def remove(self, keys):
+        """Forget chunks that left the index (their copies become unique again)."""
+        keys = set(keys)
+        if not keys:
+            return
+        for key in keys:
+            self._signatures.pop(key, None)
+        self._exact = {d: k for d, k in self._exact.items() if k not in keys}
+        for bucket in self._buckets:
+            for band in list(bucket):
+                kept = [k for k in bucket[band] if k not in keys]
+                if kept:
+                    bucket[band] = kept
+                else:
+                    del bucket[band]
+
+    def find(self, sig: np.ndarray):
+        """Key of a stored near-duplicate of `sig`, or None."""
+        seen = set()
+        for band, bucket in zip(self._bands(sig), self._buckets):
+            for key in bucket.get(band, ()):
+                if key in seen:
+                    continue
+                seen.add(key)
+                if similarity(sig, self._signatures[key]) >= self.threshold:
+                    self.stats["candidates"] += len(seen)
+                    return key
+        self.stats["candidates"] += len(seen)
+        return None
+
+    def check(self, key, text: str):
+        """Key of the chunk `text` duplicates, else None (and `text` is kept under `key`)."""
+        self.stats["checked"] += 1
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        if digest in self._exact:
+            self.stats["exact"] += 1
+            self.stats["dropped_chars"] += len(text)
+            return self._exact[digest]
+
+        sig = signature(text)
+        original = self.find(sig)
+        if original is not None:
+            self.stats["near"] += 1
+            self.stats["dropped_chars"] += len(text)
+            return original
+
+        self.add(key, sig, digest)
+        return None
+
+    def dropped(self) -> int:
+        return self.stats["exact"] + self.stats["near"]
+
+    # ---- persistence (next to the index, keyed by faiss id) ----
+    def save(self, index_dir: str):
+        keys = np.fromiter(self._signatures, dtype="int64", count=len(self._signatures))
+        sigs = (np.stack(list(self._signatures.values())) if len(keys)
+                else np.empty((0, NUM_PERM), dtype="uint32"))
+        for name, array in (("ids", keys), ("signatures", sigs)):
+            path = os.path.join(index_dir, f"{PREFIX}.{name}.npy")
+            with open(path + ".tmp", "wb") as f:
+                np.save(f, array)
+            os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, index_dir: str, threshold: float = THRESHOLD):
+        """Stored signatures, or an empty index if none were saved."""
+        index = cls(threshold)
+        ids_path = os.path.join(index_dir, f"{PREFIX}.ids.npy")
+        sigs_path = os.path.join(index_dir, f"{PREFIX}.signatures.npy")
+        if os.path.exists(ids_path) and os.path.exists(sigs_path):
+            sigs = np.load(sigs_path)
+            if sigs.shape[1:] == (NUM_PERM,):
+                for key, sig in zip(np.load(ids_path).tolist(), sigs):
+                    index.add(key, sig)
+        return index
+
+
+def dedup_chunks(chunks, threshold: float = THRESHOLD):
+    """(kept chunks, stats) for a list of {"text", "metadata"} chunks, first copy wins."""
+    index = NearDuplicateIndex(threshold)
+    kept = [c for i, c in enumerate(chunks) if index.check(i, c["text"]) is None]
+    return kept, index.stats
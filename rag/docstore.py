@@ -0,0 +1,196 @@
+import json
+import mmap
+import os
+from array import array
+
+import numpy as np
+
+# -----------------------------
+# Layout
+# -----------------------------
+# Chunk texts and metadata stored next to index.faiss without pickle:
+#
+#   docstore.json          header: row count + string tables (sources, languages, types)
+#   docstore.texts         every chunk's UTF-8 text, back to back (memory-mapped)
+#   docstore.offsets.npy   int64[n + 1] byte offsets into docstore.texts
+#   docstore.ids.npy       int64[n]     faiss id of each row
+#   docstore.rows.npy      int64[max id + 1] row of each faiss id (-1 = none)
+#   docstore.<column>.npy  typed metadata columns (codes into the string tables, -1 = unset)
+#
+# Opening the store only maps these files, so startup cost and RSS no longer
+# grow with the corpus, and a lookup by faiss id touches one row.
+VERSION = 1
+PREFIX = "docstore"
+
+# column -> (dtype, string table or None)
+COLUMNS = {
+    "source": ("int32", "sources"),
+    "language": ("int16", "languages"),
+    "type": ("int16", "types"),
+    "page": ("int32", None),
+    "chunk_id": ("int32", None),
+}
+ARRAY_CODES = {"int32": "i", "int16": "h", "int64": "q"}
+
+
+def _path(index_dir, name):
+    return os.path.join(index_dir, f"{PREFIX}.{name}")
+
+
+def exists(index_dir) -> bool:
+    return os.path.exists(_path(index_dir, "json"))
+
+
+def _save_npy(path, values, dtype):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, np.frombuffer(values, dtype=dtype) if isinstance(values, array)
+                else np.asarray(values, dtype=dtype))
+    os.replace(tmp, path)
+
+# -----------------------------
+# Writer
+# -----------------------------
+class DocStoreWriter:
+    """
+    Appends rows one at a time; texts go straight to disk and columns are kept
+    in compact typed arrays, so writing never holds Python objects per chunk.
+    Nothing replaces the live store until `close()`.
+    """
+
+    def __init__(self, index_dir):
+        self.index_dir = index_dir
+        os.makedirs(index_dir, exist_ok=True)
+
+        self._texts = open(_path(index_dir, "texts.tmp"), "wb")
+        self._offsets = array("q", [0])
+        self._ids = array("q")
+        self._columns = {name: array(ARRAY_CODES[dtype]) for name, (dtype, _) in COLUMNS.items()}
+        self._tables = {table: {} for _, table in COLUMNS.values() if table}
+
+    def _code(self, table, value):
+        if value is None or value == "":
+            return -1
+        codes = self._tables[table]
+        if value not in codes:
+            codes[value] = len(codes)
+        return codes[value]
+
+    def _append(self, faiss_id, text_bytes, values):
+        self._texts.write(text_bytes)
+        self._offsets.append(self._offsets[-1] + len(text_bytes))
+        self._ids.append(int(faiss_id))
+        for name, (_, table) in COLUMNS.items():
+            value = values.get(name)
+            if table:
+                value = self._code(table, value)
+            elif value is None:
+                value = -1
+            self._columns[name].append(int(value))
+
+    def add(self, faiss_id, text: str, metadata: dict):
+        self._append(faiss_id, text.encode("utf-8"), metadata)
+
+    def copy_from(self, store, faiss_ids):
+        """Carry rows over from an existing store without decoding their text."""
+        for faiss_id in faiss_ids:
+            row = store.row(faiss_id)
+            if row < 0:
+                continue
+            self._append(faiss_id, store.text_bytes_at(row), store.metadata_at(row))
+
+    def abort(self):
+        self._texts.close()
+        os.remove(_path(self.index_dir, "texts.tmp"))
+
+    def close(self):
+        self._texts.close()
+        os.replace(_path(self.index_dir, "texts.tmp"), _path(self.index_dir, "texts"))
+
+        ids = np.frombuffer(self._ids, dtype="int64")
+        rows = np.full(int(ids.max()) + 1 if len(ids) else 0, -1, dtype="int64")
+        rows[ids] = np.arange(len(ids), dtype="int64")
+
+        _save_npy(_path(self.index_dir, "offsets.npy"), self._offsets, "int64")
+        _save_npy(_path(self.index_dir, "ids.npy"), self._ids, "int64")
+        _save_npy(_path(self.index_dir, "rows.npy"), rows, "int64")
+        for name, (dtype, _) in COLUMNS.items():
+            _save_npy(_path(self.index_dir, f"{name}.npy"), self._columns[name], dtype)
+
+        header = {
+            "version": VERSION,
+            "count": len(self._ids),
+            **{table: list(codes) for table, codes in self._tables.items()},
+        }
+        tmp = _path(self.index_dir, "json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(header, f)
+        os.replace(tmp, _path(self.index_dir, "json"))
+
+# -----------------------------
+# Reader
+# -----------------------------
+class DocStore:
+    """Read-only, memory-mapped view of a store written by DocStoreWriter."""
+
+    def __init__(self, index_dir):
+        with open(_path(index_dir, "json"), encoding="utf-8") as f:
+            header = json.load(f)
+        if header.get("version") != VERSION:
+            raise ValueError(f"Unsupported docstore version {header.get('version')}")
+
+        self.count = header["count"]
+        self.tables = {table: header[table] for _, table in COLUMNS.values() if table}
+
+        def load(name):
+            return np.load(_path(index_dir, f"{name}.npy"), mmap_mode="r")
+
+        self.offsets = load("offsets")
+        self.faiss_ids = load("ids")
+        self._rows = load("rows")
+        self.columns = {name: load(name) for name in COLUMNS}
+
+        with open(_path(index_dir, "texts"), "rb") as f:
+            self._texts = (
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                if os.fstat(f.fileno()).st_size else b""
+            )
+
+    def __len__(self):
+        return self.count
+
+    def row(self, faiss_id) -> int:
+        faiss_id = int(faiss_id)
+        if faiss_id < 0 or faiss_id >= len(self._rows):
+            return -1
+        return int(self._rows[faiss_id])
+
+    def text_bytes_at(self, row) -> memoryview:
+        """Zero-copy view of a row's UTF-8 text."""
+        return memoryview(self._texts)[self.offsets[row]:self.offsets[row + 1]]
+
+    def metadata_at(self, row) -> dict:
+        metadata = {}
+        for name, (_, table) in COLUMNS.items():
+            value = int(self.columns[name][row])
+            if value < 0:
+                continue
+            metadata[name] = self.tables[table][value] if table else value
+        return metadata
+
+    def get(self, faiss_id):
+        """Document for a faiss id, or None if the id is not stored."""
+        row = self.row(faiss_id)
+        if row < 0:
+            return None
+        # imported on first use: langchain_core is slow to import
+        from langchain_core.documents import Document
+        return Document(
+            page_content=str(self.text_bytes_at(row), "utf-8"),
+            metadata=self.metadata_at(row)
+        )
+
+    def labels(self, column, default=None) -> np.ndarray:
+        """Decoded values of a string column for every row (`default` where unset)."""
+        table = np.asarray(self.tables[COLUMNS[column][1]] + [default], dtype=object)
+        return table[np.asarray(self.columns[column], dtype="int64")]
@@ -1,27 +1,49 @@
-import faiss
-import pickle
-from sentence_transformers import SentenceTransformer
+import numpy as np
 import os
 
-MODEL_NAME = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+from rag import lexical, snapshot, tracing
+from rag.docstore import DocStore, DocStoreWriter
+from rag.indexing import EMBED_MODELS, IndexFeeder, build_meta, write_index, write_meta
+from rag.streaming import EmbeddingStream
 
-def build_faiss_index(chunks):
-    model = SentenceTransformer(MODEL_NAME)
+MODEL_NAME = EMBED_MODELS["multilingual"]
 
-    texts = [c["text"] for c in chunks]
-    metadata = [c["metadata"] for c in chunks]
+def build_faiss_index(chunks, index_type="flat", vector_format="float32",
+                      backend=snapshot.EMBED_BACKEND, **index_params):
+    if backend == "torch":
+        from sentence_transformers import SentenceTransformer
+        encode = SentenceTransformer(MODEL_NAME).encode
+    else:
+        encode = snapshot.encoder(MODEL_NAME, backend).embed_documents
 
-    embeddings = model.encode(texts, show_progress_bar=True)
+    os.makedirs("vectorstore/faiss_index", exist_ok=True)
+    writer = DocStoreWriter("vectorstore/faiss_index")
 
-    dim = embeddings.shape[1]
-    index = faiss.IndexFlatL2(dim)
-    index.add(embeddings)
+    def numbered(chunks):
+        # faiss id = position, so texts/metadata line up after length-sorted batching
+        for i, c in enumerate(chunks):
+            writer.add(i, c["text"], c["metadata"])
+            yield i, c["text"]
 
-    os.makedirs("vectorstore/faiss_index", exist_ok=True)
+    # Encoding (background thread) overlaps with index insertion (here)
+    feeder = IndexFeeder(index_type, vector_format=vector_format, **index_params)
+    stream = EmbeddingStream(encode)
+
+    with tracing.span("build.embed_index", index_type=index_type, chunks=len(chunks)):
+        for vectors, batch in stream(numbered(chunks), text_of=lambda item: item[1]):
+            feeder.add(vectors, np.asarray([i for i, _ in batch], dtype="int64"))
+
+        index = feeder.close()
+    tracing.count("build.chunks_embedded", stream.stats["embedded"])
 
-    faiss.write_index(index, "vectorstore/faiss_index/index.faiss")
+    with tracing.span("build.write", vectors=index.ntotal):
+        write_index(index, "vectorstore/faiss_index/index.faiss")
+        writer.close()
+    with tracing.span("build.bm25"):
+        lexical.build("vectorstore/faiss_index", DocStore("vectorstore/faiss_index"))
 
-    with open("vectorstore/faiss_index/metadata.pkl", "wb") as f:
-        pickle.dump({"texts": texts, "metadata": metadata}, f)
+    write_meta("vectorstore/faiss_index", build_meta(
+        index_type, feeder.params, index, MODEL_NAME, vector_format, embed_backend=backend
+    ))
 
-    print(f"FAISS index built with {len(texts)} chunks")
+    print(f"FAISS index built with {index.ntotal} chunks ({index_type})")
@@ -1,43 +1,84 @@
 import os
-from typing import List
-from deep_translator import GoogleTranslator
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Iterator, List
 
-from rag.retriever import retrieve
-from langchain_core.documents import Document
+from rag import tracing
+from rag.answer_cache import get_answer_cache
+from rag.rerank import CANDIDATES, RERANK, get_reranker
+from rag.retriever import get_retriever
+from rag.translation import translate
 
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
 
-def generate_answer(query: str, language: str = "en", max_chunks: int = 5) -> str:
-    """
-    Analyst-style RAG answer with:
-    - Synthesized insight
-    - Clear sources
-    - Evaluation metric
-    """
+NO_EVIDENCE = "No relevant evidence was found for this query."
+TRANSLATE_THREADS = 8     # answer segments translated concurrently while streaming
 
-    user_lang = language or "en"
 
-    # Translate query → English ONLY if needed
-    translated_query = (
-        GoogleTranslator(source=user_lang, target="en").translate(query)
-        if user_lang != "en"
-        else query
-    )
+def _to_english(query: str, user_lang: str) -> str:
+    # Translate query → English ONLY if needed (cached per language pair)
+    return translate(query, user_lang, "en") if user_lang != "en" else query
+
+
+def _from_english(answer: str, user_lang: str) -> str:
+    if user_lang != "en":
+        answer = translate(answer, "en", user_lang)
+    return answer.strip()
+
+
+def _translate_segment(segment: str, user_lang: str) -> str:
+    """Translate one answer segment, keeping the whitespace around it (markdown layout)."""
+    text = segment.strip()
+    if not text:
+        return segment
+    start = segment.index(text)
+    return segment[:start] + translate(text, "en", user_lang) + segment[start + len(text):]
+
+
+_pool = None
+_pool_lock = threading.Lock()
 
-    # Retrieve evidence (TOP-K ONLY)
-    docs: List[Document] = retrieve(translated_query, k=max_chunks)
 
+def _translated(segments, user_lang: str) -> Iterator[str]:
+    """Segments in order; non-English ones are all translated at once on a thread pool."""
+    if user_lang == "en":
+        yield from segments
+        return
+
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(TRANSLATE_THREADS, thread_name_prefix="translate")
+    futures = [_pool.submit(_translate_segment, segment, user_lang) for segment in segments]
+    for future in futures:
+        yield future.result()
+
+
+def answer_segments(docs: List["Document"]) -> Iterator[str]:
+    """
+    English analyst-style answer from retrieved evidence, as markdown
+    segments: the insight header, one per bullet, the sources block and the
+    evaluation line. Joined, they are `synthesize_answer(docs)`.
+    """
     if not docs:
-        return "No relevant evidence was found for this query."
+        yield NO_EVIDENCE
+        return
 
     #  Analyst-style synthesis (FAST + STRUCTURED)
     insights = []
+    seen = set()
     sources = set()
 
     for doc in docs:
         text = doc.page_content.strip()
-        source = os.path.basename(doc.metadata.get("source", "Unknown"))
+        source = doc.metadata.get("source", "Unknown")
+        if "://" not in source:     # crawled pages cite their URL, files their name
+            source = os.path.basename(source)
 
-        if text and text not in insights:
+        if text and text not in seen:
+            seen.add(text)
             insights.append(text)
             sources.add(source)
 
@@ -46,39 +87,185 @@ def generate_answer(query: str, language: str = "en", max_chunks: int = 5) -> st
             break
 
     #  Build professional insight
-    insight_text = (
-        "Our analysis indicates that:\n\n"
-        + "\n".join(
-            f"- {s.split('.')[0].strip()}."
-            for s in insights
-            if len(s) > 40
-        )
-    )
+    yield "\nOur analysis indicates that:\n\n"
+    bullets = [f"- {s.split('.')[0].strip()}." for s in insights if len(s) > 40]
+    for n, bullet in enumerate(bullets):
+        yield ("\n" if n else "") + bullet
 
     #  Evidence block
     sources_text = "\n".join(f"• {src}" for src in sorted(sources))
+    yield f"\n\n---\n\n**Sources**\n{sources_text}"
 
     evaluation_text = (
         f"Answer grounded in {len(sources)} independent source(s)."
     )
+    yield f"\n\n---\n\n*{evaluation_text}*\n"
 
-    final_answer = f"""
-{insight_text}
 
----
+def synthesize_answer(docs: List["Document"]) -> str:
+    """English analyst-style answer from retrieved evidence."""
+    return "".join(answer_segments(docs))
 
-**Sources**
-{sources_text}
 
----
+def _scope(user_lang: str, max_chunks: int, rerank: bool) -> tuple:
+    """Answer-cache scope: the same question is answered differently per setting."""
+    return (user_lang, max_chunks, rerank)
 
-*{evaluation_text}*
-"""
 
-    #  Translate back ONLY once (critical speed win)
-    if user_lang != "en":
-        final_answer = GoogleTranslator(
-            source="en", target=user_lang
-        ).translate(final_answer)
+def generate_answer(query: str, language: str = "en", max_chunks: int = 5,
+                    use_cache: bool = True, rerank: bool = None) -> str:
+    """
+    Analyst-style RAG answer with:
+    - Synthesized insight
+    - Clear sources
+    - Evaluation metric
+
+    Repeated and near-duplicate questions are served from the answer cache.
+    `rerank` re-scores the evidence with a cross-encoder (`rag/rerank.py`,
+    default `AIVERSE_RERANK`).
+    """
+    return generate_answers([query], language, max_chunks, use_cache, rerank)[0]
+
+
+def stream_answer(query: str, language: str = "en", max_chunks: int = 5,
+                  use_cache: bool = True, rerank: bool = None) -> Iterator[str]:
+    """
+    `generate_answer` as a stream of markdown segments (see `answer_segments`),
+    each yielded as soon as it is ready, so the first bullet shows before the
+    rest of the answer is translated. Non-English segments are translated
+    concurrently. Cached and table answers arrive as one segment.
+    """
+    user_lang = language or "en"
+    rerank = RERANK if rerank is None else rerank
+    cache = get_answer_cache() if use_cache else None
+    with tracing.span("answer", queries=1, language=user_lang, stream=True):
+        answers, evidence = _retrieve_batch([query], user_lang, max_chunks, cache, rerank)
+    if answers[0] is not None:
+        yield answers[0]
+        return
+
+    docs, vector = evidence[0]
+    parts = []
+    with tracing.span("answer.synthesize", docs=len(docs)):
+        segments = list(answer_segments(docs))
+    for segment in _translated(segments, user_lang):
+        parts.append(segment)
+        yield segment
+    if cache is not None:
+        cache.put(query, _scope(user_lang, max_chunks, rerank), "".join(parts).strip(), vector)
+
+
+def generate_answers(queries: List[str], language: str = "en",
+                     max_chunks: int = 5, use_cache: bool = True,
+                     rerank: bool = None) -> List[str]:
+    """
+    Batched `generate_answer` for report runs: every query is embedded in one
+    encoder pass and searched in one faiss call. Answers keep input order.
+    """
+    user_lang = language or "en"
+    rerank = RERANK if rerank is None else rerank
+    with tracing.span("answer", queries=len(queries), language=user_lang):
+        return _answer_batch(queries, user_lang, max_chunks, use_cache, rerank)
+
+
+def _answer_batch(queries: List[str], user_lang: str, max_chunks: int,
+                  use_cache: bool, rerank: bool = False) -> List[str]:
+    cache = get_answer_cache() if use_cache else None
+    answers, evidence = _retrieve_batch(queries, user_lang, max_chunks, cache, rerank)
+
+    for i, (docs, vector) in evidence.items():
+        with tracing.span("answer.synthesize", docs=len(docs)):
+            answer = synthesize_answer(docs)
+        #  Translate back ONLY once (critical speed win)
+        with tracing.span("answer.translate_answer", language=user_lang):
+            answers[i] = _from_english(answer, user_lang)
+        if cache is not None:
+            cache.put(queries[i], _scope(user_lang, max_chunks, rerank), answers[i], vector)
+
+    return answers
+
+
+def _retrieve_batch(queries: List[str], user_lang: str, max_chunks: int, cache,
+                    rerank: bool = False):
+    """
+    (answers, evidence): answers that need no synthesis (cache and table hits,
+    no evidence) and `{query index: (docs, query vector)}` for the rest.
+    """
+    retriever = get_retriever()
+    scope = _scope(user_lang, max_chunks, rerank)
+
+    answers: List[str] = [None] * len(queries)
+    if cache is not None:
+        cache.check_generation(retriever.generation)
+        for i, query in enumerate(queries):
+            answers[i] = cache.get(query, scope)
+        tracing.count("answer_cache.exact_hits", sum(a is not None for a in answers))
+
+    pending = [i for i, answer in enumerate(answers) if answer is None]
+    if not pending:
+        return answers, {}
+
+    # A cross-lingual index searches the native-language query directly,
+    # across chunks of every language; otherwise search in English.
+    if retriever.cross_lingual:
+        search_lang = None
+        texts = [queries[i] for i in pending]
+    else:
+        search_lang = "en"
+        with tracing.span("answer.translate_query", language=user_lang):
+            texts = [_to_english(queries[i], user_lang) for i in pending]
+
+    # Field-targeted questions over CSV sources get exact answers from the
+    # typed tables, without touching the vector index (pandas loads on first use)
+    from rag.tables import format_answer, get_table_store
+    tables = get_table_store()
+    searchable = []
+    with tracing.span("answer.tables"):
+        for row, i in enumerate(pending):
+            result = tables.query(texts[row])
+            if result is None:
+                searchable.append(row)
+            else:
+                answers[i] = _from_english(format_answer(result), user_lang)
+    tracing.count("answer.table_hits", len(pending) - len(searchable))
+    if not searchable:
+        return answers, {}
+    pending = [pending[row] for row in searchable]
+    texts = [texts[row] for row in searchable]
+
+    vectors = retriever.embed(texts)
+
+    # Near-duplicates of cached questions skip search and synthesis
+    misses = []
+    for row, i in enumerate(pending):
+        if cache is not None:
+            answers[i] = cache.get_similar(vectors[row], scope)
+        if answers[i] is None:
+            misses.append(row)
+    if cache is not None:
+        tracing.count("answer_cache.semantic_hits", len(pending) - len(misses))
+    if not misses:
+        return answers, {}
+
+    # Re-ranking over-fetches bi-encoder candidates and keeps the best max_chunks
+    search_texts = [texts[row] for row in misses]
+    all_docs = retriever.search_many(
+        search_texts, k=max_chunks * CANDIDATES if rerank else max_chunks,
+        language=search_lang, vectors=vectors[misses]
+    )
+    if rerank:
+        with tracing.span("answer.rerank", queries=len(misses)):
+            all_docs = get_reranker().rerank(search_texts, all_docs, max_chunks)
+
+    evidence = {}
+    for row, docs in zip(misses, all_docs):
+        i = pending[row]
+        if docs:
+            evidence[i] = (docs, vectors[row])
+            continue
+        tracing.count("answer.no_evidence")
+        answers[i] = NO_EVIDENCE
+        if cache is not None:
+            cache.put(queries[i], scope, answers[i], vectors[row])
 
-    return final_answer.strip()
+    return answers, evidence
@@ -0,0 +1,41 @@
+import re
+import zlib
+from typing import List
+
+import numpy as np
+
+# -----------------------------
+# Config
+# -----------------------------
+MODEL_NAME = "aiverse/hash-embeddings-384"
+DIM = 384
+
+
+class HashEmbeddings:
+    """
+    No-model stand-in for the sentence-transformers embedders: signed feature
+    hashing of lowercase word tokens, L2-normalized. Deterministic, needs no
+    download or GPU, and texts sharing words land close together, so indexes
+    can be built, searched and benchmarked offline. Same `embed_documents` /
+    `embed_query` interface as the LangChain embeddings.
+    """
+
+    def __init__(self, model_name: str = MODEL_NAME, dim: int = DIM, **kwargs):
+        self.model_name = model_name
+        self.dim = dim
+
+    def _embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype="float32")
+        for token in re.findall(r"\w+", text.lower()):
+            h = zlib.crc32(token.encode("utf-8"))
+            vector[h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        return np.stack([self._embed(t) for t in texts]).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text).tolist()
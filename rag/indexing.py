@@ -0,0 +1,523 @@
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+
+import faiss
+import numpy as np
+
+# -----------------------------
+# Index Types
+# -----------------------------
+# flat      exact brute-force L2 scan (baseline)
+# ivf_flat  inverted lists over k-means cells, full vectors per cell
+# hnsw      graph index, no training needed
+# ivf_pq    inverted lists + product-quantized codes (smallest footprint)
+INDEX_TYPES = ("flat", "ivf_flat", "hnsw", "ivf_pq")
+
+# -----------------------------
+# Vector Formats
+# -----------------------------
+# float32   full precision (4 bytes / dim)
+# float16   half precision scalar quantizer (2 bytes / dim)
+# int8      8-bit scalar quantizer, per-dimension ranges trained (1 byte / dim)
+# binary    1 bit / dim sign codes scanned by Hamming distance; the best
+#           candidates are re-ranked with float16 vectors (flat only)
+# ivf_pq already stores PQ codes and only takes float32 input.
+VECTOR_FORMATS = ("float32", "float16", "int8", "binary")
+SQ_TYPES = {
+    "float16": faiss.ScalarQuantizer.QT_fp16,
+    "int8": faiss.ScalarQuantizer.QT_8bit,
+}
+RERANK_FACTOR = 8             # binary: Hamming candidates re-ranked per result
+
+# Embedding models an index can be built with. "multilingual" maps every
+# supported language into one vector space, so queries need no translation.
+# "hash" is the offline feature-hashing stand-in (rag/hash_embeddings.py).
+EMBED_MODELS = {
+    "english": "sentence-transformers/all-MiniLM-L6-v2",
+    "multilingual": "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2",
+    "hash": "aiverse/hash-embeddings-384",
+}
+CROSS_LINGUAL_MODELS = {EMBED_MODELS["multilingual"]}
+
+META_FILE = "index_meta.json"
+TRAIN_SAMPLE = 50_000         # vectors sampled to train IVF / PQ (more if nlist needs them)
+MIN_POINTS_PER_CELL = 39      # faiss warns below this many training points per centroid
+SPILL_BATCH = 65_536          # spilled vectors added per call once a trained index exists
+
+
+def default_params(index_type: str, n_vectors: int, dim: int) -> dict:
+    """Reasonable build + query defaults for a corpus of `n_vectors`."""
+    if index_type == "flat":
+        return {}
+
+    if index_type == "hnsw":
+        return {"M": 32, "ef_construction": 80, "ef_search": 64}
+
+    nlist = max(1, int(4 * math.sqrt(max(n_vectors, 1))))
+    nlist = max(1, min(nlist, n_vectors // MIN_POINTS_PER_CELL))
+    params = {"nlist": nlist, "nprobe": min(nlist, max(1, nlist // 16, 8))}
+
+    if index_type == "ivf_pq":
+        # Sub-quantizers must divide the dimension; aim for ~8 dims each
+        m = next((m for m in (64, 48, 32, 16, 8, 4, 2, 1)
+                  if dim % m == 0 and dim // m >= 8), 1)
+        nbits = int(math.log2(max(n_vectors // MIN_POINTS_PER_CELL, 2)))
+        nbits = max(1, min(8, nbits))
+        params.update({"m": m, "nbits": nbits})
+
+    return params
+
+
+def check_format(index_type: str, vector_format: str):
+    if vector_format not in VECTOR_FORMATS:
+        raise ValueError(
+            f"Unknown vector format '{vector_format}', expected one of {VECTOR_FORMATS}"
+        )
+    if vector_format == "binary" and index_type != "flat":
+        raise ValueError("binary vectors are only supported with the flat index type")
+    if vector_format != "float32" and index_type == "ivf_pq":
+        raise ValueError("ivf_pq stores PQ codes; use vector format float32")
+
+
+def make_index(index_type: str, dim: int, n_vectors: int,
+               vector_format: str = "float32", **overrides):
+    """Create an (untrained) L2 index; returns (index, params)."""
+    if index_type not in INDEX_TYPES:
+        raise ValueError(
+            f"Unknown index type '{index_type}', expected one of {INDEX_TYPES}"
+        )
+    check_format(index_type, vector_format)
+
+    params = {**default_params(index_type, n_vectors, dim), **overrides}
+    sq_type = SQ_TYPES.get(vector_format)
+
+    if index_type == "flat":
+        if vector_format == "binary":
+            params.setdefault("rerank", RERANK_FACTOR)
+            index = BinaryIndex(dim, params["rerank"])
+        elif sq_type is not None:
+            index = faiss.IndexScalarQuantizer(dim, sq_type, faiss.METRIC_L2)
+        else:
+            index = faiss.IndexFlatL2(dim)
+
+    elif index_type == "hnsw":
+        if sq_type is not None:
+            index = faiss.IndexHNSWSQ(dim, sq_type, params["M"])
+        else:
+            index = faiss.IndexHNSWFlat(dim, params["M"])
+        index.hnsw.efConstruction = params["ef_construction"]
+        index.hnsw.efSearch = params["ef_search"]
+
+    else:
+        quantizer = faiss.IndexFlatL2(dim)
+        if index_type == "ivf_flat" and sq_type is not None:
+            index = faiss.IndexIVFScalarQuantizer(
+                quantizer, dim, params["nlist"], sq_type, faiss.METRIC_L2
+            )
+        elif index_type == "ivf_flat":
+            index = faiss.IndexIVFFlat(quantizer, dim, params["nlist"])
+        else:
+            index = faiss.IndexIVFPQ(
+                quantizer, dim, params["nlist"], params["m"], params["nbits"]
+            )
+        index.nprobe = params["nprobe"]
+
+    return index, params
+
+
+def train_index(index, vectors: np.ndarray, sample_size: int = TRAIN_SAMPLE,
+                seed: int = 0) -> float:
+    """Train on a random sample of `vectors`; returns training seconds."""
+    if index.is_trained:
+        return 0.0
+
+    if len(vectors) > sample_size:
+        rng = np.random.default_rng(seed)
+        vectors = vectors[np.sort(rng.choice(len(vectors), sample_size, replace=False))]
+
+    start = time.perf_counter()
+    index.train(np.ascontiguousarray(vectors, dtype="float32"))
+    return time.perf_counter() - start
+
+
+class IndexFeeder:
+    """
+    Streams (vectors, ids) batches into a faiss index. Index types that need
+    no training are created on the first batch and fed directly. Trained
+    ones (IVF / PQ, int8, binary) spill every batch to a temporary file;
+    `close()` sizes the index from the final count, trains it on a uniform
+    sample of the whole stream and adds the spilled vectors.
+    """
+
+    def __init__(self, index_type: str, index=None, train_size: int = TRAIN_SAMPLE,
+                 vector_format: str = "float32", seed: int = 0, **index_params):
+        self.index_type = index_type
+        self.vector_format = vector_format
+        self.index = index
+        self.train_size = train_size
+        self.index_params = index_params
+        self.params = index_params
+        self.train_s = 0.0
+        self.seed = seed
+        self._spill = None                # (ids file, vectors file) awaiting training
+        self._spilled = 0
+        self._dim = None
+
+    def add(self, vectors: np.ndarray, ids: np.ndarray):
+        if self.index is None and not needs_training(self.index_type, self.vector_format):
+            self._create(vectors.shape[1], 0)
+        if self.index is not None:
+            self.index.add_with_ids(vectors, ids)
+            return
+
+        if self._spill is None:
+            self._spill = (tempfile.TemporaryFile(), tempfile.TemporaryFile())
+        self._spill[0].write(np.asarray(ids, dtype="int64").tobytes())
+        self._spill[1].write(np.ascontiguousarray(vectors, dtype="float32").tobytes())
+        self._spilled += len(vectors)
+        self._dim = vectors.shape[1]
+
+    def _create(self, dim: int, n_vectors: int):
+        index, self.params = make_index(
+            self.index_type, dim, n_vectors, self.vector_format, **self.index_params
+        )
+        self.index = with_ids(index, self.index_type)
+
+    def close(self):
+        """The finished index (None if nothing was ever added to a new one)."""
+        if self.index is not None or not self._spilled:
+            return self.index
+
+        n, dim = self._spilled, self._dim
+        self._create(dim, n)      # nlist etc. are sized from the whole stream
+        for f in self._spill:
+            f.flush()
+        ids = np.memmap(self._spill[0], dtype="int64", mode="r", shape=(n,))
+        vectors = np.memmap(self._spill[1], dtype="float32", mode="r", shape=(n, dim))
+
+        # enough training points for every IVF cell, drawn from the whole stream
+        sample_size = max(self.train_size, MIN_POINTS_PER_CELL * self.params.get("nlist", 0))
+        self.train_s = train_index(base_index(self.index), vectors, sample_size, self.seed)
+        for start in range(0, n, SPILL_BATCH):
+            self.index.add_with_ids(np.asarray(vectors[start:start + SPILL_BATCH]),
+                                    np.asarray(ids[start:start + SPILL_BATCH]))
+
+        del ids, vectors
+        for f in self._spill:
+            f.close()
+        self._spill = None
+        return self.index
+
+
+def needs_training(index_type: str, vector_format: str) -> bool:
+    """IVF / PQ cells, int8 ranges and binary thresholds are learned from the data."""
+    return index_type in ("ivf_flat", "ivf_pq") or vector_format in ("int8", "binary")
+
+
+def with_ids(index, index_type: str):
+    """
+    Make `index` accept caller-chosen int64 ids (add_with_ids / remove_ids).
+    IVF indexes store ids natively; flat and HNSW are wrapped in IndexIDMap2.
+    """
+    if index_type in ("ivf_flat", "ivf_pq") or isinstance(index, BinaryIndex):
+        return index
+    return faiss.IndexIDMap2(index)
+
+
+def base_index(index):
+    """The index underneath an IndexIDMap wrapper (or the index itself)."""
+    if isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2)):
+        return faiss.downcast_index(index.index)
+    return index
+
+
+def supports_removal(index_type: str) -> bool:
+    return index_type != "hnsw"
+
+
+def search_params(index, index_type: str, nprobe: int = None,
+                  ef_search: int = None, sel=None):
+    """
+    Per-call faiss SearchParameters (thread-safe, unlike mutating the index).
+    Unset knobs fall back to the values stored in the index itself.
+    """
+    if index_type in ("ivf_flat", "ivf_pq"):
+        if not nprobe and sel is None:
+            return None
+        nprobe = nprobe or faiss.extract_index_ivf(index).nprobe
+        return faiss.SearchParametersIVF(nprobe=int(nprobe), sel=sel)
+
+    if index_type == "hnsw":
+        if not ef_search and sel is None:
+            return None
+        ef_search = ef_search or base_index(index).hnsw.efSearch
+        return faiss.SearchParametersHNSW(efSearch=int(ef_search), sel=sel)
+
+    return faiss.SearchParameters(sel=sel) if sel is not None else None
+
+
+def widened(index, index_type: str, nprobe: int = None, ef_search: int = None,
+            factor: int = 4):
+    """Next (nprobe, ef_search) to retry with when a filtered ANN search comes up short."""
+    if index_type in ("ivf_flat", "ivf_pq"):
+        ivf = faiss.extract_index_ivf(index)
+        current = nprobe or ivf.nprobe
+        if current >= ivf.nlist:
+            return None
+        return min(ivf.nlist, current * factor), ef_search
+
+    if index_type == "hnsw":
+        current = ef_search or base_index(index).hnsw.efSearch
+        if current >= index.ntotal:
+            return None
+        return nprobe, min(index.ntotal, current * factor)
+
+    return None
+
+
+def index_nbytes(index) -> int:
+    if isinstance(index, BinaryIndex):
+        return index.nbytes()
+    return int(faiss.serialize_index(index).nbytes)
+
+
+def write_index(index, path: str):
+    """Write any index format atomically (`.tmp` files, then replace)."""
+    if isinstance(index, BinaryIndex):
+        index.save(path)
+        return
+    faiss.write_index(index, path + ".tmp")
+    os.replace(path + ".tmp", path)
+
+
+def read_index(path: str, meta: dict = None, mmap: bool = False):
+    """
+    Load an index written by `write_index`; `meta` (index_meta.json) selects
+    the format. `mmap` maps the stored vectors / codes from the file instead
+    of copying them into RAM (near-instant load, read-only: never for updates).
+    """
+    meta = meta or {}
+    if meta.get("vector_format") == "binary":
+        return BinaryIndex.load(path, meta.get("params", {}).get("rerank", RERANK_FACTOR))
+    if mmap:
+        return faiss.read_index(path, faiss.IO_FLAG_MMAP_IFC)
+    return faiss.read_index(path)
+
+# -----------------------------
+# Binary Codes
+# -----------------------------
+class BinaryIndex:
+    """
+    1 bit per dimension (value above the per-dimension median) in a faiss
+    binary index, searched by Hamming distance. The best `rerank` x k
+    candidates are re-scored by exact L2 on float16 copies of the vectors,
+    which are memory-mapped from disk once loaded, so only the codes
+    (dim / 8 bytes per vector) stay resident.
+
+    Exposes the subset of the faiss Index API the rest of the code uses
+    (train, add_with_ids, remove_ids, search with an id selector, ntotal, d).
+    """
+
+    def __init__(self, dim: int, rerank: int = RERANK_FACTOR):
+        self.d = dim
+        self.rerank = rerank
+        self.thresholds = None
+        self.codes = faiss.IndexBinaryIDMap2(faiss.IndexBinaryFlat(8 * ((dim + 7) // 8)))
+
+        self._lock = threading.Lock()
+        self._chunks = []                     # pending (ids, float16 vectors)
+        self._ids = np.empty(0, dtype="int64")
+        self._vectors = np.empty((0, dim), dtype="float16")
+        self._rows = np.empty(0, dtype="int64")  # faiss id -> row in _vectors (-1 = none)
+
+    # ---- faiss Index API ----
+    @property
+    def ntotal(self) -> int:
+        return self.codes.ntotal
+
+    @property
+    def is_trained(self) -> bool:
+        return self.thresholds is not None
+
+    def train(self, vectors: np.ndarray):
+        self.thresholds = np.median(vectors, axis=0).astype("float32")
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        return np.packbits(np.asarray(vectors) > self.thresholds, axis=1)
+
+    def add_with_ids(self, vectors: np.ndarray, ids: np.ndarray):
+        ids = np.asarray(ids, dtype="int64")
+        self.codes.add_with_ids(self.encode(vectors), ids)
+        with self._lock:
+            self._chunks.append((ids, np.asarray(vectors, dtype="float16")))
+
+    def remove_ids(self, ids) -> int:
+        ids = np.asarray(ids, dtype="int64")
+        removed = self.codes.remove_ids(ids)
+        with self._lock:
+            self._consolidate()
+            keep = ~np.isin(self._ids, ids)
+            self._ids, self._vectors = self._ids[keep], np.asarray(self._vectors[keep])
+            self._reindex()
+        return removed
+
+    def search(self, vectors: np.ndarray, k: int, params=None):
+        vectors = np.asarray(vectors, dtype="float32")
+        n_candidates = min(max(k * self.rerank, k), max(self.ntotal, 1))
+        _, candidates = self.codes.search(self.encode(vectors), n_candidates, params=params)
+
+        with self._lock:
+            self._consolidate()
+        distances = np.full((len(vectors), k), np.inf, dtype="float32")
+        labels = np.full((len(vectors), k), -1, dtype="int64")
+        for q, row in enumerate(candidates):
+            row = row[row != -1]
+            if not len(row):
+                continue
+            exact = self._vectors[self._rows[row]].astype("float32")
+            scores = ((exact - vectors[q]) ** 2).sum(axis=1)
+            best = np.argsort(scores, kind="stable")[:k]
+            distances[q, :len(best)] = scores[best]
+            labels[q, :len(best)] = row[best]
+        return distances, labels
+
+    # ---- storage ----
+    def _consolidate(self):
+        if not self._chunks:
+            return
+        self._ids = np.concatenate([self._ids] + [ids for ids, _ in self._chunks])
+        self._vectors = np.concatenate(
+            [np.asarray(self._vectors)] + [v for _, v in self._chunks]
+        )
+        self._chunks = []
+        self._reindex()
+
+    def _reindex(self):
+        self._rows = np.full(int(self._ids.max()) + 1 if len(self._ids) else 0,
+                             -1, dtype="int64")
+        self._rows[self._ids] = np.arange(len(self._ids), dtype="int64")
+
+    def nbytes(self) -> int:
+        with self._lock:
+            self._consolidate()
+        return (int(faiss.serialize_index_binary(self.codes).nbytes)
+                + self._vectors.nbytes + self._ids.nbytes)
+
+    def save(self, path: str):
+        with self._lock:
+            self._consolidate()
+        for suffix, array in ((".thresholds.npy", self.thresholds),
+                              (".rerank_ids.npy", self._ids),
+                              (".rerank.npy", self._vectors)):
+            with open(path + suffix + ".tmp", "wb") as f:
+                np.save(f, array)
+            os.replace(path + suffix + ".tmp", path + suffix)
+        faiss.write_index_binary(self.codes, path + ".tmp")
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, path: str, rerank: int = RERANK_FACTOR):
+        codes = faiss.read_index_binary(path)
+        thresholds = np.load(path + ".thresholds.npy")
+        index = cls(len(thresholds), rerank)
+        index.codes = codes
+        index.thresholds = thresholds
+        index._ids = np.load(path + ".rerank_ids.npy")
+        index._vectors = np.load(path + ".rerank.npy", mmap_mode="r")
+        index._reindex()
+        return index
+
+# -----------------------------
+# Id Filters
+# -----------------------------
+class LabelFilter:
+    """
+    One bitmap id-selector per label value (e.g. chunk language), so a search
+    only ever scores ids carrying the requested label instead of post-filtering
+    an unfiltered top-k. `labels[i]` is the label of faiss id `ids[i]`; ids
+    may be sparse.
+    """
+
+    def __init__(self, ids, labels):
+        ids = np.asarray(ids, dtype="int64")
+        values = np.asarray(labels, dtype=object)
+        self.ntotal = len(ids)
+        size = int(ids.max()) + 1 if len(ids) else 0
+        self.counts = {}
+        self._bitmaps = {}
+        self._selectors = {}
+
+        for label in set(values.tolist()):
+            mask = np.zeros(size, dtype=bool)
+            mask[ids[values == label]] = True
+            # faiss bitmap layout: id i -> bit (i & 7) of byte (i >> 3)
+            bitmap = np.packbits(mask, bitorder="little")
+            self._bitmaps[label] = bitmap        # selector holds a raw pointer
+            self._selectors[label] = faiss.IDSelectorBitmap(
+                size, faiss.swig_ptr(bitmap)
+            )
+            self.counts[label] = int(mask.sum())
+
+    def count(self, label) -> int:
+        return self.counts.get(label, 0)
+
+    def selector(self, label):
+        """Selector for `label`, or None when every id carries it (no filtering needed)."""
+        if self.count(label) == self.ntotal:
+            return None
+        return self._selectors.get(label)
+
+    def contains(self, label, ids) -> np.ndarray:
+        """Bool mask: which of `ids` carry `label` (same bitmap the selector uses)."""
+        ids = np.asarray(ids, dtype="int64")
+        bitmap = self._bitmaps.get(label)
+        if bitmap is None:
+            return np.zeros(len(ids), dtype=bool)
+        inside = (ids >= 0) & (ids < len(bitmap) * 8)
+        mask = np.zeros(len(ids), dtype=bool)
+        safe = ids[inside]
+        mask[inside] = (bitmap[safe >> 3] >> (safe & 7)) & 1
+        return mask
+
+
+# -----------------------------
+# Metadata
+# -----------------------------
+def build_meta(index_type: str, params: dict, index, embed_model: str,
+               vector_format: str = "float32", **extra) -> dict:
+    return {
+        "index_type": index_type,
+        "vector_format": vector_format,
+        "params": params,
+        "embed_model": embed_model,
+        "cross_lingual": embed_model in CROSS_LINGUAL_MODELS,
+        "metric": "l2",
+        "dim": index.d,
+        "ntotal": int(index.ntotal),
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        **extra,
+    }
+
+
+def write_meta(index_dir: str, meta: dict):
+    os.makedirs(index_dir, exist_ok=True)
+    with open(os.path.join(index_dir, META_FILE), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+
+
+def read_meta(index_dir: str) -> dict:
+    """Index metadata; indexes built before it existed are plain flat indexes."""
+    path = os.path.join(index_dir, META_FILE)
+    meta = {"index_type": "flat", "vector_format": "float32", "params": {}}
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            meta.update(json.load(f))
+
+    # build_index.py always embedded with the English model before this was recorded
+    meta.setdefault("embed_model", EMBED_MODELS["english"])
+    meta.setdefault("cross_lingual", meta["embed_model"] in CROSS_LINGUAL_MODELS)
+    return meta
@@ -0,0 +1,276 @@
+import json
+import math
+import os
+import re
+from array import array
+from collections import Counter
+
+import numpy as np
+
+# -----------------------------
+# Layout
+# -----------------------------
+# BM25 inverted index stored next to index.faiss, as compact posting arrays:
+#
+#   bm25.json          header: doc count, avg length, k1/b, sorted vocabulary
+#   bm25.offsets.npy   int64[V + 1] start of each term's postings
+#   bm25.ids.npy       int64[P]     faiss ids, grouped by term
+#   bm25.tfs.npy       int32[P]     term frequency of each posting
+#   bm25.lengths.npy   float32[max id + 1] token count of each faiss id
+#
+# Faiss ids are shared with the dense index and the docstore, so lexical and
+# dense hits can be fused without any id translation.
+VERSION = 1
+PREFIX = "bm25"
+
+K1 = 1.2
+B = 0.75
+RRF_K = 60                   # reciprocal rank fusion constant
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str):
+    """Lowercased word tokens; splits `"k: v | k: v"` CSV rows and firm names alike."""
+    return TOKEN_RE.findall(text.lower())
+
+
+def _path(index_dir, name):
+    return os.path.join(index_dir, f"{PREFIX}.{name}")
+
+
+def exists(index_dir) -> bool:
+    return os.path.exists(_path(index_dir, "json"))
+
+
+def _save_npy(path, values):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, values)
+    os.replace(tmp, path)
+
+# -----------------------------
+# Writer
+# -----------------------------
+class BM25Writer:
+    """
+    Accumulates postings per term in typed arrays; `close()` writes them as a
+    new index and `merge()` folds them into the existing one, each atomically.
+    """
+
+    def __init__(self, index_dir, k1: float = K1, b: float = B):
+        self.index_dir = index_dir
+        self.k1 = k1
+        self.b = b
+        self._postings = {}               # term -> (array of ids, array of tfs)
+        self._ids = array("q")
+        self._lengths = array("i")
+
+    def add(self, faiss_id, text: str):
+        tokens = tokenize(text)
+        self._ids.append(int(faiss_id))
+        self._lengths.append(len(tokens))
+        for term, tf in Counter(tokens).items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = (array("q"), array("i"))
+            postings[0].append(int(faiss_id))
+            postings[1].append(tf)
+
+    def _arrays(self):
+        """(sorted terms, offsets, ids, tfs) of the postings added so far."""
+        terms = sorted(self._postings)
+        sizes = np.fromiter((len(self._postings[t][0]) for t in terms),
+                            dtype="int64", count=len(terms))
+        offsets = np.zeros(len(terms) + 1, dtype="int64")
+        np.cumsum(sizes, out=offsets[1:])
+
+        ids = np.empty(offsets[-1], dtype="int64")
+        tfs = np.empty(offsets[-1], dtype="int32")
+        for j, term in enumerate(terms):
+            term_ids, term_tfs = self._postings[term]
+            ids[offsets[j]:offsets[j + 1]] = np.frombuffer(term_ids, dtype="int64")
+            tfs[offsets[j]:offsets[j + 1]] = np.frombuffer(term_tfs, dtype="int32")
+        return terms, offsets, ids, tfs
+
+    def _docs(self):
+        return (np.frombuffer(self._ids, dtype="int64"),
+                np.frombuffer(self._lengths, dtype="int32"))
+
+    def close(self):
+        """Write a fresh index holding only the added documents; returns the vocabulary size."""
+        terms, offsets, ids, tfs = self._arrays()
+        doc_ids, doc_lengths = self._docs()
+        lengths = np.zeros(int(doc_ids.max()) + 1 if len(doc_ids) else 0, dtype="float32")
+        lengths[doc_ids] = doc_lengths
+        avgdl = float(doc_lengths.mean()) if len(doc_ids) else 0.0
+        return self._write(terms, offsets, ids, tfs, lengths, len(doc_ids), avgdl)
+
+    def merge(self, stale_ids=()):
+        """
+        Fold the added documents into the index already in index_dir, dropping
+        the postings of `stale_ids` (documents of that index). Only the added
+        texts are tokenized; old postings are filtered and regrouped with array
+        ops. Returns the vocabulary size.
+        """
+        old = BM25Index(self.index_dir)
+        stale = np.unique(np.asarray(list(stale_ids), dtype="int64"))
+        new_terms, new_offsets, new_ids, new_tfs = self._arrays()
+
+        vocab = sorted(set(old.terms).union(new_terms))
+        position = {term: j for j, term in enumerate(vocab)}
+        old_pos = np.fromiter((position[t] for t in old.terms), dtype="int64",
+                              count=len(old.terms))
+        new_pos = np.fromiter((position[t] for t in new_terms), dtype="int64",
+                              count=len(new_terms))
+
+        keep = ~np.isin(old.ids, stale)
+        term_of = np.concatenate([np.repeat(old_pos, np.diff(old.offsets))[keep],
+                                  np.repeat(new_pos, np.diff(new_offsets))])
+        order = np.argsort(term_of, kind="stable")
+        ids = np.concatenate([old.ids[keep], new_ids])[order]
+        tfs = np.concatenate([old.tfs[keep], new_tfs])[order]
+
+        sizes = np.bincount(term_of, minlength=len(vocab))
+        used = sizes > 0                    # drop terms only stale documents had
+        terms = [term for term, u in zip(vocab, used) if u]
+        offsets = np.zeros(len(terms) + 1, dtype="int64")
+        np.cumsum(sizes[used], out=offsets[1:])
+
+        doc_ids, doc_lengths = self._docs()
+        size = max(len(old.lengths), int(doc_ids.max()) + 1 if len(doc_ids) else 0)
+        lengths = np.zeros(size, dtype="float32")
+        lengths[:len(old.lengths)] = old.lengths
+        lengths[stale[stale < len(old.lengths)]] = 0
+        lengths[doc_ids] = doc_lengths
+        count = old.count - len(stale) + len(doc_ids)
+        avgdl = float(lengths.sum()) / count if count else 0.0
+        return self._write(terms, offsets, ids, tfs, lengths, count, avgdl)
+
+    def _write(self, terms, offsets, ids, tfs, lengths, count, avgdl):
+        _save_npy(_path(self.index_dir, "offsets.npy"), offsets)
+        _save_npy(_path(self.index_dir, "ids.npy"), ids)
+        _save_npy(_path(self.index_dir, "tfs.npy"), tfs)
+        _save_npy(_path(self.index_dir, "lengths.npy"), lengths)
+
+        header = {
+            "version": VERSION,
+            "count": count,
+            "avgdl": avgdl,
+            "k1": self.k1,
+            "b": self.b,
+            "terms": terms,
+        }
+        tmp = _path(self.index_dir, "json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(header, f, ensure_ascii=False)
+        os.replace(tmp, _path(self.index_dir, "json"))
+        return len(terms)
+
+
+def build(index_dir, store) -> int:
+    """(Re)build the BM25 index from every row of a DocStore; returns the vocabulary size."""
+    writer = BM25Writer(index_dir)
+    for row in range(len(store)):
+        writer.add(store.faiss_ids[row], str(store.text_bytes_at(row), "utf-8"))
+    return writer.close()
+
+# -----------------------------
+# Reader
+# -----------------------------
+class BM25Index:
+    """Read-only, memory-mapped BM25 index written by BM25Writer."""
+
+    def __init__(self, index_dir):
+        with open(_path(index_dir, "json"), encoding="utf-8") as f:
+            header = json.load(f)
+        if header.get("version") != VERSION:
+            raise ValueError(f"Unsupported BM25 index version {header.get('version')}")
+
+        self.count = header["count"]
+        self.avgdl = header["avgdl"] or 1.0
+        self.k1 = header["k1"]
+        self.b = header["b"]
+        self.terms = header["terms"]
+        self.vocab = {term: j for j, term in enumerate(self.terms)}
+
+        def load(name):
+            return np.load(_path(index_dir, f"{name}.npy"), mmap_mode="r")
+
+        self.offsets = load("offsets")
+        self.ids = load("ids")
+        self.tfs = load("tfs")
+        self.lengths = load("lengths")
+
+    def __len__(self):
+        return self.count
+
+    def df(self, term: str) -> int:
+        j = self.vocab.get(term)
+        return 0 if j is None else int(self.offsets[j + 1] - self.offsets[j])
+
+    def search(self, query: str, k: int, allowed=None, corpus=None):
+        """
+        (faiss ids, scores) of the top-k documents for one query, best first.
+        `allowed(ids) -> bool mask` restricts hits, e.g. to one language.
+        `corpus` (a CorpusStats) supplies the document count, average length
+        and document frequencies, so shards score on one scale.
+        """
+        corpus = corpus or self
+        hit_ids, hit_scores = [], []
+        for term, qtf in Counter(tokenize(query)).items():
+            j = self.vocab.get(term)
+            if j is None:
+                continue
+            lo, hi = self.offsets[j], self.offsets[j + 1]
+            ids = np.asarray(self.ids[lo:hi])
+            tf = np.asarray(self.tfs[lo:hi], dtype="float32")
+            norm = self.k1 * (1 - self.b + self.b * self.lengths[ids] / corpus.avgdl)
+            df = len(ids) if corpus is self else corpus.df(term)
+            idf = math.log(1 + (corpus.count - df + 0.5) / (df + 0.5))
+            hit_ids.append(ids)
+            hit_scores.append(qtf * idf * tf * (self.k1 + 1) / (tf + norm))
+
+        if not hit_ids:
+            return np.empty(0, dtype="int64"), np.empty(0, dtype="float32")
+
+        ids, inverse = np.unique(np.concatenate(hit_ids), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(hit_scores)).astype("float32")
+        if allowed is not None:
+            keep = allowed(ids)
+            ids, scores = ids[keep], scores[keep]
+
+        if len(ids) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+            ids, scores = ids[top], scores[top]
+        order = np.argsort(-scores, kind="stable")
+        return ids[order], scores[order]
+
+
+class CorpusStats:
+    """
+    BM25 collection statistics (document count, average length, document
+    frequency) summed over several indexes. Shards scored with it give the
+    scores one unsharded index would, so their hits can be merged by score.
+    """
+
+    def __init__(self, indexes):
+        self.indexes = list(indexes)
+        self.count = sum(index.count for index in self.indexes)
+        total_length = sum(index.count * index.avgdl for index in self.indexes)
+        self.avgdl = total_length / self.count if self.count else 1.0
+
+    def df(self, term: str) -> int:
+        return sum(index.df(term) for index in self.indexes)
+
+
+def reciprocal_rank_fusion(rankings, k: int, c: int = RRF_K):
+    """Top-k ids by RRF score sum(1 / (c + rank)) over several ranked id lists (-1 = padding)."""
+    scores = {}
+    for ranking in rankings:
+        for rank, faiss_id in enumerate(ranking):
+            faiss_id = int(faiss_id)
+            if faiss_id == -1:
+                continue
+            scores[faiss_id] = scores.get(faiss_id, 0.0) + 1.0 / (c + rank + 1)
+    return sorted(scores, key=scores.get, reverse=True)[:k]
@@ -0,0 +1,204 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, List
+
+import numpy as np
+
+from rag import lexical, tracing
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+
+# -----------------------------
+# Config
+# -----------------------------
+MODEL_NAME = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+OVERLAP_MODEL = "aiverse/overlap-reranker"      # offline stand-in (see OverlapScorer)
+
+# Set AIVERSE_RERANK=1 to re-rank answer evidence by default
+RERANK = os.getenv("AIVERSE_RERANK", "0") != "0"
+RERANK_MODEL = os.getenv("AIVERSE_RERANK_MODEL", MODEL_NAME)
+# Latency budget of one scoring pass. Every query of a batch waits for the same
+# pass, so this is also the most re-ranking adds to any single query.
+PASS_BUDGET_MS = float(os.getenv("AIVERSE_RERANK_PASS_BUDGET_MS", "60"))
+CANDIDATES = 4            # over-fetch: k x CANDIDATES bi-encoder hits are re-scored
+MAX_LENGTH = 256          # tokens per (query, chunk) pair
+BATCH_SIZE = 64
+CACHE_ENTRIES = 50_000
+COST_DECAY = 0.2          # weight of the newest measurement in the per-pair cost average
+
+# -----------------------------
+# Scorers
+# -----------------------------
+class OverlapScorer:
+    """
+    No-model stand-in for the cross-encoder: share of the query's BM25 terms
+    found in the chunk. Lets the re-ranking stage run (and be benchmarked)
+    offline. Same `predict(pairs)` interface as sentence-transformers'
+    CrossEncoder.
+    """
+
+    def predict(self, pairs, batch_size: int = BATCH_SIZE, **kwargs) -> np.ndarray:
+        scores = []
+        for query, text in pairs:
+            terms = set(lexical.tokenize(query))
+            found = terms & set(lexical.tokenize(text))
+            scores.append(len(found) / len(terms) if terms else 0.0)
+        return np.asarray(scores, dtype="float32")
+
+
+def load_model(model_name: str = RERANK_MODEL):
+    if model_name == OVERLAP_MODEL:
+        return OverlapScorer()
+    # torch / sentence-transformers load here, not at import
+    from sentence_transformers import CrossEncoder
+    return CrossEncoder(model_name, max_length=MAX_LENGTH, device="cpu")
+
+# -----------------------------
+# Re-ranker
+# -----------------------------
+def pair_key(query: str, text: str) -> bytes:
+    return hashlib.blake2b(f"{query}\0{text}".encode("utf-8"), digest_size=16).digest()
+
+
+class Reranker:
+    """
+    Re-scores bi-encoder candidates with a cross-encoder, every uncached
+    (query, chunk) pair of a batch in one forward pass. Scores are kept in an
+    LRU cache keyed by the pair.
+
+    `budget_ms` bounds the whole forward pass, not each query's share of it:
+    every query in a batch waits for the same pass, so bounding the pass
+    bounds the latency each one sees. The cost of uncached pairs is predicted
+    from a running per-pair average (calibrated on load), queries are
+    admitted in order while the predicted pass fits, and the rest keep their
+    bi-encoder order instead of waiting.
+    """
+
+    def __init__(self, model_name: str = RERANK_MODEL, budget_ms: float = PASS_BUDGET_MS,
+                 cache_entries: int = CACHE_ENTRIES):
+        self.model_name = model_name
+        self.budget_ms = budget_ms
+        self.cache_entries = cache_entries
+        self.pair_ms = None
+
+        self._model = None
+        self._load_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._scores = OrderedDict()    # pair key -> score
+
+        self.stats = {"queries": 0, "reranked": 0, "over_budget": 0,
+                      "pairs_scored": 0, "cache_hits": 0, "late": 0}
+
+    def warm(self):
+        """Load the model and measure its per-pair cost."""
+        if self._model is None:
+            with self._load_lock:
+                if self._model is None:
+                    with tracing.span("rerank.model_load", model=self.model_name):
+                        model = load_model(self.model_name)
+                        pairs = [("calibration query", "a typical retrieved chunk " * 40)] * 16
+                        model.predict(pairs[:2], batch_size=BATCH_SIZE)      # first call warms kernels
+                        start = time.perf_counter()
+                        model.predict(pairs, batch_size=BATCH_SIZE)
+                        self.pair_ms = (time.perf_counter() - start) * 1000 / len(pairs)
+                    self._model = model
+        return self
+
+    def _measured(self, n_pairs: int, elapsed_ms: float):
+        with self._lock:
+            self.pair_ms = (1 - COST_DECAY) * self.pair_ms + COST_DECAY * elapsed_ms / n_pairs
+
+    def rerank(self, queries: List[str], candidates: List[List["Document"]],
+               k: int) -> List[List["Document"]]:
+        """
+        Top-k of every query's candidates by cross-encoder score (best first).
+        Queries that do not fit the pass budget get their first k candidates
+        in bi-encoder order.
+        """
+        self.warm()
+        keys = [[pair_key(query, doc.page_content) for doc in docs]
+                for query, docs in zip(queries, candidates)]
+
+        # Cached scores are free; the rest are costed against the budget
+        scores, todo, hits = [], [], 0
+        cost_ms = 0.0
+        with self._lock:
+            for row, row_keys in enumerate(keys):
+                known = [self._scores.get(key) for key in row_keys]
+                for key, score in zip(row_keys, known):
+                    if score is not None:
+                        self._scores.move_to_end(key)
+                missing = [j for j, score in enumerate(known) if score is None]
+                hits += len(known) - len(missing)
+                if cost_ms + len(missing) * self.pair_ms > self.budget_ms:
+                    scores.append(None)
+                else:
+                    cost_ms += len(missing) * self.pair_ms
+                    scores.append(known)
+                    todo.extend((row, j) for j in missing)
+            over = sum(row_scores is None for row_scores in scores)
+            self.stats["queries"] += len(queries)
+            self.stats["over_budget"] += over
+            self.stats["cache_hits"] += hits
+        tracing.count("rerank.cache_hits", hits)
+        tracing.count("rerank.over_budget", over)
+
+        if todo:
+            pairs = [(queries[row], candidates[row][j].page_content) for row, j in todo]
+            start = time.perf_counter()
+            with tracing.span("rerank.score", pairs=len(pairs)):
+                predicted = np.asarray(
+                    self._model.predict(pairs, batch_size=BATCH_SIZE), dtype="float32"
+                ).reshape(-1)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self._measured(len(pairs), elapsed_ms)
+
+            with self._lock:
+                for (row, j), score in zip(todo, predicted.tolist()):
+                    scores[row][j] = score
+                    self._scores[keys[row][j]] = score
+                while len(self._scores) > self.cache_entries:
+                    self._scores.popitem(last=False)
+                self.stats["pairs_scored"] += len(pairs)
+                if elapsed_ms > self.budget_ms:
+                    self.stats["late"] += 1     # prediction was off; the average adapts
+            tracing.count("rerank.pairs_scored", len(pairs))
+
+        results = []
+        for docs, row_scores in zip(candidates, scores):
+            if row_scores is None:
+                results.append(list(docs[:k]))
+                continue
+            order = np.argsort(-np.asarray(row_scores, dtype="float32"), kind="stable")
+            results.append([docs[j] for j in order[:k]])
+        with self._lock:
+            self.stats["reranked"] += len(queries) - over
+        return results
+
+    def clear(self):
+        with self._lock:
+            self._scores.clear()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {**self.stats, "model": self.model_name, "budget_ms": self.budget_ms,
+                    "pair_ms": round(self.pair_ms, 4) if self.pair_ms else None,
+                    "cached_pairs": len(self._scores)}
+
+
+_reranker = None
+_reranker_lock = threading.Lock()
+
+
+def get_reranker() -> Reranker:
+    """Process-wide re-ranker; the model loads on first use."""
+    global _reranker
+    if _reranker is None:
+        with _reranker_lock:
+            if _reranker is None:
+                _reranker = Reranker()
+    return _reranker
@@ -1,9 +1,18 @@
 import os
-from typing import List
+import threading
+import time
+from typing import TYPE_CHECKING, List
 
-from langchain_community.vectorstores import FAISS
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_core.documents import Document
+import numpy as np
+
+from rag import docstore, lexical, shards, snapshot, tracing
+from rag.hash_embeddings import HashEmbeddings
+from rag.indexing import (
+    EMBED_MODELS, LabelFilter, read_index, read_meta, search_params, widened
+)
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
 
 # -----------------------------
 # Paths
@@ -11,44 +20,524 @@ from langchain_core.documents import Document
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 VECTORSTORE_DIR = os.path.join(BASE_DIR, "vectorstore", "faiss_index")
 
+# Pin the embedding model the retriever accepts; unset = use whatever the
+# index was built with (recorded in index_meta.json)
+EMBED_MODEL = os.getenv("AIVERSE_EMBED_MODEL") or None
+# Force the query embedding backend; unset = the index's recorded backend,
+# through its snapshot when one of the same precision exists
+EMBED_BACKEND = os.getenv("AIVERSE_EMBED_BACKEND") or None
+RELOAD_CHECK_INTERVAL = 5.0   # seconds between on-disk change checks
+DEFAULT_LANGUAGE = "en"       # chunks indexed before language tagging
+MAX_WIDEN = 3                 # filtered ANN retries with a wider nprobe / efSearch
+# Fuse BM25 hits into dense results (when the index has a bm25.* sidecar)
+HYBRID = os.getenv("AIVERSE_HYBRID", "1") != "0"
+# Memory-map the FAISS index file instead of reading it into RAM
+MMAP_INDEX = os.getenv("AIVERSE_MMAP_INDEX", "1") != "0"
+
 # -----------------------------
 # Embeddings
 # -----------------------------
-def get_embeddings():
+def get_embeddings(model_name: str = EMBED_MODELS["english"],
+                   backend: str = snapshot.EMBED_BACKEND):
+    """
+    Embeddings for `model_name` on `backend`: "torch" (sentence-transformers)
+    or an exported ONNX / int8 ONNX / TorchScript encoder of the same model.
+    """
+    if model_name == EMBED_MODELS["hash"]:
+        return HashEmbeddings(model_name)
+    if backend != "torch":
+        return snapshot.encoder(model_name, backend)
+    # torch / sentence-transformers load here, not at import
+    from langchain_community.embeddings import HuggingFaceEmbeddings
     return HuggingFaceEmbeddings(
-        model_name="sentence-transformers/all-MiniLM-L6-v2"
+        model_name=model_name
     )
 
+
+def check_embed_model(meta: dict, expected: str = None) -> str:
+    """Model to embed queries with; refuses indexes built with a different one."""
+    model = meta["embed_model"]
+    if expected and model != expected:
+        raise ValueError(
+            f"Index was built with '{model}' but the retriever expects '{expected}'. "
+            f"Rebuild the index with that model or unset AIVERSE_EMBED_MODEL."
+        )
+    return model
+
 # -----------------------------
 # Load FAISS
 # -----------------------------
-def load_vectorstore():
-    embeddings = get_embeddings()
+def load_index(index_dir: str = VECTORSTORE_DIR, mmap: bool = MMAP_INDEX):
+    """(faiss index, memory-mapped DocStore) for an index directory."""
+    if not docstore.exists(index_dir):
+        raise FileNotFoundError(
+            f"No docstore in {index_dir}; rebuild it with `python build_index.py --full`"
+        )
+    index = read_index(os.path.join(index_dir, "index.faiss"), read_meta(index_dir),
+                       mmap=mmap)
+    return index, docstore.DocStore(index_dir)
 
-    vectorstore = FAISS.load_local(
-        VECTORSTORE_DIR,
-        embeddings,
-        allow_dangerous_deserialization=True
-    )
-    return vectorstore
+
+def load_lexical(index_dir: str = VECTORSTORE_DIR):
+    """Memory-mapped BM25 index, or None for indexes built without one."""
+    if not lexical.exists(index_dir):
+        return None
+    return lexical.BM25Index(index_dir)
+
+
+def index_fingerprint(index_dir: str = VECTORSTORE_DIR):
+    """(path, mtime, size) of every file in the index dir and its shards, or None if absent."""
+    if not os.path.isdir(index_dir):
+        return None
+
+    entries = []
+    for root, dirs, files in os.walk(index_dir):
+        dirs.sort()
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            if not name.endswith(".tmp"):
+                st = os.stat(path)
+                entries.append((os.path.relpath(path, index_dir), st.st_mtime_ns, st.st_size))
+
+    return tuple(entries) or None
+
+
+def language_filter(store) -> LabelFilter:
+    """Per-language id bitmaps built from the `language` column of the docstore."""
+    languages = store.labels("language", default=DEFAULT_LANGUAGE)
+    return LabelFilter(store.faiss_ids, languages)
+
+def _search(index, index_type, vectors, k, languages, language,
+            nprobe=None, ef_search=None):
+    """(distances, faiss ids) (rows padded with -1) for a stacked query matrix, optionally language-filtered."""
+    sel = None
+    if language:
+        count = languages.count(language)
+        if not count:
+            empty = np.full((len(vectors), 0), -1, dtype="int64")
+            return empty.astype("float32"), empty
+        sel = languages.selector(language)
+        k = min(k, count)
+
+    params = search_params(index, index_type, nprobe, ef_search, sel)
+    distances, ids = index.search(vectors, k, params=params)
+
+    # ANN indexes may visit too few in-language ids; widen and retry the short rows
+    for _ in range(MAX_WIDEN if sel is not None else 0):
+        short = np.flatnonzero((ids != -1).sum(axis=1) < k)
+        if not len(short):
+            break
+        knobs = widened(index, index_type, nprobe, ef_search)
+        if knobs is None:
+            break
+        nprobe, ef_search = knobs
+        params = search_params(index, index_type, nprobe, ef_search, sel)
+        distances[short], ids[short] = index.search(vectors[short], k, params=params)
+
+    return distances, ids
 
 # -----------------------------
-# Retrieve
+# Shards
 # -----------------------------
-def retrieve(query: str, language: str = "en", k: int = 5) -> List[Document]:
-    vectorstore = load_vectorstore()
+class Shard:
+    """
+    One searchable index directory (faiss index, docstore, BM25, language
+    filter). An unsharded index is a single shard numbered 0, so its result
+    ids are plain faiss ids.
+    """
 
-    retriever = vectorstore.as_retriever(
-        search_type="similarity",
-        search_kwargs={"k": k}
+    def __init__(self, index_dir: str, number: int = 0, meta: dict = None):
+        self.index_dir = index_dir
+        self.number = number
+        self.meta = meta or read_meta(index_dir)
+        self.index, self.store = load_index(index_dir)
+        self.bm25 = load_lexical(index_dir)
+        self.corpus = None          # corpus-wide BM25 statistics when there are several shards
+        self.languages = language_filter(self.store)
+
+    def search(self, vectors, k, language=None, nprobe=None, ef_search=None):
+        """(distances, global ids) of the shard's top-k per query row."""
+        distances, ids = _search(self.index, self.meta["index_type"], vectors, k,
+                                 self.languages, language, nprobe, ef_search)
+        return distances, shards.global_ids(self.number, ids)
+
+    def lexical(self, queries, k, languages):
+        """([BM25 scores], [global ids]) of the shard's top-k per query, best first."""
+        scores, ids = [], []
+        for query, lang in zip(queries, languages):
+            allowed = None
+            if lang and self.languages.count(lang) != self.languages.ntotal:
+                allowed = lambda found, lang=lang: self.languages.contains(lang, found)
+            found, found_scores = self.bm25.search(query, k, allowed, self.corpus)
+            scores.append(found_scores)
+            ids.append(shards.global_ids(self.number, found))
+        return scores, ids
+
+    def filtered(self, language) -> int:
+        """Chunks a search restricted to `language` never scores."""
+        return self.languages.ntotal - self.languages.count(language)
+
+
+def index_meta(index_dir: str = VECTORSTORE_DIR):
+    """
+    (meta, [(shard dir, shard meta)]) for an index directory. A sharded index
+    reports the first shard's settings plus its layout and total size; every
+    shard must have been built with the same embedding model.
+    """
+    layout = shards.read_layout(index_dir)
+    if layout is None:
+        meta = read_meta(index_dir)
+        return meta, [(index_dir, meta)]
+
+    if not layout["shards"]:
+        raise FileNotFoundError(f"Sharded index {index_dir} has no shards; rebuild it")
+    parts = [(path, read_meta(path))
+             for path in (shards.shard_dir(index_dir, name) for name in layout["shards"])]
+    meta = dict(parts[0][1])
+    for path, shard_meta in parts[1:]:
+        check_embed_model(shard_meta, meta["embed_model"])
+    meta.update(
+        shard_by=layout["shard_by"],
+        shards=layout["shards"],
+        ntotal=sum(m.get("ntotal", 0) for _, m in parts),
     )
+    return meta, parts
 
-    docs = retriever.invoke(query)
 
-    if language:
-        docs = [
-            doc for doc in docs
-            if doc.metadata.get("language", "en") == language
-        ]
+def _fetch(loaded, global_id):
+    number, faiss_id = shards.split_id(global_id)
+    return loaded[number].store.get(faiss_id)
+
+# -----------------------------
+# Warm Retriever
+# -----------------------------
+class WarmRetriever:
+    """
+    Keeps the embedding model and FAISS index resident for the whole process.
+    A sharded index (see rag/shards.py) is loaded shard by shard and every
+    query fans out to all shards concurrently.
+
+    The index directory is polled at most every `check_interval` seconds. When
+    it changes (and has stopped changing since the previous poll, so a build in
+    progress is not picked up half-written) the new index is loaded on a
+    background thread and swapped in; queries keep hitting the old copy until
+    the swap.
+    """
+
+    def __init__(self, index_dir: str = VECTORSTORE_DIR,
+                 check_interval: float = RELOAD_CHECK_INTERVAL,
+                 embed_model: str = EMBED_MODEL,
+                 backend: str = EMBED_BACKEND):
+        self.index_dir = index_dir
+        self.check_interval = check_interval
+        self.embed_model = embed_model
+        self.backend = backend
+
+        self._embeddings = None
+        self._embeddings_key = None       # (model, backend) of _embeddings
+        # (shards, meta, embeddings), swapped as one
+        self._state = None
+        self._fingerprint = None
+        self._pending_fingerprint = None
+        self._last_check = 0.0
+        self._reloading = False
+
+        self._load_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+
+        self.timings = {
+            "embed_backend": None,
+            "model_load_s": None,
+            "index_load_s": None,
+            "index_loads": 0,
+            "queries": 0,
+            "batches": 0,
+            "last_query_s": None,
+            "total_query_s": 0.0,
+            "total_embed_s": 0.0,
+            "total_search_s": 0.0,
+            "total_lexical_s": 0.0,
+        }
+
+    # ---- loading ----
+    def _load(self):
+        fingerprint = index_fingerprint(self.index_dir)
+        meta, parts = index_meta(self.index_dir)
+        model_name = check_embed_model(meta, self.embed_model)
+        # Queries are embedded like the corpus was, unless a backend is forced
+        backend = self.backend or meta.get("embed_backend", "torch")
+
+        embeddings = self._embeddings
+        if embeddings is None or self._embeddings_key != (model_name, backend):
+            start = time.perf_counter()
+            with tracing.span("retriever.model_load", model=model_name) as span:
+                # a forced backend is used as is; otherwise the index's snapshot
+                # when it has the recorded precision, else the recorded backend
+                embeddings = None
+                if self.backend is None:
+                    embeddings = snapshot.load(self.index_dir, model_name, backend)
+                span.set(snapshot=embeddings is not None)
+                if embeddings is None:
+                    embeddings = get_embeddings(model_name, backend)
+            self.timings["model_load_s"] = round(time.perf_counter() - start, 4)
+            self.timings["embed_backend"] = getattr(embeddings, "kind", backend)
+
+        start = time.perf_counter()
+        with tracing.span("retriever.index_load", index_dir=self.index_dir,
+                          shards=len(parts)) as span:
+            loaded = shards.fan_out(
+                lambda number: Shard(parts[number][0], number, parts[number][1]),
+                range(len(parts))
+            )
+            span.set(vectors=sum(shard.index.ntotal for shard in loaded))
+        # Per-shard IDF and length norms are not comparable; score every shard
+        # against the whole corpus so lexical hits merge by score
+        if len(loaded) > 1 and all(shard.bm25 is not None for shard in loaded):
+            corpus = lexical.CorpusStats(shard.bm25 for shard in loaded)
+            for shard in loaded:
+                shard.corpus = corpus
+        elapsed = time.perf_counter() - start
+
+        # Single reference assignment: readers see either the old or the new store
+        self._embeddings = embeddings
+        self._embeddings_key = (model_name, backend)
+        self._state = (loaded, meta, embeddings)
+        self._fingerprint = fingerprint
+        self.timings["index_load_s"] = round(elapsed, 4)
+        self.timings["index_loads"] += 1
 
-    return docs
+    def _reload(self):
+        try:
+            with self._load_lock:
+                self._load()
+        except Exception as e:
+            print(f"⚠️ Index reload failed, keeping previous index: {e}")
+        finally:
+            self._reloading = False
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if self._reloading or now - self._last_check < self.check_interval:
+            return
+        self._last_check = now
+
+        fingerprint = index_fingerprint(self.index_dir)
+        if fingerprint is None or fingerprint == self._fingerprint:
+            self._pending_fingerprint = None
+            return
+
+        # Only reload once the directory is stable across two checks
+        if fingerprint != self._pending_fingerprint:
+            self._pending_fingerprint = fingerprint
+            return
+
+        self._pending_fingerprint = None
+        self._reloading = True
+        threading.Thread(target=self._reload, daemon=True).start()
+
+    def warm(self):
+        if self._state is None:
+            with self._load_lock:
+                if self._state is None:
+                    self._load()
+                    self._last_check = time.monotonic()
+        else:
+            self._maybe_reload()
+        return self
+
+    @property
+    def shards(self) -> List[Shard]:
+        return self.warm()._state[0]
+
+    def _only_shard(self) -> Shard:
+        loaded = self.shards
+        if len(loaded) != 1:
+            raise ValueError(f"{self.index_dir} has {len(loaded)} shards; use `shards`")
+        return loaded[0]
+
+    @property
+    def index(self):
+        return self._only_shard().index
+
+    @property
+    def docstore(self):
+        return self._only_shard().store
+
+    @property
+    def meta(self) -> dict:
+        return self.warm()._state[1]
+
+    @property
+    def ready(self) -> bool:
+        """True once the model and index are loaded (does not trigger a load)."""
+        return self._state is not None
+
+    @property
+    def generation(self) -> int:
+        """Bumped every time a (re)built index is loaded."""
+        return self.warm().timings["index_loads"]
+
+    @property
+    def cross_lingual(self) -> bool:
+        """True when queries in any language can be searched without translation."""
+        return bool(self.meta.get("cross_lingual"))
+
+    @property
+    def languages(self) -> dict:
+        """Chunk count per language tag."""
+        counts = {}
+        for shard in self.shards:
+            for language, count in shard.languages.counts.items():
+                counts[language] = counts.get(language, 0) + count
+        return counts
+
+    # ---- querying ----
+    def search(self, query: str, k: int = 5, language: str = None,
+               nprobe: int = None, ef_search: int = None,
+               hybrid: bool = None) -> List["Document"]:
+        """
+        Top-k documents for `query`. With `language`, only chunks tagged with
+        that language are scored, so up to `k` in-language hits come back.
+        `nprobe` (IVF) and `ef_search` (HNSW) override the persisted defaults
+        for this call only. `hybrid` fuses BM25 hits into the dense ranking
+        (default: HYBRID, when the index has a BM25 sidecar).
+        """
+        return self.search_many([query], k, language, nprobe, ef_search, hybrid=hybrid)[0]
+
+    def embed(self, queries: List[str]) -> np.ndarray:
+        """Query vectors from the model the index was built with, one encoder call."""
+        embeddings = self.warm()._state[2]
+        with tracing.span("retrieve.embed", queries=len(queries)):
+            return np.asarray(embeddings.embed_documents(list(queries)), dtype="float32")
+
+    def search_many(self, queries: List[str], k: int = 5, language=None,
+                    nprobe: int = None, ef_search: int = None,
+                    vectors: np.ndarray = None,
+                    hybrid: bool = None) -> List[List["Document"]]:
+        """
+        Top-k documents for every query, in input order. All queries are
+        embedded in one encoder call and searched with one faiss call per
+        distinct language. `language` is a single tag for every query or a
+        list with one tag per query. Pass `vectors` (from `embed`) to skip
+        encoding.
+        """
+        if not len(queries):
+            return []
+
+        loaded, meta, embeddings = self.warm()._state
+        if hybrid is None:
+            hybrid = HYBRID
+        hybrid = hybrid and all(shard.bm25 is not None for shard in loaded)
+        if isinstance(language, (list, tuple)):
+            query_languages = list(language)
+        else:
+            query_languages = [language] * len(queries)
+
+        start = time.perf_counter()
+        if vectors is None:
+            with tracing.span("retrieve.embed", queries=len(queries)):
+                vectors = np.asarray(
+                    embeddings.embed_documents(list(queries)), dtype="float32"
+                )
+        embedded = time.perf_counter()
+
+        groups = {}
+        for row, lang in enumerate(query_languages):
+            groups.setdefault(lang or None, []).append(row)
+
+        # Every shard searches its own top-k (concurrently); a heap merges them
+        ids = np.full((len(queries), k), -1, dtype="int64")
+        for lang, rows in groups.items():
+            with tracing.span("retrieve.search", index_type=meta["index_type"],
+                              queries=len(rows), language=lang, shards=len(loaded)):
+                found = shards.merge_topk(shards.fan_out(
+                    lambda shard: shard.search(vectors[rows], k, lang, nprobe, ef_search),
+                    loaded
+                ), k)
+            ids[rows, :found.shape[1]] = found
+            if lang is not None:
+                # chunks the language filter kept out of every one of these searches
+                tracing.count("retrieve.language_filtered",
+                              len(rows) * sum(shard.filtered(lang) for shard in loaded))
+        searched = time.perf_counter()
+
+        # Lexical top-k per query, fused with the dense top-k by reciprocal rank
+        if hybrid:
+            with tracing.span("retrieve.lexical", queries=len(queries)):
+                lexical_ids = shards.merge_topk(shards.fan_out(
+                    lambda shard: shard.lexical(queries, k, query_languages), loaded
+                ), k, largest=True)
+                ids = [
+                    lexical.reciprocal_rank_fusion([dense, sparse], k)
+                    for dense, sparse in zip(ids, lexical_ids)
+                ]
+        fused = time.perf_counter()
+
+        with tracing.span("retrieve.fetch") as span:
+            results = [
+                [_fetch(loaded, i) for i in row if i != -1]
+                for row in ids
+            ]
+            span.set(docs=sum(map(len, results)))
+        tracing.count("retrieve.queries", len(queries))
+        tracing.count("retrieve.docs", sum(map(len, results)))
+        self._record(len(queries), fused - start,
+                     embedded - start, searched - embedded, fused - searched)
+        return results
+
+    def _record(self, n_queries: int, elapsed: float, embed_s: float, search_s: float,
+                lexical_s: float = 0.0):
+        with self._stats_lock:
+            self.timings["queries"] += n_queries
+            self.timings["batches"] += 1
+            self.timings["last_query_s"] = round(elapsed, 4)
+            self.timings["total_query_s"] += elapsed
+            self.timings["total_embed_s"] += embed_s
+            self.timings["total_search_s"] += search_s
+            self.timings["total_lexical_s"] += lexical_s
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            stats = dict(self.timings)
+        queries = stats["queries"]
+        stats["avg_query_s"] = (
+            round(stats["total_query_s"] / queries, 4) if queries else None
+        )
+        for key in ("total_query_s", "total_embed_s", "total_search_s", "total_lexical_s"):
+            stats[key] = round(stats[key], 4)
+        return stats
+
+
+_retriever = None
+_retriever_lock = threading.Lock()
+
+
+def get_retriever() -> WarmRetriever:
+    """Process-wide retriever shared by every caller (and Streamlit rerun)."""
+    global _retriever
+    if _retriever is None:
+        with _retriever_lock:
+            if _retriever is None:
+                _retriever = WarmRetriever()
+    return _retriever
+
+# -----------------------------
+# Retrieve
+# -----------------------------
+def retrieve(query: str, language: str = "en", k: int = 5,
+             nprobe: int = None, ef_search: int = None,
+             hybrid: bool = None) -> List["Document"]:
+    return get_retriever().search(
+        query, k=k, language=language, nprobe=nprobe, ef_search=ef_search,
+        hybrid=hybrid
+    )
+
+
+def retrieve_many(queries: List[str], language="en", k: int = 5,
+                  nprobe: int = None, ef_search: int = None,
+                  hybrid: bool = None) -> List[List["Document"]]:
+    """Batched `retrieve`: one encode + one faiss search per language, results in input order."""
+    return get_retriever().search_many(
+        queries, k=k, language=language, nprobe=nprobe, ef_search=ef_search,
+        hybrid=hybrid
+    )
@@ -0,0 +1,124 @@
+import hashlib
+import heapq
+import itertools
+import json
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# -----------------------------
+# Config
+# -----------------------------
+# A sharded index directory holds LAYOUT_FILE plus one complete index
+# directory (index.faiss, docstore, BM25, manifest, ...) per shard under
+# SHARDS_DIR. Sources are assigned to shards whole, by file:
+# type   one shard per source type (pdf / csv / text)
+# hash   NUM_HASH_SHARDS shards by a hash of the source path
+LAYOUT_FILE = "shards.json"
+SHARDS_DIR = "shards"
+SHARD_BY = ("type", "hash")
+NUM_HASH_SHARDS = 4
+
+# Result ids across shards: shard number above ID_BITS, the shard's faiss id below
+ID_BITS = 40
+ID_MASK = (1 << ID_BITS) - 1
+
+# Threads searching shards concurrently (faiss and numpy release the GIL)
+SEARCH_THREADS = int(os.getenv("AIVERSE_SHARD_THREADS", "0")) or min(32, os.cpu_count() or 1)
+
+# -----------------------------
+# Layout
+# -----------------------------
+def shard_name(path: str, source_type: str, shard_by: str = "type",
+               num_shards: int = NUM_HASH_SHARDS) -> str:
+    """Shard a source file belongs to."""
+    if shard_by == "type":
+        return source_type
+    if shard_by == "hash":
+        bucket = int(hashlib.sha1(path.encode("utf-8")).hexdigest()[:8], 16) % num_shards
+        return f"{bucket:02d}"
+    raise ValueError(f"Unknown shard scheme '{shard_by}', expected one of {SHARD_BY}")
+
+
+def shard_dir(index_dir: str, name: str) -> str:
+    return os.path.join(index_dir, SHARDS_DIR, name)
+
+
+def read_layout(index_dir: str):
+    """Shard layout of an index directory, or None for a single (unsharded) index."""
+    path = os.path.join(index_dir, LAYOUT_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_layout(index_dir: str, layout: dict):
+    path = os.path.join(index_dir, LAYOUT_FILE)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(layout, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def clear(index_dir: str):
+    """Drop the shard layout and every shard directory."""
+    path = os.path.join(index_dir, LAYOUT_FILE)
+    if os.path.exists(path):
+        os.remove(path)
+    shutil.rmtree(os.path.join(index_dir, SHARDS_DIR), ignore_errors=True)
+
+# -----------------------------
+# Fan-out + Merge
+# -----------------------------
+def global_ids(number: int, ids: np.ndarray) -> np.ndarray:
+    """A shard's faiss ids tagged with its shard number (-1 padding kept)."""
+    ids = np.asarray(ids, dtype="int64")
+    if not number:
+        return ids
+    return np.where(ids == -1, -1, ids | (number << ID_BITS))
+
+
+def split_id(global_id: int):
+    """(shard number, faiss id within the shard)."""
+    global_id = int(global_id)
+    return global_id >> ID_BITS, global_id & ID_MASK
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def fan_out(fn, shards):
+    """`fn(shard)` for every shard, concurrently on a shared thread pool; results in order."""
+    if len(shards) == 1:
+        return [fn(shards[0])]
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(SEARCH_THREADS, thread_name_prefix="shard-search")
+    return list(_pool.map(fn, shards))
+
+
+def merge_topk(results, k: int, largest: bool = False):
+    """
+    Merge per-shard top-k lists into one global top-k per query.
+    `results[shard] = (scores, ids)`, rows aligned by query and each row
+    sorted best first (ascending distance, or descending score with
+    `largest`). Returns ranked ids per query, padded with -1.
+    """
+    if len(results) == 1:
+        return results[0][1]
+
+    n = len(results[0][1])
+    merged = np.full((n, k), -1, dtype="int64")
+    for row in range(n):
+        ranked = heapq.merge(
+            *(zip(scores[row], ids[row]) for scores, ids in results), reverse=largest
+        )
+        best = [i for _, i in itertools.islice(((s, i) for s, i in ranked if i != -1), k)]
+        merged[row, :len(best)] = best
+    return merged
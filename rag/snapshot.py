@@ -0,0 +1,296 @@
+import argparse
+import json
+import logging
+import os
+import shutil
+import time
+from typing import List
+
+import numpy as np
+
+from rag import tracing
+from rag.indexing import EMBED_MODELS, read_meta
+
+logger = logging.getLogger("aiverse.snapshot")
+
+# -----------------------------
+# Config
+# -----------------------------
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+VECTORSTORE_DIR = os.path.join(BASE_DIR, "vectorstore", "faiss_index")
+
+SNAPSHOT_DIR = "snapshot"     # inside the index directory
+ENCODER_CACHE = os.path.join(BASE_DIR, "cache", "encoders")   # per model + kind
+INFO_FILE = "snapshot.json"
+# onnx         ONNX graph run by onnxruntime (no torch import at query time)
+# onnx_int8    the ONNX graph with dynamically int8-quantized weights
+# torchscript  traced TorchScript module (needs torch, not transformers)
+KINDS = ("onnx", "onnx_int8", "torchscript")
+ENCODER_FILES = {"onnx": "encoder.onnx", "onnx_int8": "encoder.int8.onnx",
+                 "torchscript": "encoder.pt"}
+BATCH_SIZE = 32
+PARITY_TOLERANCE = 1e-3       # max |snapshot - model| per dimension after export
+INT8_MIN_COSINE = 0.98        # int8 weights: min cosine(snapshot, model) per text
+
+# Set AIVERSE_SNAPSHOT=0 to always load the full sentence-transformers model
+SNAPSHOT = os.getenv("AIVERSE_SNAPSHOT", "1") != "0"
+# Fixed onnxruntime intra-op threads (0 = one per CPU)
+ONNX_THREADS = int(os.getenv("AIVERSE_ONNX_THREADS", "0")) or (os.cpu_count() or 1)
+
+# Embedding backends: "torch" runs the sentence-transformers model itself;
+# the others run a cached export of it (see `encoder`)
+BACKENDS = ("torch",) + KINDS
+EMBED_BACKEND = os.getenv("AIVERSE_EMBED_BACKEND", "torch")
+
+
+def precision(backend: str) -> str:
+    """Vectors of the int8 export only approximate the others, which agree within float noise."""
+    return "int8" if backend == "onnx_int8" else "float32"
+
+# -----------------------------
+# Loading
+# -----------------------------
+class SnapshotEmbeddings:
+    """
+    Query/document encoder loaded from an exported snapshot: a `tokenizers`
+    tokenizer plus the transformer, pooling and normalization of the
+    sentence-transformers model as one ONNX or TorchScript graph. Skips the
+    transformers / sentence-transformers imports and model construction, and
+    keeps the LangChain `embed_documents` / `embed_query` interface.
+    """
+
+    def __init__(self, path: str, info: dict = None, threads: int = ONNX_THREADS):
+        from tokenizers import Tokenizer
+
+        if info is None:
+            with open(os.path.join(path, INFO_FILE), encoding="utf-8") as f:
+                info = json.load(f)
+        self.info = info
+        self.model_name = info["embed_model"]
+        self.kind = info["kind"]
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(path, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=info["max_length"])
+        self.tokenizer.enable_padding(pad_id=info["pad_id"], pad_token=info["pad_token"])
+
+        encoder_path = os.path.join(path, ENCODER_FILES[self.kind])
+        if self.kind != "torchscript":
+            import onnxruntime
+
+            options = onnxruntime.SessionOptions()
+            options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+            self._session = onnxruntime.InferenceSession(
+                encoder_path, options, providers=["CPUExecutionProvider"]
+            )
+        else:
+            import torch
+
+            self._torch = torch
+            self._module = torch.jit.load(encoder_path, map_location="cpu").eval()
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.asarray([e.ids for e in encodings], dtype="int64")
+        attention_mask = np.asarray([e.attention_mask for e in encodings], dtype="int64")
+
+        if self.kind != "torchscript":
+            (vectors,) = self._session.run(
+                None, {"input_ids": input_ids, "attention_mask": attention_mask}
+            )
+            return vectors
+        with self._torch.inference_mode():
+            return self._module(
+                self._torch.from_numpy(input_ids), self._torch.from_numpy(attention_mask)
+            ).numpy()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        # same preprocessing as the LangChain HuggingFaceEmbeddings wrapper
+        texts = [t.replace("\n", " ") for t in texts]
+        if not texts:
+            return []
+        vectors = [self._encode(texts[i:i + BATCH_SIZE])
+                   for i in range(0, len(texts), BATCH_SIZE)]
+        return np.concatenate(vectors).astype("float32").tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+def snapshot_path(index_dir: str = VECTORSTORE_DIR) -> str:
+    return os.path.join(index_dir, SNAPSHOT_DIR)
+
+
+def load(index_dir: str = VECTORSTORE_DIR, model_name: str = None, backend: str = None):
+    """
+    SnapshotEmbeddings for `model_name` if the index directory holds a usable
+    snapshot of it, else None (caller falls back to the full model). With
+    `backend` (the one the index was embedded with), a snapshot of another
+    precision is skipped: int8 vectors only approximate float32 ones.
+    """
+    path = snapshot_path(index_dir)
+    if not SNAPSHOT or not os.path.exists(os.path.join(path, INFO_FILE)):
+        return None
+
+    with open(os.path.join(path, INFO_FILE), encoding="utf-8") as f:
+        info = json.load(f)
+    if model_name is not None and info["embed_model"] != model_name:
+        logger.warning("Snapshot is of %s, index needs %s; ignoring it",
+                       info["embed_model"], model_name)
+        tracing.count("snapshot.skipped")
+        return None
+    if backend is not None and precision(info["kind"]) != precision(backend):
+        logger.warning("Snapshot is %s (%s), index was embedded with %s (%s); ignoring it",
+                       info["kind"], precision(info["kind"]), backend, precision(backend))
+        tracing.count("snapshot.skipped")
+        return None
+    try:
+        return SnapshotEmbeddings(path, info)
+    except ImportError as e:
+        logger.warning("Snapshot runtime unavailable (%s); loading the full model", e)
+        tracing.count("snapshot.skipped")
+        return None
+
+# -----------------------------
+# Export
+# -----------------------------
+def export_encoder(model_name: str, path: str, kind: str = "onnx") -> dict:
+    """
+    Export `model_name` to `path` as tokenizer.json + one encoder graph and
+    check it reproduces the model's vectors (within PARITY_TOLERANCE, or
+    INT8_MIN_COSINE for int8 weights). Needs torch + sentence-transformers
+    (plus onnx / onnxruntime for the ONNX kinds); loading it later needs only
+    tokenizers and onnxruntime / torch. Returns the snapshot info.
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    if kind not in KINDS:
+        raise ValueError(f"Unknown snapshot kind {kind!r}; choose one of {KINDS}")
+    if model_name == EMBED_MODELS["hash"]:
+        raise ValueError("Hash embeddings load instantly; there is nothing to snapshot")
+
+    model = SentenceTransformer(model_name, device="cpu").eval()
+    tokenizer = model.tokenizer
+    if not tokenizer.is_fast:
+        raise ValueError(f"{model_name} has no fast tokenizer (tokenizer.json) to export")
+
+    class Encoder(torch.nn.Module):
+        """input ids + attention mask -> sentence embedding (all model stages)."""
+
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask):
+            features = {"input_ids": input_ids, "attention_mask": attention_mask}
+            return self.model(features)["sentence_embedding"]
+
+    staging = path + ".tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+
+    start = time.perf_counter()
+    tokenizer.save_pretrained(staging)
+    sample = tokenizer(["AiVerse snapshot export", "a second, longer sample sentence"],
+                       padding=True, return_tensors="pt")
+    inputs = (sample["input_ids"], sample["attention_mask"])
+    encoder = Encoder(model).eval()
+    encoder_path = os.path.join(staging, ENCODER_FILES[kind])
+
+    with torch.inference_mode():
+        if kind == "torchscript":
+            torch.jit.trace(encoder, inputs).save(encoder_path)
+        else:
+            onnx_path = os.path.join(staging, ENCODER_FILES["onnx"])
+            torch.onnx.export(
+                encoder, inputs, onnx_path,
+                input_names=["input_ids", "attention_mask"],
+                output_names=["embedding"],
+                dynamic_axes={"input_ids": {0: "batch", 1: "tokens"},
+                              "attention_mask": {0: "batch", 1: "tokens"},
+                              "embedding": {0: "batch"}},
+                opset_version=14,
+            )
+            if kind == "onnx_int8":
+                from onnxruntime.quantization import QuantType, quantize_dynamic
+
+                # weights to int8 ahead of time, activations quantized per batch
+                quantize_dynamic(onnx_path, encoder_path, weight_type=QuantType.QInt8)
+                os.remove(onnx_path)
+
+    info = {
+        "kind": kind,
+        "embed_model": model_name,
+        "dim": model.get_sentence_embedding_dimension(),
+        "max_length": model.max_seq_length,
+        "pad_id": tokenizer.pad_token_id,
+        "pad_token": tokenizer.pad_token,
+        "export_s": round(time.perf_counter() - start, 2),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+    # The snapshot must embed like the model the index was built with
+    texts = ["Which investors fund early-stage AI startups?",
+             "भारत में फिनटेक निवेश रुझान", "short"]
+    expected = model.encode(texts, convert_to_numpy=True)
+    actual = np.asarray(SnapshotEmbeddings(staging, info).embed_documents(texts))
+    info.update(parity(expected, actual))
+    if (info["min_cosine"] < INT8_MIN_COSINE if kind == "onnx_int8"
+            else info["max_error"] > PARITY_TOLERANCE):
+        shutil.rmtree(staging, ignore_errors=True)
+        raise RuntimeError(f"{kind} snapshot diverges from {model_name}: {parity(expected, actual)}")
+
+    with open(os.path.join(staging, INFO_FILE), "w", encoding="utf-8") as f:
+        json.dump(info, f, indent=2)
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(staging, path)
+    return info
+
+
+def parity(expected: np.ndarray, actual: np.ndarray) -> dict:
+    """Max absolute difference and min / mean cosine similarity, row by row."""
+    cosine = (expected * actual).sum(axis=1) / (
+        np.linalg.norm(expected, axis=1) * np.linalg.norm(actual, axis=1)
+    )
+    return {"max_error": float(np.abs(expected - actual).max()),
+            "min_cosine": round(float(cosine.min()), 6),
+            "mean_cosine": round(float(cosine.mean()), 6)}
+
+
+def export(index_dir: str = VECTORSTORE_DIR, kind: str = "onnx",
+           model_name: str = None) -> str:
+    """Export the index's embedding model as the snapshot next to it."""
+    model_name = model_name or read_meta(index_dir)["embed_model"]
+    path = snapshot_path(index_dir)
+    export_encoder(model_name, path, kind)
+    return path
+
+
+def encoder(model_name: str, kind: str = "onnx_int8",
+            threads: int = ONNX_THREADS) -> SnapshotEmbeddings:
+    """
+    `model_name` run through an exported encoder of `kind`, exported once
+    into ENCODER_CACHE and reused by every later build and query process.
+    """
+    path = os.path.join(ENCODER_CACHE, f"{model_name.replace('/', '--')}-{kind}")
+    if not os.path.exists(os.path.join(path, INFO_FILE)):
+        print(f"📦 Exporting {model_name} as {kind} (first use)...")
+        os.makedirs(ENCODER_CACHE, exist_ok=True)
+        export_encoder(model_name, path, kind)
+    return SnapshotEmbeddings(path, threads=threads)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Export a fast-loading encoder snapshot.")
+    parser.add_argument("--index-dir", default=VECTORSTORE_DIR)
+    parser.add_argument("--kind", choices=KINDS, default="onnx")
+    parser.add_argument("--model", help="embedding model (default: the index's)")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    path = export(args.index_dir, args.kind, args.model)
+    print(f"📦 Snapshot written to {path}")
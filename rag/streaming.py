@@ -0,0 +1,137 @@
+import queue
+import threading
+
+import numpy as np
+
+# -----------------------------
+# Config
+# -----------------------------
+MAX_BATCH = 256            # hard cap on texts per encoder call
+BATCH_CHARS = 32_000       # padded-size budget per batch (longest text x batch size)
+SORT_WINDOW = 4096         # texts sorted by length together; bounds memory
+QUEUE_SIZE = 4             # encoded batches waiting for insertion
+
+
+class _Failure:
+    def __init__(self, error):
+        self.error = error
+
+
+_DONE = object()
+
+
+class EmbeddingStream:
+    """
+    Encode an (unbounded) iterable of items on a background thread and yield
+    (vectors, items) batches as they are ready, so index insertion on the
+    caller's thread overlaps with encoding.
+
+    Items are length-sorted within a window of `sort_window` so each batch
+    pads to a similar length, and batch size adapts to text length: short
+    texts go in large batches, long ones in small batches, keeping
+    longest-text x batch-size under `batch_chars`. A batch that fails to
+    encode is halved and retried down to single items before being skipped.
+    At most `queue_size` encoded batches are held in memory.
+    """
+
+    def __init__(self, encode, max_batch: int = MAX_BATCH,
+                 batch_chars: int = BATCH_CHARS, sort_window: int = SORT_WINDOW,
+                 queue_size: int = QUEUE_SIZE):
+        self.encode = encode
+        self.max_batch = max_batch
+        self.batch_chars = batch_chars
+        self.sort_window = sort_window
+        self.queue_size = queue_size
+        self.stats = {"batches": 0, "embedded": 0, "failed": 0,
+                      "chars": 0, "padded_chars": 0}
+
+    # ---- batching ----
+    def _split(self, window, text_of):
+        window.sort(key=lambda item: len(text_of(item)))
+        batch = []
+        for item in window:
+            # ascending lengths: this item sets the padded width of the batch
+            width = len(text_of(item))
+            if batch and (len(batch) >= self.max_batch
+                          or width * (len(batch) + 1) > self.batch_chars):
+                yield batch
+                batch = []
+            batch.append(item)
+        if batch:
+            yield batch
+
+    def batches(self, items, text_of):
+        window = []
+        for item in items:
+            window.append(item)
+            if len(window) >= self.sort_window:
+                yield from self._split(window, text_of)
+                window = []
+        if window:
+            yield from self._split(window, text_of)
+
+    # ---- encoding ----
+    def _encode(self, batch, text_of):
+        texts = [text_of(item) for item in batch]
+        try:
+            vectors = np.asarray(self.encode(texts), dtype="float32")
+        except Exception as e:
+            if len(batch) == 1:
+                self.stats["failed"] += 1
+                print(f"⚠️ Skipped chunk that failed to embed: {e}")
+                return
+            mid = len(batch) // 2
+            yield from self._encode(batch[:mid], text_of)
+            yield from self._encode(batch[mid:], text_of)
+            return
+
+        lengths = [len(t) for t in texts]
+        self.stats["batches"] += 1
+        self.stats["embedded"] += len(batch)
+        self.stats["chars"] += sum(lengths)
+        self.stats["padded_chars"] += max(lengths) * len(lengths)
+        yield vectors, batch
+
+    def _produce(self, items, text_of, out, stop):
+        def put(result):
+            while not stop.is_set():
+                try:
+                    out.put(result, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        try:
+            for batch in self.batches(items, text_of):
+                for result in self._encode(batch, text_of):
+                    if not put(result):
+                        return
+            put(_DONE)
+        except BaseException as e:
+            put(_Failure(e))
+
+    def __call__(self, items, text_of=lambda item: item):
+        out = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        producer = threading.Thread(
+            target=self._produce, args=(iter(items), text_of, out, stop), daemon=True
+        )
+        producer.start()
+
+        try:
+            while True:
+                result = out.get()
+                if result is _DONE:
+                    break
+                if isinstance(result, _Failure):
+                    raise result.error
+                yield result
+        finally:
+            stop.set()
+            producer.join(timeout=5)
+
+    def padding_waste(self) -> float:
+        """Share of encoder input that was padding (0 = none)."""
+        padded = self.stats["padded_chars"]
+        return 1 - self.stats["chars"] / padded if padded else 0.0
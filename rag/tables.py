@@ -0,0 +1,326 @@
+import os
+import re
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+# -----------------------------
+# Config
+# -----------------------------
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(BASE_DIR, "data", "raw")
+
+RELOAD_CHECK_INTERVAL = 5.0   # seconds between on-disk change checks
+KEY_MAX_CHARS = 60            # longer text columns are descriptions, not keys
+MAX_NGRAM = 4                 # longest key value matched in a query, in words
+MAX_LISTED = 10               # matching rows spelled out in an answer
+MULTI_VALUE_SPLIT = re.compile(r"\s*[,;|/]\s*")
+INTENT_WINDOW = 3             # words after "which" / an aggregate that may name its target
+
+# Explicit structured intent; anything else is left to vector search
+LIST_WORDS = {"which", "list"}
+COUNT_PHRASES = ("how many", "number of", "count")
+
+AGGREGATES = {
+    "average": "mean", "mean": "mean", "avg": "mean",
+    "total": "sum", "sum": "sum",
+    "maximum": "max", "max": "max", "largest": "max", "biggest": "max", "highest": "max",
+    "minimum": "min", "min": "min", "smallest": "min", "lowest": "min",
+}
+
+
+def normalize(text) -> str:
+    """Lowercase words separated by single spaces ("Early-Stage" -> "early stage")."""
+    return " ".join(re.findall(r"\w+", str(text).lower()))
+
+
+def _singular(word: str) -> str:
+    return word[:-1] if word.endswith("s") and len(word) > 3 else word
+
+# -----------------------------
+# Typed table
+# -----------------------------
+class Table:
+    """
+    One CSV source as a typed pandas frame plus an inverted index on its key
+    columns (short categorical / name-like text). Multi-valued cells such as
+    "AI, Fintech" are indexed under each value.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.name = os.path.basename(path)
+        self.frame = load_frame(path)
+
+        self.numeric = [c for c in self.frame.columns
+                        if pd.api.types.is_numeric_dtype(self.frame[c])]
+        # normalized value -> {column: int64 row positions}
+        self.keys = {}
+        self.key_columns = []
+        self.cardinality = {}
+        for column in self.frame.columns:
+            if column in self.numeric:
+                continue
+            values = self.frame[column].dropna().astype(str)
+            if values.empty or values.str.len().mean() > KEY_MAX_CHARS:
+                continue
+            self.key_columns.append(column)
+            self.cardinality[column] = values.nunique()
+            self._index_column(column, values)
+
+        # words that make a query "about" this table: its name and column names
+        subject = normalize(os.path.splitext(self.name)[0]).split()
+        for column in self.frame.columns:
+            subject += normalize(column).split()
+        self.subject = {_singular(w) for w in subject if len(w) > 2}
+
+        # most distinctive key column labels listed rows (e.g. the firm name)
+        self.label_column = max(
+            self.key_columns, key=lambda c: self.cardinality[c], default=None
+        )
+
+    def _index_column(self, column, values):
+        postings = {}
+        for position, cell in zip(values.index, values.tolist()):
+            for value in MULTI_VALUE_SPLIT.split(cell):
+                key = normalize(value)
+                if len(key) >= 2:
+                    postings.setdefault(key, []).append(position)
+        for key, positions in postings.items():
+            self.keys.setdefault(key, {})[column] = np.unique(
+                np.asarray(positions, dtype="int64")
+            )
+
+    def __len__(self):
+        return len(self.frame)
+
+    def about(self, words) -> bool:
+        return bool(self.subject & {_singular(w) for w in words})
+
+    def match(self, words):
+        """
+        ({column: {normalized value, ...}}, unmatched words) for the key values
+        mentioned in `words`, longest phrases first. A value found in several
+        columns is taken from the most categorical one.
+        """
+        filters, used = {}, set()
+        for n in range(min(MAX_NGRAM, len(words)), 0, -1):
+            for i in range(len(words) - n + 1):
+                span = set(range(i, i + n))
+                gram = " ".join(words[i:i + n])
+                if span & used or gram not in self.keys:
+                    continue
+                column = min(self.keys[gram], key=lambda c: self.cardinality[c])
+                filters.setdefault(column, set()).add(gram)
+                used |= span
+        return filters, [w for i, w in enumerate(words) if i not in used]
+
+    def rows(self, filters: dict) -> np.ndarray:
+        """Row positions matching every column (any of its values), vectorized."""
+        mask = np.ones(len(self.frame), dtype=bool)
+        for column, values in filters.items():
+            column_mask = np.zeros(len(self.frame), dtype=bool)
+            for value in values:
+                column_mask[self.keys[value][column]] = True
+            mask &= column_mask
+        return np.flatnonzero(mask)
+
+
+def load_frame(path: str) -> pd.DataFrame:
+    """CSV -> frame with numeric columns parsed and repetitive text as categoricals."""
+    frame = pd.read_csv(path, skipinitialspace=True)
+    frame.columns = [str(c).strip() for c in frame.columns]
+
+    for column in frame.columns:
+        series = frame[column]
+        if pd.api.types.is_numeric_dtype(series):
+            continue
+        series = series.astype("string").str.strip()
+        # "$1,200,000" / "12%" style numbers
+        numbers = pd.to_numeric(series.str.replace(r"[,$€£₹%\s]", "", regex=True),
+                                errors="coerce")
+        if series.notna().any() and numbers.notna().sum() >= 0.9 * series.notna().sum():
+            frame[column] = numbers
+        elif series.nunique() <= max(1, len(series) // 2):
+            frame[column] = series.astype("category")
+        else:
+            frame[column] = series
+    return frame
+
+# -----------------------------
+# Store
+# -----------------------------
+class TableStore:
+    """
+    Every CSV under `data_dir`, loaded once and reloaded when the files change.
+    `query` answers questions that filter on key values and explicitly ask for
+    a list, count or aggregate ("which investors", "how many", "total
+    amount") with exact results; anything else returns None so the caller
+    falls back to vector search.
+    """
+
+    def __init__(self, data_dir: str = DATA_DIR,
+                 check_interval: float = RELOAD_CHECK_INTERVAL):
+        self.data_dir = data_dir
+        self.check_interval = check_interval
+        self._tables = []
+        self._fingerprint = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+        self.stats = {"queries": 0, "answered": 0, "load_s": None}
+
+    def _paths(self):
+        paths = []
+        for root, _, files in os.walk(self.data_dir):
+            paths += [os.path.join(root, f) for f in files if f.lower().endswith(".csv")]
+        return sorted(paths)
+
+    def tables(self):
+        now = time.monotonic()
+        if self._fingerprint is not None and now - self._last_check < self.check_interval:
+            return self._tables
+
+        with self._lock:
+            self._last_check = now
+            paths = self._paths()
+            fingerprint = tuple((p, os.stat(p).st_mtime_ns) for p in paths)
+            if fingerprint != self._fingerprint:
+                start = time.perf_counter()
+                tables = []
+                for path in paths:
+                    try:
+                        tables.append(Table(path))
+                    except Exception as e:
+                        print(f"⚠️ Skipped table {os.path.basename(path)}: {e}")
+                self._tables = tables
+                self._fingerprint = fingerprint
+                self.stats["load_s"] = round(time.perf_counter() - start, 4)
+        return self._tables
+
+    def query(self, query: str):
+        """
+        Structured answer for `query` or None. The result dict holds the table,
+        the matched filters, the exact row count, 1-based source rows, listed
+        labels and an optional aggregate.
+        """
+        self.stats["queries"] += 1
+        words = normalize(query).split()
+        if not words:
+            return None
+
+        best = None
+        for table in self.tables():
+            filters, rest = table.match(words)
+            # the subject must be named outside the matched values themselves,
+            # and the question must ask for a list, a count or an aggregate
+            if not filters or not table.about(rest) or not _intent(table, words):
+                continue
+            if best is None or len(filters) > len(best[1]):
+                best = (table, filters)
+        if best is None:
+            return None
+
+        table, filters = best
+        positions = table.rows(filters)
+        result = {
+            "table": table.name,
+            "source": table.path,
+            "filters": {c: sorted(v) for c, v in filters.items()},
+            "count": int(len(positions)),
+            "rows": (positions + 1).tolist(),          # 1-based, header excluded
+            "labels": [],
+            "aggregate": None,
+        }
+        if table.label_column is not None:
+            result["labels"] = (
+                table.frame[table.label_column].iloc[positions[:MAX_LISTED]]
+                .astype(str).tolist()
+            )
+
+        result["aggregate"] = _aggregate(table, words, positions)
+        self.stats["answered"] += 1
+        return result
+
+
+def _intent(table, words) -> bool:
+    """Whether `words` ask `table` for a list ("which investors"), a count or an aggregate."""
+    text = f" {' '.join(words)} "
+    if any(f" {phrase} " in text for phrase in COUNT_PHRASES):
+        return True
+    if _aggregate_column(table, words) is not None:
+        return True
+    return any(word in LIST_WORDS and table.about(words[i + 1:i + 1 + INTENT_WINDOW])
+               for i, word in enumerate(words))
+
+
+def _aggregate_column(table, words):
+    """(op, numeric column) when an aggregate word is followed by the column's name, else None."""
+    for i, word in enumerate(words):
+        op = AGGREGATES.get(word)
+        if op is None:
+            continue
+        following = {_singular(w) for w in words[i + 1:i + 1 + INTENT_WINDOW]}
+        for column in table.numeric:
+            if {_singular(w) for w in normalize(column).split()} & following:
+                return op, column
+    return None
+
+
+def _aggregate(table, words, positions):
+    """(op, column, value) when the query asks for e.g. the average of a numeric column."""
+    target = _aggregate_column(table, words)
+    if target is None or not len(positions):
+        return None
+    op, column = target
+    value = getattr(table.frame[column].iloc[positions], op)()
+    return (op, column, float(value)) if pd.notna(value) else None
+
+
+def format_answer(result: dict) -> str:
+    """English analyst-style answer for a TableStore result, citing source rows."""
+    conditions = " and ".join(
+        f"{column} = {' or '.join(values)}" for column, values in result["filters"].items()
+    )
+    lines = [f"- {result['count']} row(s) in {result['table']} match {conditions}."]
+
+    if result["aggregate"]:
+        op, column, value = result["aggregate"]
+        lines.append(f"- {dict(mean='Average', sum='Total', max='Maximum', min='Minimum')[op]} "
+                     f"{column}: {value:,.2f}.")
+    if result["labels"]:
+        more = result["count"] - len(result["labels"])
+        listed = ", ".join(result["labels"]) + (f" and {more} more" if more > 0 else "")
+        lines.append(f"- Matches: {listed}.")
+
+    rows = result["rows"][:MAX_LISTED]
+    cited = ", ".join(map(str, rows)) + (" …" if result["count"] > len(rows) else "")
+    return f"""
+Our analysis indicates that:
+
+{chr(10).join(lines)}
+
+---
+
+**Sources**
+• {result['table']} (rows {cited or '-'})
+
+---
+
+*Exact answer computed over {result['table']}.*
+"""
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_table_store() -> TableStore:
+    """Process-wide table store shared by every caller."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = TableStore()
+    return _store
@@ -0,0 +1,249 @@
+import bisect
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+# -----------------------------
+# Config
+# -----------------------------
+# Comma-separated exporters to enable at import: "log", "histogram", "prometheus".
+# Unset = tracing off (every hook is a single attribute check).
+TRACE = os.getenv("AIVERSE_TRACE", "")
+# Span duration buckets in seconds (Prometheus-style, cumulative on export)
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LATENCY_WINDOW = 2048     # recent spans kept per name for percentiles
+METRIC_PREFIX = "aiverse"
+
+logger = logging.getLogger("aiverse.trace")
+
+# -----------------------------
+# Exporters
+# -----------------------------
+class LoggingExporter:
+    """One log line per finished span / counter increment."""
+
+    name = "log"
+
+    def __init__(self, log: logging.Logger = logger, level: int = logging.INFO):
+        self.log = log
+        self.level = level
+
+    def span(self, name: str, seconds: float, attrs: dict):
+        details = " ".join(f"{k}={v}" for k, v in attrs.items())
+        self.log.log(self.level, "span %s %.2fms %s", name, seconds * 1000, details)
+
+    def count(self, name: str, value: float):
+        self.log.log(self.level, "count %s +%s", name, value)
+
+
+class HistogramExporter:
+    """
+    In-memory span histograms (fixed buckets + recent window for percentiles)
+    and counter totals. `snapshot()` is JSON-ready.
+    """
+
+    name = "histogram"
+
+    def __init__(self, buckets=BUCKETS, window: int = LATENCY_WINDOW):
+        self.buckets = tuple(buckets)
+        self.window = window
+        self._lock = threading.Lock()
+        self._spans = {}       # name -> {"count", "sum", "buckets", "recent"}
+        self._counters = {}
+
+    def span(self, name: str, seconds: float, attrs: dict):
+        with self._lock:
+            entry = self._spans.get(name)
+            if entry is None:
+                entry = self._spans[name] = {
+                    "count": 0, "sum": 0.0,
+                    "buckets": [0] * (len(self.buckets) + 1),
+                    "recent": deque(maxlen=self.window),
+                }
+            entry["count"] += 1
+            entry["sum"] += seconds
+            entry["buckets"][bisect.bisect_left(self.buckets, seconds)] += 1
+            entry["recent"].append(seconds)
+
+    def count(self, name: str, value: float):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def reset(self):
+        with self._lock:
+            self._spans.clear()
+            self._counters.clear()
+
+    def _copy(self):
+        with self._lock:
+            spans = {name: (e["count"], e["sum"], list(e["buckets"]), np.asarray(e["recent"]))
+                     for name, e in self._spans.items()}
+            return spans, dict(self._counters)
+
+    def snapshot(self) -> dict:
+        spans, counters = self._copy()
+        stages = {}
+        for name, (count, total, _, recent) in sorted(spans.items()):
+            p50, p95, p99 = (np.percentile(recent, [50, 95, 99]) * 1000).tolist()
+            stages[name] = {
+                "count": count,
+                "total_s": round(total, 4),
+                "avg_ms": round(total / count * 1000, 3),
+                "p50_ms": round(p50, 3), "p95_ms": round(p95, 3), "p99_ms": round(p99, 3),
+            }
+        return {"spans": stages, "counters": counters}
+
+
+class PrometheusExporter(HistogramExporter):
+    """The histogram exporter rendered in the Prometheus text exposition format."""
+
+    name = "prometheus"
+
+    def __init__(self, prefix: str = METRIC_PREFIX, **kwargs):
+        super().__init__(**kwargs)
+        self.prefix = prefix
+
+    def _metric(self, name: str) -> str:
+        return f"{self.prefix}_" + re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+    def render(self) -> str:
+        spans, counters = self._copy()
+        lines = []
+        if spans:
+            metric = f"{self.prefix}_span_seconds"
+            lines += [f"# HELP {metric} Pipeline stage latency.",
+                      f"# TYPE {metric} histogram"]
+            for name, (count, total, buckets, _) in sorted(spans.items()):
+                cumulative = 0
+                for bound, n in zip(self.buckets + ("+Inf",), buckets):
+                    cumulative += n
+                    lines.append(f'{metric}_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'{metric}_sum{{stage="{name}"}} {total:.6f}')
+                lines.append(f'{metric}_count{{stage="{name}"}} {count}')
+        for name, value in sorted(counters.items()):
+            metric = self._metric(name) + "_total"
+            lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+        return "\n".join(lines) + "\n"
+
+
+EXPORTERS = {
+    "log": LoggingExporter,
+    "histogram": HistogramExporter,
+    "prometheus": PrometheusExporter,
+}
+
+# -----------------------------
+# Tracer
+# -----------------------------
+class Span:
+    """Times a `with` block and hands (name, seconds, attrs) to every exporter."""
+
+    __slots__ = ("tracer", "name", "attrs", "start")
+
+    def __init__(self, tracer, name: str, attrs: dict):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+
+    def set(self, **attrs):
+        """Attach attributes known only inside the block (e.g. docs found)."""
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.start
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        for exporter in self.tracer.exporters:
+            exporter.span(self.name, seconds, self.attrs)
+        return False
+
+
+class _NoopSpan:
+    """Shared stand-in returned while tracing is off."""
+
+    __slots__ = ()
+
+    def set(self, **attrs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Tracer:
+    """
+    Spans and counters fanned out to pluggable exporters (anything with
+    `span(name, seconds, attrs)` and `count(name, value)`). With no
+    exporters, `span` returns a shared no-op and `count` returns at once.
+    """
+
+    def __init__(self, exporters=()):
+        self.exporters = tuple(exporters)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.exporters)
+
+    def configure(self, *exporters):
+        """Replace the exporters; names from EXPORTERS or exporter instances."""
+        self.exporters = tuple(
+            EXPORTERS[e]() if isinstance(e, str) else e for e in exporters
+        )
+        return self
+
+    def span(self, name: str, **attrs):
+        if not self.exporters:
+            return _NOOP_SPAN
+        return Span(self, name, attrs)
+
+    def count(self, name: str, value: float = 1):
+        if not self.exporters or not value:
+            return
+        for exporter in self.exporters:
+            exporter.count(name, value)
+
+    def exporter(self, kind):
+        """First configured exporter of the given class, or None."""
+        return next((e for e in self.exporters if isinstance(e, kind)), None)
+
+    def snapshot(self) -> dict:
+        histogram = self.exporter(HistogramExporter)
+        snapshot = histogram.snapshot() if histogram else {"spans": {}, "counters": {}}
+        snapshot["exporters"] = [e.name for e in self.exporters]
+        return snapshot
+
+    def prometheus(self) -> str:
+        """Prometheus text for the configured exporter ("" if none)."""
+        exporter = self.exporter(PrometheusExporter)
+        return exporter.render() if exporter else ""
+
+
+_tracer = Tracer().configure(*[name.strip() for name in TRACE.split(",") if name.strip()])
+
+
+def get_tracer() -> Tracer:
+    """Process-wide tracer; exporters come from AIVERSE_TRACE or `configure`."""
+    return _tracer
+
+
+def span(name: str, **attrs):
+    return _tracer.span(name, **attrs)
+
+
+def count(name: str, value: float = 1):
+    _tracer.count(name, value)
@@ -0,0 +1,192 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from rag import tracing
+
+# -----------------------------
+# Config
+# -----------------------------
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_PATH = os.path.join(BASE_DIR, "cache", "translations.sqlite")
+
+BACKEND = os.getenv("AIVERSE_TRANSLATOR", "google")   # "google" | "offline"
+MEMORY_ENTRIES = 2048
+DISK_ENTRIES = 100_000
+
+# -----------------------------
+# Backends
+# -----------------------------
+class GoogleBackend:
+    """deep-translator's GoogleTranslator (one network round-trip per call)."""
+
+    name = "google"
+
+    def translate(self, text: str, source: str, target: str) -> str:
+        from deep_translator import GoogleTranslator
+        return GoogleTranslator(source=source, target=target).translate(text)
+
+
+class OfflineBackend:
+    """
+    No-network stand-in: returns text unchanged. Lets the pipeline run (and be
+    benchmarked) without internet access; retrieval then sees the original
+    query text.
+    """
+
+    name = "offline"
+
+    def translate(self, text: str, source: str, target: str) -> str:
+        return text
+
+
+BACKENDS = {
+    "google": GoogleBackend,
+    "offline": OfflineBackend,
+}
+
+# -----------------------------
+# Cache
+# -----------------------------
+def cache_key(text: str, source: str, target: str, backend: str) -> str:
+    # The backend is part of the key: the offline passthrough must never be
+    # served as a google translation from the shared SQLite file
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    return f"{backend}:{source}:{target}:{digest}"
+
+
+class TranslationCache:
+    """In-memory LRU in front of a size-bounded SQLite store keyed by backend, language pair + text hash."""
+
+    def __init__(self, path: str = CACHE_PATH, memory_entries: int = MEMORY_ENTRIES,
+                 disk_entries: int = DISK_ENTRIES):
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+
+        if path:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS translations ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    def get(self, key: str):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+
+            if self._db is None:
+                return None
+
+            row = self._db.execute(
+                "SELECT value FROM translations WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            self._db.execute(
+                "UPDATE translations SET last_used = ? WHERE key = ?", (time.time(), key)
+            )
+            self._db.commit()
+            self._remember(key, row[0])
+            return row[0]
+
+    def put(self, key: str, value: str):
+        with self._lock:
+            self._remember(key, value)
+            if self._db is None:
+                return
+
+            self._db.execute(
+                "INSERT OR REPLACE INTO translations (key, value, last_used) VALUES (?, ?, ?)",
+                (key, value, time.time())
+            )
+            # Trim in bulk (10% headroom) rather than on every insert
+            (count,) = self._db.execute("SELECT COUNT(*) FROM translations").fetchone()
+            if count > self.disk_entries:
+                excess = count - int(self.disk_entries * 0.9)
+                self._db.execute(
+                    "DELETE FROM translations WHERE key IN ("
+                    "SELECT key FROM translations ORDER BY last_used LIMIT ?)",
+                    (excess,)
+                )
+            self._db.commit()
+
+    def _remember(self, key: str, value: str):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM translations")
+                self._db.commit()
+
+# -----------------------------
+# Translator
+# -----------------------------
+class Translator:
+    """Cached translation through a pluggable backend."""
+
+    def __init__(self, backend=None, cache: TranslationCache = None):
+        self.backend = backend or BACKENDS[BACKEND]()
+        self.cache = cache if cache is not None else TranslationCache()
+        self.stats = {"hits": 0, "misses": 0, "chars_translated": 0}
+        self._stats_lock = threading.Lock()     # answers translate segments in parallel
+
+    def translate(self, text: str, source: str, target: str) -> str:
+        if source == target or not text.strip():
+            return text
+
+        key = cache_key(text, source, target, self.backend.name)
+        cached = self.cache.get(key)
+        if cached is not None:
+            with self._stats_lock:
+                self.stats["hits"] += 1
+            tracing.count("translate.cache_hits")
+            return cached
+
+        with self._stats_lock:
+            self.stats["misses"] += 1
+            self.stats["chars_translated"] += len(text)
+        tracing.count("translate.bytes", len(text.encode("utf-8")))
+        with tracing.span("translate.backend", backend=self.backend.name,
+                          source=source, target=target):
+            translated = self.backend.translate(text, source, target)
+        self.cache.put(key, translated)
+        return translated
+
+    def warm(self, texts, source: str, target: str):
+        """Pre-translate known texts (e.g. suggested questions) into the cache."""
+        for text in texts:
+            self.translate(text, source, target)
+
+
+_translator = None
+_translator_lock = threading.Lock()
+
+
+def get_translator() -> Translator:
+    """Process-wide translator; the backend comes from AIVERSE_TRANSLATOR."""
+    global _translator
+    if _translator is None:
+        with _translator_lock:
+            if _translator is None:
+                _translator = Translator()
+    return _translator
+
+
+def translate(text: str, source: str, target: str) -> str:
+    return get_translator().translate(text, source, target)
@@ -0,0 +1,192 @@
+import argparse
+import logging
+import os
+import time
+
+from flask import Flask, Response, jsonify, request
+from flask_cors import CORS
+
+from rag import tracing
+from rag.answer_cache import get_answer_cache
+from rag.batching import MAX_BATCH, MAX_WAIT_MS, MicroBatcher
+from rag.generator import generate_answers, stream_answer
+from rag.rerank import RERANK, get_reranker
+from rag.retriever import get_retriever, retrieve_many
+from rag.tables import get_table_store
+from rag.translation import get_translator
+
+# -----------------------------
+# Config
+# -----------------------------
+HOST = os.getenv("AIVERSE_API_HOST", "0.0.0.0")
+PORT = int(os.getenv("AIVERSE_API_PORT", "8000"))
+DEFAULT_K = 5
+MAX_K = 50
+REQUEST_TIMEOUT = 60          # seconds a request may wait for its batch
+
+app = Flask(__name__)
+CORS(app)
+
+# One warm model + index shared by every request thread. Concurrent requests
+# with the same (language, k) are embedded and searched together.
+answers = MicroBatcher(
+    lambda key, queries: generate_answers(queries, language=key[0], max_chunks=key[1]),
+    name="answers"
+)
+searches = MicroBatcher(
+    lambda key, queries: retrieve_many(queries, language=key[0], k=key[1]),
+    name="retrieve"
+)
+started_at = time.time()
+
+
+def _parse(body):
+    """(queries, language, k, batched) from a request body, or raise ValueError."""
+    if "queries" in body:
+        queries, batched = body["queries"], True
+        if not isinstance(queries, list):
+            raise ValueError("'queries' must be a list of strings")
+    else:
+        queries, batched = [body.get("query")], False
+
+    if not queries or not all(isinstance(q, str) and q.strip() for q in queries):
+        raise ValueError("'query' must be a non-empty string")
+
+    k = body.get("k", DEFAULT_K)
+    if isinstance(k, bool) or not isinstance(k, int) or not 1 <= k <= MAX_K:
+        raise ValueError(f"'k' must be an integer between 1 and {MAX_K}")
+
+    language = body.get("language", "en")
+    if language is not None and not isinstance(language, str):
+        raise ValueError("'language' must be a string or null")
+
+    return queries, language, k, batched
+
+
+def _run(batcher, key_language):
+    body = request.get_json(silent=True) or {}
+    try:
+        queries, language, k, batched = _parse(body)
+    except ValueError as e:
+        return None, (jsonify({"error": str(e)}), 400)
+
+    start = time.perf_counter()
+    futures = [batcher.submit((key_language(language), k), q) for q in queries]
+    try:
+        results = [f.result(timeout=REQUEST_TIMEOUT) for f in futures]
+    except Exception as e:
+        return None, (jsonify({"error": f"{type(e).__name__}: {e}"}), 500)
+    latency = round(time.perf_counter() - start, 4)
+    return (results, batched, latency), None
+
+
+# -----------------------------
+# Routes
+# -----------------------------
+@app.route("/health")
+def health():
+    return jsonify({
+        "status": "ok",
+        "index_loaded": get_retriever().ready,
+        "uptime_s": round(time.time() - started_at, 1),
+    })
+
+
+@app.route("/answer", methods=["POST"])
+def answer():
+    """{"query" | "queries", "language"="en", "k"=5} -> analyst-style answer(s)."""
+    parsed, error = _run(answers, lambda language: language or "en")
+    if error:
+        return error
+    results, batched, latency = parsed
+
+    if batched:
+        return jsonify({"answers": results, "latency_s": latency})
+    return jsonify({"answer": results[0], "latency_s": latency})
+
+
+@app.route("/answer/stream", methods=["POST"])
+def answer_stream():
+    """{"query", "language"="en", "k"=5} -> the answer as markdown, streamed segment by segment."""
+    body = request.get_json(silent=True) or {}
+    try:
+        queries, language, k, batched = _parse(body)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if batched:
+        return jsonify({"error": "stream one 'query' at a time"}), 400
+
+    # Not micro-batched: segments go out as soon as this query's are ready
+    return Response(stream_answer(queries[0], language=language or "en", max_chunks=k),
+                    mimetype="text/markdown; charset=utf-8")
+
+
+@app.route("/retrieve", methods=["POST"])
+def retrieve():
+    """{"query" | "queries", "language"="en", "k"=5} -> top-k chunks with metadata."""
+    parsed, error = _run(searches, lambda language: language)
+    if error:
+        return error
+    results, batched, latency = parsed
+
+    documents = [
+        [{"text": d.page_content, "metadata": d.metadata} for d in docs]
+        for docs in results
+    ]
+    if batched:
+        return jsonify({"documents": documents, "latency_s": latency})
+    return jsonify({"documents": documents[0], "latency_s": latency})
+
+
+@app.route("/metrics")
+def metrics():
+    return jsonify({
+        "answers": answers.snapshot(),
+        "retrieve": searches.snapshot(),
+        "retriever": get_retriever().stats(),
+        "answer_cache": get_answer_cache().snapshot(),
+        "translation": get_translator().stats,
+        "tables": get_table_store().stats,
+        "rerank": get_reranker().snapshot(),
+        "tracing": tracing.get_tracer().snapshot(),
+    })
+
+
+@app.route("/metrics/prometheus")
+def metrics_prometheus():
+    """Stage latency histograms and counters in the Prometheus text format."""
+    return Response(tracing.get_tracer().prometheus(),
+                    mimetype="text/plain; version=0.0.4")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="AiVerse JSON query service.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH,
+                        help="Requests coalesced into one embed + search call.")
+    parser.add_argument("--max-wait-ms", type=float, default=MAX_WAIT_MS,
+                        help="How long a request waits for others to batch with.")
+    parser.add_argument("--trace", nargs="*", choices=tracing.EXPORTERS,
+                        help="Per-stage span exporters (default: AIVERSE_TRACE, else "
+                             "prometheus; bare --trace = off).")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    for batcher in (answers, searches):
+        batcher.max_batch = args.max_batch
+        batcher.max_wait = args.max_wait_ms / 1000
+    if args.trace is not None:
+        tracing.get_tracer().configure(*args.trace)
+    elif not tracing.get_tracer().enabled:
+        tracing.get_tracer().configure("prometheus")
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    # Load model + index before accepting traffic
+    get_retriever().warm()
+    if RERANK:
+        get_reranker().warm()
+    print(f"AiVerse API on http://{args.host}:{args.port}")
+    app.run(host=args.host, port=args.port, threaded=True)
@@ -0,0 +1,34 @@
+import pytest
+
+from rag.batching import MicroBatcher
+
+
+def echo(key, items):
+    return [f"{key}:{item}" for item in items]
+
+
+def test_unhashable_key_fails_only_its_request():
+    batcher = MicroBatcher(echo, max_wait_ms=50, name="test")
+    try:
+        bad = batcher.submit((["hi"], 5), "q1")
+        good = batcher.submit(("hi", 5), "q2")
+        with pytest.raises(TypeError):
+            bad.result(timeout=2)
+        assert good.result(timeout=2) == "('hi', 5):q2"
+
+        # the worker thread survived and keeps serving
+        assert batcher(("en", 3), "q3", timeout=2) == "('en', 3):q3"
+        assert batcher.snapshot()["errors"] == 1
+    finally:
+        batcher.close()
+
+
+def test_short_handler_result_fails_every_future():
+    batcher = MicroBatcher(lambda key, items: items[:1], max_wait_ms=50, name="test")
+    try:
+        futures = [batcher.submit("k", i) for i in range(3)]
+        for future in futures:
+            with pytest.raises(RuntimeError):
+                future.result(timeout=2)
+    finally:
+        batcher.close()
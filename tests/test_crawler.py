@@ -0,0 +1,86 @@
+import gzip
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("lxml")
+pytest.importorskip("requests")
+
+from ingestion.crawler import Crawler, parse_sitemap
+
+NS = 'xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"'
+
+
+def urlset(*locs):
+    return (f"<urlset {NS}>" + "".join(f"<url><loc>{loc}</loc></url>" for loc in locs)
+            + "</urlset>").encode()
+
+
+def sitemapindex(*locs):
+    return (f"<sitemapindex {NS}>"
+            + "".join(f"<sitemap><loc>{loc}</loc></sitemap>" for loc in locs)
+            + "</sitemapindex>").encode()
+
+
+@pytest.fixture
+def site(tmp_path):
+    """Local HTTP stand-in serving {path: bytes}; yields (base url, routes, requested paths)."""
+    routes, requested = {}, []
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            requested.append(self.path)
+            body = routes.get(self.path)
+            self.send_response(200 if body is not None else 404)
+            self.send_header("Content-Type", "application/xml")
+            self.send_header("Content-Length", str(len(body or b"")))
+            self.end_headers()
+            self.wfile.write(body or b"")
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}", routes, requested
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_nested_sitemaps_are_fetched_over_http_only(site, tmp_path):
+    base, routes, requested = site
+    secret = tmp_path / "local_sitemap.xml"
+    secret.write_bytes(urlset("http://internal.example/secret"))
+
+    routes["/index.xml"] = sitemapindex(
+        f"{base}/pages.xml", f"{base}/more.xml.gz", str(secret), f"file://{secret}"
+    )
+    routes["/pages.xml"] = urlset(f"{base}/page/1", f"{base}/page/2", "file:///etc/passwd")
+    routes["/more.xml.gz"] = gzip.compress(urlset(f"{base}/page/3"))
+
+    crawler = Crawler(rate=0, state_path=None)
+    urls = crawler.sitemap_urls(f"{base}/index.xml")
+
+    assert sorted(urls) == [f"{base}/page/1", f"{base}/page/2", f"{base}/page/3"]
+    assert sorted(requested) == ["/index.xml", "/more.xml.gz", "/pages.xml"]
+    assert crawler.stats["skipped"] == 3
+
+
+def test_top_level_sitemap_may_be_a_local_file(site, tmp_path):
+    base, routes, _ = site
+    routes["/pages.xml"] = urlset(f"{base}/page/1")
+    local = tmp_path / "sitemap.xml"
+    local.write_bytes(sitemapindex(f"{base}/pages.xml"))
+
+    assert Crawler(rate=0, state_path=None).sitemap_urls(str(local)) == [f"{base}/page/1"]
+
+
+def test_decompressed_sitemap_size_is_capped():
+    bomb = gzip.compress(b" " * 10_000 + urlset("http://example.com/"))
+    with pytest.raises(ValueError):
+        parse_sitemap(bomb, limit=1_000)
+    assert parse_sitemap(bomb) == (["http://example.com/"], [])
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from rag import snapshot
+from rag.docstore import DocStoreWriter
+from rag.hash_embeddings import HashEmbeddings
+from rag.indexing import EMBED_MODELS, IndexFeeder, build_meta, write_index, write_meta
+from rag.retriever import WarmRetriever
+
+
+def build_hash_index(index_dir, embed_backend):
+    model = EMBED_MODELS["hash"]
+    texts = ["fintech investors in india", "early stage ai startups", "health policy"]
+    vectors = np.asarray(HashEmbeddings(model).embed_documents(texts), dtype="float32")
+    writer = DocStoreWriter(str(index_dir))
+    for i, text in enumerate(texts):
+        writer.add(i, text, {"source": "t.txt", "language": "en", "type": "text"})
+    feeder = IndexFeeder("flat")
+    feeder.add(vectors, np.arange(len(texts), dtype="int64"))
+    index = feeder.close()
+    write_index(index, str(index_dir / "index.faiss"))
+    writer.close()
+    write_meta(str(index_dir), build_meta("flat", {}, index, model,
+                                          embed_backend=embed_backend))
+
+
+@pytest.fixture
+def snapshot_calls(monkeypatch):
+    calls = []
+
+    def load(index_dir, model_name=None, backend=None):
+        calls.append(backend)
+        return None
+
+    monkeypatch.setattr(snapshot, "load", load)
+    return calls
+
+
+def test_retriever_uses_recorded_backend_for_snapshot(tmp_path, snapshot_calls):
+    build_hash_index(tmp_path, "onnx_int8")
+    retriever = WarmRetriever(index_dir=str(tmp_path), backend=None).warm()
+    assert snapshot_calls == ["onnx_int8"]
+    assert retriever.timings["embed_backend"] == "onnx_int8"
+
+
+def test_forced_backend_skips_snapshot(tmp_path, snapshot_calls):
+    build_hash_index(tmp_path, "onnx_int8")
+    retriever = WarmRetriever(index_dir=str(tmp_path), backend="torch").warm()
+    assert snapshot_calls == []
+    assert retriever.timings["embed_backend"] == "torch"
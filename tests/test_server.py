@@ -0,0 +1,33 @@
+import pytest
+
+pytest.importorskip("flask")
+server = pytest.importorskip("server")
+
+
+@pytest.mark.parametrize("body", [
+    {"query": "hi", "language": ["hi"]},
+    {"query": "hi", "language": 5},
+    {"query": "hi", "k": True},
+    {"query": "hi", "k": 0},
+    {"query": ""},
+])
+def test_parse_rejects_bad_fields(body):
+    with pytest.raises(ValueError):
+        server._parse(body)
+
+
+def test_parse_accepts_null_language():
+    assert server._parse({"query": "hi", "language": None}) == (["hi"], None, 5, False)
+
+
+def test_bad_request_then_good_request(monkeypatch):
+    monkeypatch.setattr(server.searches, "handler",
+                        lambda key, queries: [[] for _ in queries])
+    client = server.app.test_client()
+
+    bad = client.post("/retrieve", json={"query": "hi", "language": ["hi"]})
+    assert bad.status_code == 400
+
+    good = client.post("/retrieve", json={"query": "hi", "language": "hi"})
+    assert good.status_code == 200
+    assert good.get_json()["documents"] == []
@@ -0,0 +1,39 @@
+import json
+import os
+
+import pytest
+
+from rag import snapshot
+
+MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+
+def write_snapshot(index_dir, kind, model=MODEL):
+    path = snapshot.snapshot_path(str(index_dir))
+    os.makedirs(path)
+    with open(os.path.join(path, snapshot.INFO_FILE), "w", encoding="utf-8") as f:
+        json.dump({"kind": kind, "embed_model": model}, f)
+
+
+@pytest.fixture
+def loaded(monkeypatch):
+    """Make a present snapshot 'load' without onnxruntime / tokenizers."""
+    monkeypatch.setattr(snapshot, "SnapshotEmbeddings", lambda path, info: info["kind"])
+
+
+@pytest.mark.parametrize("kind, backend, expected", [
+    ("onnx_int8", "onnx_int8", "onnx_int8"),
+    ("onnx", "torch", "onnx"),               # same precision
+    ("torchscript", "onnx", "torchscript"),
+    ("onnx", "onnx_int8", None),             # float32 snapshot, int8 index
+    ("onnx_int8", "torch", None),            # int8 snapshot, float32 index
+    ("onnx_int8", None, "onnx_int8"),        # no backend to check against
+])
+def test_load_checks_precision(tmp_path, loaded, kind, backend, expected):
+    write_snapshot(tmp_path, kind)
+    assert snapshot.load(str(tmp_path), MODEL, backend) == expected
+
+
+def test_load_checks_model(tmp_path, loaded):
+    write_snapshot(tmp_path, "onnx", model="some/other-model")
+    assert snapshot.load(str(tmp_path), MODEL) is None
@@ -0,0 +1,54 @@
+import pytest
+
+pytest.importorskip("pandas")
+
+from rag.tables import TableStore
+
+FUNDING_CSV = """Investor,Sector,Stage,Funding Amount (USD),Year
+Accel,Fintech,Early-Stage,2000000,2023
+Sequoia,AI,Early-Stage,5000000,2024
+Nexus,"AI, Fintech",Growth,12000000,2024
+Blume,Health,Seed,800000,2022
+Kalaari,Fintech,Seed,1500000,2023
+"""
+
+POLICIES_CSV = """Policy,Sector,Year
+Startup India,Health,2016
+Digital Lending Rules,Fintech,2022
+IndiaAI Mission,AI,2024
+"""
+
+
+@pytest.fixture
+def store(tmp_path):
+    (tmp_path / "startups.csv").write_text(FUNDING_CSV, encoding="utf-8")
+    (tmp_path / "policies.csv").write_text(POLICIES_CSV, encoding="utf-8")
+    return TableStore(str(tmp_path))
+
+
+@pytest.mark.parametrize("query, filters, count", [
+    ("Which investors actively fund early-stage AI startups in India?",
+     {"Sector": ["ai"], "Stage": ["early stage"]}, 1),
+    ("How many fintech investors are there?", {"Sector": ["fintech"]}, 3),
+    ("List seed stage investors", {"Stage": ["seed"]}, 2),
+])
+def test_structured_questions_are_routed(store, query, filters, count):
+    result = store.query(query)
+    assert result is not None
+    assert result["filters"] == filters
+    assert result["count"] == count
+
+
+def test_aggregate_needs_the_column_after_the_aggregate_word(store):
+    result = store.query("What is the total funding amount for fintech startups?")
+    assert result["aggregate"] == ("sum", "Funding Amount (USD)", 15_500_000.0)
+
+
+@pytest.mark.parametrize("query", [
+    "What funding trends are emerging in Indian FinTech startups?",
+    "What are the key health sector policies for startups?",
+    "Name the biggest AI policy changes this year",
+    "Which VCs have invested in similar startups over the last 2 years?",
+])
+def test_narrative_questions_fall_through(store, query):
+    assert store.query(query) is None